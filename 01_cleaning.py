@@ -1,7 +1,11 @@
-import pandas as pd
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
 
-print("🚀 开始批量数据清洗与转换...")
+from data_store import csv_path, parquet_path, write_table, HAS_PARQUET
+from graph_store import file_digest
 
 # ==========================================
 # 1. 定义列名 (基于 OpenFlights 官方文档)
@@ -39,36 +43,131 @@ cols_countries = [
 
 # ==========================================
 # 2. 定义处理任务清单
-#    格式: (原文件名, 列名列表, 输出文件名)
+#    格式: (原文件名, 列名列表, 表名)
+#    表名对应 data_store.SCHEMAS，输出 <表名>_cleaned.csv 与 <表名>_cleaned.parquet
 # ==========================================
 tasks = [
-    ('airports.dat', cols_airports, 'airports_cleaned.csv'),
-    ('airlines.dat', cols_airlines, 'airlines_cleaned.csv'),
-    ('routes.dat', cols_routes, 'routes_cleaned.csv'),
-    ('planes.dat', cols_planes, 'planes_cleaned.csv'),
-    ('countries.dat', cols_countries, 'countries_cleaned.csv')
+    ('airports.dat', cols_airports, 'airports'),
+    ('airlines.dat', cols_airlines, 'airlines'),
+    ('routes.dat', cols_routes, 'routes'),
+    ('planes.dat', cols_planes, 'planes'),
+    ('countries.dat', cols_countries, 'countries')
 ]
 
 # ==========================================
-# 3. 执行转换函数
+# 3. 校验规则 (原 data_check.py 的处理策略，在解析时直接应用)
+#    格式: 表名 -> [(拒绝原因, 必须非空的列)]
+#    一行数据按顺序检查，记录第一条不满足的规则
+# ==========================================
+rules = {
+    # 'IATA' 是连接航线的钥匙，缺失就没法做关联分析；没有国家的机场也无法做地理统计
+    'airports': [
+        ('missing IATA', 'IATA'),
+        ('missing Country', 'Country'),
+    ],
+    # 航线最重要的是出发地和目的地，缺一个就是无效数据
+    'routes': [
+        ('missing Source airport', 'Source airport'),
+        ('missing Destination airport', 'Destination airport'),
+    ],
+}
+
+# 规则或输出格式变化时加 1，让所有表在下次运行时重新清洗
+CLEANING_VERSION = 1
+
+# 记录每个输入文件的内容哈希，输入没变的表直接跳过
+MANIFEST_FILE = 'cleaning_manifest.json'
+
+
+def rejected_path(table):
+    return f"{table}_rejected.csv"
+
+
+def load_manifest():
+    if os.path.exists(MANIFEST_FILE):
+        with open(MANIFEST_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def is_up_to_date(entry, digest, table):
+    """输入哈希、清洗版本都没变，且输出文件都还在"""
+    if not entry or entry.get('input_sha1') != digest or entry.get('version') != CLEANING_VERSION:
+        return False
+    outputs = [csv_path(table)] + ([parquet_path(table)] if HAS_PARQUET else [])
+    return all(os.path.exists(p) for p in outputs)
+
+
+# ==========================================
+# 4. 单个文件的清洗 (在子进程里执行)
+# ==========================================
+def clean_file(filename, cols, table):
+    """
+    解析一个 .dat 文件，应用校验规则，写出清洗结果和被拒绝的行
+    :return: (表名, 保留行数, 拒绝行数, 输出文件列表)
+    """
+    # 读取数据：没有表头，处理 \N 为空值
+    # on_bad_lines='skip': 遇到格式错误的行自动跳过（防止报错停止）
+    df = pd.read_csv(filename, header=None, names=cols, na_values=['\\N', '-'], encoding='utf-8', on_bad_lines='skip')
+
+    # 按顺序应用规则，记录每行第一条不满足的原因
+    reason = pd.Series(pd.NA, index=df.index, dtype='string')
+    for rule_reason, col in rules.get(table, []):
+        reason = reason.mask(reason.isna() & df[col].isna(), rule_reason)
+    rejected = reason.notna()
+
+    # 按 schema 转换类型后保存 (CSV + 带类型的 Parquet)
+    outputs = write_table(df[~rejected], table)
+
+    # 被拒绝的行写到旁路文件，附上原因和在原文件中的行号
+    if table in rules:
+        df_rejected = df[rejected].assign(Reject_Reason=reason[rejected])
+        df_rejected.index.name = 'Row'
+        df_rejected.to_csv(rejected_path(table), encoding='utf-8')
+        outputs.append(rejected_path(table))
+
+    return table, int((~rejected).sum()), int(rejected.sum()), outputs
+
+
+# ==========================================
+# 5. 执行转换 (五个文件并行，输入未变化的跳过)
 # ==========================================
 def process_files():
-    for filename, cols, output_name in tasks:
-        if os.path.exists(filename):
+    manifest = load_manifest()
+    pending = []
+    for filename, cols, table in tasks:
+        if not os.path.exists(filename):
+            print(f"⚠️ 跳过: 找不到文件 {filename}")
+            continue
+        digest = file_digest([filename])
+        if is_up_to_date(manifest.get(table), digest, table):
+            print(f"⏭️ 未变化: {filename} (沿用上次的清洗结果)")
+            continue
+        pending.append((filename, cols, table, digest))
+
+    # 没有需要重跑的表时也照常写清单 (它同时是流水线执行器的完成标记)
+    with ProcessPoolExecutor(max_workers=max(len(pending), 1)) as pool:
+        futures = {pool.submit(clean_file, filename, cols, table): (filename, table, digest)
+                   for filename, cols, table, digest in pending}
+        for future, (filename, table, digest) in futures.items():
             try:
-                # 读取数据：没有表头，处理 \N 为空值
-                # on_bad_lines='skip': 遇到格式错误的行自动跳过（防止报错停止）
-                df = pd.read_csv(filename, header=None, names=cols, na_values=['\\N', '-'], encoding='utf-8', on_bad_lines='skip')
-                
-                # 保存数据
-                df.to_csv(output_name, index=False, encoding='utf-8')
-                print(f"✅ 成功: {filename} -> {output_name} (行数: {len(df)})")
+                _, kept, n_rejected, outputs = future.result()
             except Exception as e:
                 print(f"❌ 失败: {filename} 转换出错 -> {e}")
-        else:
-            print(f"⚠️ 跳过: 找不到文件 {filename}")
+                # 失败的表从清单中移除，下次一定会重跑
+                manifest.pop(table, None)
+                continue
+            manifest[table] = {'input': filename, 'input_sha1': digest, 'version': CLEANING_VERSION,
+                               'rows': kept, 'rejected': n_rejected}
+            note = f", 拒绝 {n_rejected} 行 -> {rejected_path(table)}" if table in rules else ""
+            print(f"✅ 成功: {filename} -> {', '.join(outputs)} (行数: {kept}{note})")
+
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
 
 # 运行
 if __name__ == "__main__":
+    print("🚀 开始批量数据清洗与校验...")
     process_files()
-    print("\n🎉 所有处理完成！请检查左侧文件列表是否出现了新的 .csv 文件。")
\ No newline at end of file
+    print("\n🎉 所有处理完成！请检查左侧文件列表是否出现了新的 .csv / .parquet 文件。")
@@ -1,5 +1,12 @@
-import pandas as pd
 import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.colors import to_rgba
+
+from data_store import read_table
+from raster_map import padded_extent, scatter_raster, use_raster
+
+# 机场分布图的画法：'raster' 合成一张栅格图像，'vector' 逐点 scatter，'auto' 按点数决定
+MAP_RENDER = 'auto'
 
 # 设置一种好看的绘图风格
 plt.style.use('ggplot')
@@ -8,7 +15,7 @@ plt.style.use('ggplot')
 # 1. 加载数据
 # ==========================================
 print("🚀 [Step 2] 开始地理维度分析...")
-df = pd.read_csv('airports_cleaned.csv')
+df = read_table('airports', columns=['Name', 'Country', 'Latitude', 'Longitude', 'Altitude'])
 print(f"数据加载完毕，当前分析样本：{len(df)} 个机场")
 
 # ==========================================
@@ -51,15 +58,26 @@ for index, value in enumerate(country_counts.sort_values()):
 # 这是一个很有趣的数据科学技巧：
 # 只要有经纬度，散点图就能自动拼成地图的形状
 # s=1 表示点的大小，alpha=0.5 表示透明度（防止点太密集糊在一起）
-ax2.scatter(df['Longitude'], df['Latitude'], s=2, alpha=0.4, color='#e74c3c')
 ax2.set_title('Global Airports Location Map')
 ax2.set_xlabel('Longitude')
 ax2.set_ylabel('Latitude')
 ax2.grid(True)
+# 坐标范围与 matplotlib 默认的自动缩放相同；先固定下来，布局时刻度标签的宽度就是最终的
+extent = padded_extent(df['Longitude'], df['Latitude'])
+ax2.set_xlim(extent[0], extent[1])
+ax2.set_ylim(extent[2], extent[3])
 
 # 自动调整布局，防止标题和坐标轴重叠
+# 必须在画点之前：栅格按坐标轴此时的像素大小合成，布局之后再改变大小图像就会被重采样
 plt.tight_layout()
 
+# 点很多时 (如合成的 10x 数据) 改为按像素格子合成一张图像，保存速度快得多
+if use_raster(len(df), MAP_RENDER):
+    scatter_raster(ax2, df['Longitude'], df['Latitude'], np.zeros(len(df), dtype=int),
+                   [to_rgba('#e74c3c', 0.4)], [2], dpi=fig.dpi, extent=extent)
+else:
+    ax2.scatter(df['Longitude'], df['Latitude'], s=2, alpha=0.4, color='#e74c3c')
+
 # 保存结果
 plt.savefig('geo_analysis_dashboard.png')
 print("✅ 结果已保存为 'geo_analysis_dashboard.png'")
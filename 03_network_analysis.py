@@ -1,6 +1,8 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from data_store import read_table
+
 # 【修复点】改用兼容性最好的 'ggplot' 样式，确保在任何版本都能运行
 plt.style.use('ggplot')
 
@@ -10,11 +12,11 @@ plt.style.use('ggplot')
 print("🚀 [Step 3] 开始网络维度分析 (Network Analysis)...")
 
 # 读取机场列表 (为了获取机场的名字和国家)
-df_airports = pd.read_csv('airports_cleaned.csv')
+df_airports = read_table('airports', columns=['Name', 'Country', 'IATA'])
 print(f"-> 机场表加载完毕: {len(df_airports)} 行")
 
 # 读取航线列表 (为了统计繁忙度)
-df_routes = pd.read_csv('routes_cleaned.csv')
+df_routes = read_table('routes', columns=['Source airport'])
 print(f"-> 航线表加载完毕: {len(df_routes)} 行")
 
 
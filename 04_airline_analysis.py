@@ -1,60 +1,65 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 
+from airline_metrics import airline_metrics, join_index, take_rows
+from data_store import read_table
+from equipment_index import load_equipment_index
+
 plt.style.use('ggplot')
 
+# 所有航司的指标表
+METRICS_FILE = 'airline_metrics.csv'
+
 # ==========================================
 # 1. 加载数据
 # ==========================================
 print("🚀 [Step 4] 开始商业维度分析 (修正版)...")
-df_routes = pd.read_csv('routes_cleaned.csv')
-df_airlines = pd.read_csv('airlines_cleaned.csv')
-
-print(f"原始航线数: {len(df_routes)}")
+# 列式缓存里 'Airline ID' 已经是可空整数 (Int32)，两张表可以直接按整数关联
+df_airlines = read_table('airlines', columns=['Airline ID', 'Name', 'Country', 'Active'])
+df_airports = read_table('airports', columns=['Airport ID', 'IATA'])
 
 # ==========================================
-# 2. 数据预处理 (这里是关键修复点！)
+# 2. 所有航司的指标 (一次向量化计算)
 # ==========================================
-print("\n🧹 正在清洗 ID 类型...")
-
-# A. 处理 routes 表里的 ID
-# 有些 ID 可能是无效的（比如 '\\N'），我们先强制把它们变成 NaN，然后删掉
-df_routes['Airline ID'] = pd.to_numeric(df_routes['Airline ID'], errors='coerce')
-df_routes = df_routes.dropna(subset=['Airline ID'])
-# 这一步很关键：转成整数，再转成字符串 (去掉 .0)
-df_routes['Airline ID'] = df_routes['Airline ID'].astype(int).astype(str)
-
-print(f"-> 清洗后有效航线 ID 样本: {df_routes['Airline ID'].iloc[0]} (类型: {type(df_routes['Airline ID'].iloc[0])})")
-
-
-# B. 处理 airlines 表里的 ID
-# 同样的操作：转数字 -> 转整数 -> 转字符串
-df_airlines['Airline ID'] = pd.to_numeric(df_airlines['Airline ID'], errors='coerce')
-df_airlines = df_airlines.dropna(subset=['Airline ID'])
-df_airlines['Airline ID'] = df_airlines['Airline ID'].astype(int).astype(str)
-
-# 筛选活跃航司
-active_airlines = df_airlines[df_airlines['Active'] == 'Y'].copy()
-print(f"-> 清洗后有效航司 ID 样本: {active_airlines['Airline ID'].iloc[0]} (类型: {type(active_airlines['Airline ID'].iloc[0])})")
+print("\n🧮 正在计算航司指标 (航线数、机场数、枢纽集中度、共享航线比例)...")
 
+# 无效 ID ('\\N') 在清洗阶段已统一成 <NA>，没有 Airline ID 的航线不参与统计
+metrics = airline_metrics()
+print(f"-> 共 {len(metrics)} 家航司有航线，{metrics['Route_Count'].sum()} 条有效航线记录")
 
 # ==========================================
 # 3. 关联与统计
 # ==========================================
-print("\n🔗 正在关联 (Merge)...")
+print("\n🔗 正在关联 (整数 ID 索引)...")
 
-# 统计每家航司拥有多少条航线
-route_counts = df_routes['Airline ID'].value_counts().reset_index()
-route_counts.columns = ['Airline ID', 'Route_Count']
+# 航司名称 / 国家 / 是否活跃，以及枢纽机场的 IATA 代码：按整数 ID 直接定位行，不经过 merge
+rows = join_index(metrics['Airline ID'], df_airlines['Airline ID'])
+for col in ['Name', 'Country', 'Active']:
+    metrics[col] = take_rows(df_airlines[col], rows)
+metrics['Top_Hub'] = take_rows(df_airports['IATA'], join_index(metrics['Top_Hub_ID'], df_airports['Airport ID']))
 
-# 开始连接
-merged_df = pd.merge(route_counts, active_airlines, on='Airline ID')
+metrics = metrics.sort_values(by='Route_Count', ascending=False, kind='stable').reset_index(drop=True)
+metrics.to_csv(METRICS_FILE, index=False, float_format='%.4f')
+print(f"✅ 所有航司的指标已保存: {METRICS_FILE}")
+
+# 筛选活跃航司
+merged_df = metrics[metrics['Active'] == 'Y']
 
 # 检查一下是不是空的
 if len(merged_df) == 0:
     print("❌ 警告：连接结果依然为空！请检查 ID 是否匹配。")
 else:
-    print(f"✅ 成功连接！匹配到了 {len(merged_df)} 家航空公司的航线数据。")
+    print(f"✅ 成功连接！匹配到了 {len(merged_df)} 家活跃航空公司的航线数据。")
+    print(merged_df.head(10)[['Name', 'Country', 'Route_Count', 'Airports', 'Hub_HHI', 'Top_Hub',
+                              'Codeshare_Share']].to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+    # 机型构成：航线 x 机型 索引已缓存，每家航司只是一次稀疏矩阵的行求和
+    equipment = load_equipment_index()
+    print("\n✈️ 前 5 大活跃航司的主力机型 (按使用该机型的航线数):")
+    for airline_id, name in zip(merged_df['Airline ID'].head(5), merged_df['Name'].head(5)):
+        mix = equipment.airline_mix(int(airline_id)).head(3)
+        fleet = ', '.join(f"{code} {label or '(未知机型)'} ({n})"
+                          for code, label, n in zip(mix['Code'], mix['Name'], mix['Routes']))
+        print(f"  - {name}: {fleet}")
 
 # 取出前 10 名
 top_airlines = merged_df.head(10).sort_values(by='Route_Count', ascending=True)
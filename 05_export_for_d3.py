@@ -1,59 +1,155 @@
 import pandas as pd
+import numpy as np
 import json
 
-print("🚀 正在为 D3.js 准备数据...")
+from data_store import read_table
+from spatial_index import haversine_km
 
-# 1. 读取清洗好的数据
-df_airports = pd.read_csv('airports_cleaned.csv')
-df_routes = pd.read_csv('routes_cleaned.csv')
-
-# 2. 筛选最繁忙的航线 (为了防止浏览器卡死，我们只画 Top 2000 条航线)
-# 逻辑：只保留源机场和目标机场都在 airports 表里的航线
-valid_routes = df_routes[
-    df_routes['Source airport'].isin(df_airports['IATA']) & 
-    df_routes['Destination airport'].isin(df_airports['IATA'])
+# ==========================================
+# 全局配置
+# ==========================================
+# 多分辨率输出：按重要性排序后取前 N 条 (None = 全部)
+# 每个文件都是独立可用的，前端可以先加载小文件，再逐级替换成更大的文件
+LEVELS = [
+    ('2k', 2000),
+    ('10k', 10000),
+    ('all', None),
 ]
-print(f"有效航线总数: {len(valid_routes)}")
-
-# 随机抽样 2000 条 (或者按某种权重选，这里简单起见用抽样)
-sample_routes = valid_routes.sample(n=2000, random_state=42)
-
-# 3. 构建 JSON 结构
-# 我们需要生成一个包含 points (机场) 和 links (航线) 的字典
-export_data = {
-    "airports": [],
-    "routes": []
-}
-
-# -> 建立一个 IATA 到 经纬度 的查找字典，加快速度
-airport_lookup = df_airports.set_index('IATA')[['Latitude', 'Longitude', 'Name', 'City', 'Country']].to_dict('index')
-
-# -> 填充机场数据 (只填充在航线中出现的机场，节省空间)
-used_iatas = set(sample_routes['Source airport']).union(set(sample_routes['Destination airport']))
-
-for iata in used_iatas:
-    if iata in airport_lookup:
-        info = airport_lookup[iata]
-        export_data["airports"].append({
-            "code": iata,
-            "name": info['Name'],
-            "country": info['Country'],
-            "loc": [info['Longitude'], info['Latitude']] # D3 习惯 [经度, 纬度]
-        })
-
-# -> 填充航线数据
-for _, row in sample_routes.iterrows():
-    src = row['Source airport']
-    dst = row['Destination airport']
-    # 确保源和目的都有坐标
-    if src in airport_lookup and dst in airport_lookup:
-        export_data["routes"].append({
-            "source": src,
-            "target": dst
-        })
-
-# 4. 保存为 data.json
-with open('data.json', 'w', encoding='utf-8') as f:
-    json.dump(export_data, f, ensure_ascii=False)
-
-print(f"✅ 数据已导出为 'data.json'！包含 {len(export_data['airports'])} 个机场和 {len(export_data['routes'])} 条航线。")
\ No newline at end of file
+
+# 兼容旧页面：data.json 仍然是最小的那一级
+DEFAULT_LEVEL = '2k'
+
+
+def level_file(name):
+    return f"data_{name}.json"
+
+
+def binary_files(name):
+    """二进制载荷 + 描述数组布局的 JSON 头"""
+    return f"data_{name}.bin", f"data_{name}.meta.json"
+
+
+def write_binary_level(name, arrays, codes):
+    """
+    把一组 NumPy 数组按顺序写进一个二进制文件 (小端序，每段按 4 字节对齐)，
+    页面用 fetch().arrayBuffer() 读取后直接构造 Float32Array / Uint16Array 等类型化数组
+    :param arrays: [(名称, NumPy 数组)]，dtype 只能是 float32 / uint16 / uint32
+    :param codes: 机场 IATA 代码 (与机场数组同序)，写在 JSON 头里
+    :return: (二进制文件, 头文件)
+    """
+    js_types = {np.dtype('<f4'): 'Float32', np.dtype('<u2'): 'Uint16', np.dtype('<u4'): 'Uint32'}
+    bin_file, meta_file = binary_files(name)
+    layout = []
+    offset = 0
+    with open(bin_file, 'wb') as f:
+        for array_name, arr in arrays:
+            arr = np.ascontiguousarray(arr, dtype=arr.dtype.newbyteorder('<'))
+            layout.append({'name': array_name, 'type': js_types[arr.dtype], 'offset': offset, 'length': len(arr)})
+            data = arr.tobytes()
+            padding = (-len(data)) % 4
+            f.write(data + b'\0' * padding)
+            offset += len(data) + padding
+
+    meta = {
+        'version': 1,
+        'n_airports': len(codes),
+        'n_routes': layout[-1]['length'] if layout else 0,
+        'arrays': layout,
+        'codes': list(codes),
+    }
+    with open(meta_file, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, separators=(',', ':'))
+    return bin_file, meta_file
+
+
+def main():
+    print("🚀 正在为 D3.js 准备数据...")
+
+    # 1. 读取清洗好的数据
+    df_airports = read_table('airports', columns=['Name', 'City', 'Country', 'IATA', 'Latitude', 'Longitude'])
+    df_routes = read_table('routes', columns=['Source airport', 'Destination airport'])
+
+    # 2. 向量化关联：IATA 代码 -> 机场行号 (找不到为 -1)
+    df_airports = df_airports.dropna(subset=['IATA']).drop_duplicates(subset='IATA').reset_index(drop=True)
+    iata_index = pd.Index(df_airports['IATA'].astype(str))
+    src = iata_index.get_indexer(df_routes['Source airport'].astype(str))
+    dst = iata_index.get_indexer(df_routes['Destination airport'].astype(str))
+
+    # 逻辑：只保留源机场和目标机场都在 airports 表里的航线
+    valid = (src >= 0) & (dst >= 0)
+    src, dst = src[valid], dst[valid]
+    print(f"有效航线总数: {len(src)}")
+
+    # 3. 合并重复航线：同一 (出发, 到达) 对上有几条记录，就有几家航司在飞
+    n_airports = len(df_airports)
+    pair_key, multiplicity = np.unique(src.astype(np.int64) * n_airports + dst, return_counts=True)
+    pair_src = pair_key // n_airports
+    pair_dst = pair_key % n_airports
+    print(f"去重后航线对: {len(pair_key)}")
+
+    # 4. 计算重要性：航司数量 × 两端机场度数 (取对数，避免只剩几个超级枢纽) × 距离
+    # 度数 = 机场连接的不同机场数：A→B 与 B→A 合并成一条无向边，自环不算邻居
+    lo, hi = np.minimum(pair_src, pair_dst), np.maximum(pair_src, pair_dst)
+    undirected = np.unique(lo[lo != hi] * n_airports + hi[lo != hi])
+    degree = np.bincount(np.concatenate([undirected // n_airports, undirected % n_airports]), minlength=n_airports)
+
+    lat = df_airports['Latitude'].to_numpy(dtype=np.float64)
+    lon = df_airports['Longitude'].to_numpy(dtype=np.float64)
+    distance_km = haversine_km(lat[pair_src], lon[pair_src], lat[pair_dst], lon[pair_dst])
+
+    # 枢纽之间、多家航司运营的航线构成网络骨架；长航线稍微加权，让洲际连接在低分辨率下也能看到
+    importance = multiplicity * np.log1p(degree[pair_src]) * np.log1p(degree[pair_dst]) * (1 + distance_km / 5000)
+    ranking = np.argsort(-importance, kind='stable')
+
+    # 5. 按分辨率导出
+    codes = df_airports['IATA'].astype(str).to_numpy()
+    df_airport_json = pd.DataFrame({
+        'code': codes,
+        'name': df_airports['Name'].astype(str),
+        'country': df_airports['Country'].astype(str),
+        'loc': np.stack([df_airports['Longitude'].to_numpy(dtype=np.float64),
+                         df_airports['Latitude'].to_numpy(dtype=np.float64)], axis=1).round(5).tolist(),  # D3 习惯 [经度, 纬度]
+    })
+
+    for name, limit in LEVELS:
+        chosen = ranking if limit is None else ranking[:limit]
+        r_src, r_dst = pair_src[chosen], pair_dst[chosen]
+
+        # 只填充在航线中出现的机场，节省空间
+        used = np.unique(np.concatenate([r_src, r_dst]))
+        export_data = {
+            "airports": df_airport_json.iloc[used].to_dict('records'),
+            "routes": pd.DataFrame({
+                'source': codes[r_src],
+                'target': codes[r_dst],
+                'weight': multiplicity[chosen],
+            }).to_dict('records'),
+        }
+
+        outputs = [level_file(name)] + (['data.json'] if name == DEFAULT_LEVEL else [])
+        payload = json.dumps(export_data, ensure_ascii=False, separators=(',', ':'))
+        for output in outputs:
+            with open(output, 'w', encoding='utf-8') as f:
+                f.write(payload)
+
+        # 同一级别的二进制版本：机场坐标 / 度数 + 航线端点下标 / 距离 / 航司数量
+        # 机场下标在本级别内重新编号，少于 65536 个机场时用 Uint16
+        local = np.full(n_airports, -1, dtype=np.int64)
+        local[used] = np.arange(len(used))
+        index_dtype = np.uint16 if len(used) < 2 ** 16 else np.uint32
+        binary = write_binary_level(name, [
+            ('lon', df_airports['Longitude'].to_numpy(dtype=np.float32)[used]),
+            ('lat', df_airports['Latitude'].to_numpy(dtype=np.float32)[used]),
+            ('degree', np.minimum(degree[used], 2 ** 16 - 1).astype(np.uint16)),
+            ('km', distance_km[chosen].astype(np.float32)),
+            ('weight', np.minimum(multiplicity[chosen], 2 ** 16 - 1).astype(np.uint16)),
+            ('source', local[r_src].astype(index_dtype)),
+            ('target', local[r_dst].astype(index_dtype)),
+        ], codes[used])
+        outputs.extend(binary)
+
+        print(f"✅ 已导出 {', '.join(outputs)}：{len(used)} 个机场，{len(chosen)} 条航线")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,39 @@
 import pandas as pd
-import networkx as nx
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 import os
+from matplotlib.colors import to_rgba
+
+from centrality import pagerank, sampled_centrality
+from data_store import read_table
+from graph_store import load_route_graph
+from profiling import StepProfiler
+from raster_map import FigureRenderer, scatter_raster, use_raster
 
 # ==========================================
 # 全局配置
 # ==========================================
-ROUTES_FILE = 'routes_cleaned.csv'
-AIRPORTS_FILE = 'airports_cleaned.csv'
-
 # 输出文件名
 OUTPUT_STATS_IMG = '01_connectivity_stats.png'
 OUTPUT_MAP_IMG = '02_global_connectivity_map.png'
 OUTPUT_CSV = 'airport_rankings.csv'
 
+# 介数 / 接近度抽样的误差界：以 1 - DELTA 的概率，归一化误差不超过 EPSILON
+CENTRALITY_EPSILON = 0.1
+CENTRALITY_DELTA = 0.1
 
-def main():
-    print("=== 开始连通度综合分析 (Step 1-5) ===")
-
-    # ==========================================
-    # Step 1: 数据加载与网络构建
-    # ==========================================
-    print("\n[Step 1] 读取数据并构建加权网络...")
-
-    df_routes = pd.read_csv(ROUTES_FILE)
-    df_airports = pd.read_csv(AIRPORTS_FILE)
-
-    # 1.1 数据清洗
-    df_routes['Source airport ID'] = pd.to_numeric(df_routes['Source airport ID'], errors='coerce')
-    df_routes['Destination airport ID'] = pd.to_numeric(df_routes['Destination airport ID'], errors='coerce')
-    df_routes = df_routes.dropna(subset=['Source airport ID', 'Destination airport ID'])
-
-    df_routes['Source airport ID'] = df_routes['Source airport ID'].astype(int)
-    df_routes['Destination airport ID'] = df_routes['Destination airport ID'].astype(int)
-
-    # 1.2 计算权重 (同一航线有多少家航司运营)
-    weighted_edges = df_routes.groupby(['Source airport ID', 'Destination airport ID']).size().reset_index(
-        name='weight')
-
-    print(f"  - 原始航线记录: {len(df_routes)}")
-    print(f"  - 合并后加权边数: {len(weighted_edges)}")
-
-    # 1.3 构建 NetworkX 图
-    G = nx.DiGraph()
-    G.add_weighted_edges_from(weighted_edges.values)
-
-    # ==========================================
-    # Step 2: 计算度指标
-    # ==========================================
-    print("\n[Step 2] 计算各项连通度指标...")
-
-    # 计算不同类型的度
-    out_degree = dict(G.out_degree(weight=None))
-    out_degree_weighted = dict(G.out_degree(weight='weight'))
-    in_degree = dict(G.in_degree(weight=None))  # 备用，虽然这次主要画出度
+# 地图上普通机场的画法：'raster' 合成一张栅格图像，'vector' 逐点 scatter，'auto' 按点数决定；
+# 枢纽始终是矢量散点
+MAP_RENDER = 'auto'
+MAP_DPI = 300
 
-    # 整理结果到 DataFrame
-    df_metrics = pd.DataFrame({'Airport ID': list(G.nodes())})
-    df_metrics['Out_Degree'] = df_metrics['Airport ID'].map(out_degree).fillna(0)
-    df_metrics['Weighted_Degree'] = df_metrics['Airport ID'].map(out_degree_weighted).fillna(0)  # 这里用加权出度作为主要指标
-
-    # 关联机场详细信息
-    df_info = df_airports[['Airport ID', 'Name', 'IATA', 'Country', 'City', 'Latitude', 'Longitude']]
-    df_final = pd.merge(df_metrics, df_info, on='Airport ID', how='left')
-
-    # 移除没有经纬度的孤立节点（方便后续画地图）
-    df_final = df_final.dropna(subset=['Latitude', 'Longitude'])
-
-    print(f"  - 参与分析的机场总数: {len(df_final)}")
-
-    # ==========================================
-    # Step 3: 统计分布可视化
-    # ==========================================
-    print("\n[Step 3] 生成连通度分布统计图...")
 
+# ==========================================
+# 图表 (模块级函数，可以交给进程池并行渲染)
+# ==========================================
+def plot_stats(df_final, out_degree):
+    """Step 3 的统计分布图 (在进程池里渲染)"""
     # 使用临时样式上下文，确保统计图是白底的
     with plt.style.context('seaborn-v0_8-whitegrid'):
         plt.figure(figsize=(16, 10))
@@ -96,8 +54,8 @@ def main():
 
         # 子图 3: 幂律分布验证 (Log-Log Plot)
         plt.subplot(2, 2, 3)
-        degree_sequence = sorted([d for n, d in G.out_degree()], reverse=True)
-        degree_sequence = [d for d in degree_sequence if d > 0]
+        degree_sequence = np.sort(out_degree)[::-1]
+        degree_sequence = degree_sequence[degree_sequence > 0]
         # 修复 Warning: 只保留 'b' 颜色参数，去掉线型参数
         plt.loglog(degree_sequence, 'b', marker='o', markersize=3, linestyle='None', alpha=0.5)
         plt.title('Power Law Verification (Log-Log Plot)')
@@ -116,9 +74,120 @@ def main():
         print(f"  - 统计图已保存: {OUTPUT_STATS_IMG}")
         plt.close()  # 关闭画布释放内存
 
+
+def plot_map(df_final):
+    """Step 5 的全球连通性地图 (在进程池里渲染)"""
+    # 使用深色背景样式绘制地图
+    with plt.style.context('dark_background'):
+        plt.figure(figsize=(18, 10))
+
+        # 5.1 绘制 Tier 3 (最底层)：点多时合成一张栅格图像，图例用一个空散点代替
+        tier3 = df_final[df_final['Tier'] == 'Tier 3: Local/Spoke']
+        if use_raster(len(tier3), MAP_RENDER):
+            scatter_raster(plt.gca(), tier3['Longitude'], tier3['Latitude'], np.zeros(len(tier3), dtype=int),
+                           [to_rgba('#444444', 0.3)], [1], dpi=MAP_DPI)
+            plt.scatter([], [], s=1, c='#444444', alpha=0.3, label='Local')
+        else:
+            plt.scatter(tier3['Longitude'], tier3['Latitude'],
+                        s=1, c='#444444', alpha=0.3, label='Local')
+
+        # 5.2 绘制 Tier 2 (中层)：枢纽数量少，仍用矢量散点 (点大小随加权度变化)
+        tier2 = df_final[df_final['Tier'] == 'Tier 2: Regional Hub']
+        plt.scatter(tier2['Longitude'], tier2['Latitude'],
+                    s=tier2['Weighted_Degree'] * 0.05, c='#1f77b4', alpha=0.6, label='Regional')
+
+        # 5.3 绘制 Tier 1 (顶层)
+        tier1 = df_final[df_final['Tier'] == 'Tier 1: Global Hub']
+        plt.scatter(tier1['Longitude'], tier1['Latitude'],
+                    s=tier1['Weighted_Degree'] * 0.1, c='#ff7f0e', alpha=0.9,
+                    edgecolors='white', linewidth=0.5, label='Global Hub')
+
+        # 5.4 标注 Top 5 机场
+        top5 = df_final.nlargest(5, 'Weighted_Degree')
+        for idx, row in top5.iterrows():
+            plt.text(row['Longitude'] + 2, row['Latitude'], row['IATA'],
+                     color='white', fontsize=10, fontweight='bold')
+
+        plt.title('Global Airport Connectivity Map (Weighted Degree)', fontsize=16, color='white')
+        plt.legend(loc='lower left', markerscale=2)
+        plt.xlim(-180, 180)
+        plt.ylim(-60, 90)
+        plt.grid(False)  # 关闭网格
+
+        plt.savefig(OUTPUT_MAP_IMG, dpi=MAP_DPI, bbox_inches='tight')
+        print(f"  - 地图已保存: {OUTPUT_MAP_IMG}")
+        plt.close()  # 关闭画布
+
+
+def main():
+    profiler = StepProfiler(__file__)
+    print("=== 开始连通度综合分析 (Step 1-5) ===")
+
+    # ==========================================
+    # Step 1: 数据加载与网络构建
+    # ==========================================
+    profiler.phase('Step 1')
+    print("\n[Step 1] 读取数据并构建加权网络...")
+
+    # 1.1 从缓存打开 CSR 航线图 (首次运行时才会解析 CSV)
+    graph = load_route_graph()
+    df_airports = read_table('airports', columns=['Airport ID', 'Name', 'IATA', 'Country', 'City',
+                                                  'Latitude', 'Longitude'])
+
+    # 1.2 权重 (同一航线有多少家航司运营) 已在缓存中按 (起点, 终点) 合并好
+    print(f"  - 原始航线记录: {int(graph.weights.sum())}")
+    print(f"  - 合并后加权边数: {graph.n_edges}")
+
+    # ==========================================
+    # Step 2: 计算度指标
+    # ==========================================
+    profiler.phase('Step 2')
+    print("\n[Step 2] 计算各项连通度指标...")
+
+    # 计算不同类型的度 (直接在 CSR 数组上统计，无需 NetworkX)
+    out_degree = graph.out_degree()
+    out_degree_weighted = graph.out_degree(weighted=True)
+
+    # 整理结果到 DataFrame
+    df_metrics = pd.DataFrame({'Airport ID': pd.array(graph.node_ids, dtype='Int32')})
+    df_metrics['Out_Degree'] = out_degree
+    df_metrics['Weighted_Degree'] = out_degree_weighted  # 这里用加权出度作为主要指标
+
+    # 中转枢纽：度数不一定最高，但大量最短路径经过它 (介数)，或者离全网都很近 (接近度)
+    betweenness, closeness, n_samples = sampled_centrality(graph, epsilon=CENTRALITY_EPSILON,
+                                                           delta=CENTRALITY_DELTA)
+    df_metrics['PageRank'] = pagerank(graph)
+    df_metrics['Betweenness'] = betweenness
+    df_metrics['Closeness'] = closeness
+    print(f"  - 介数 / 接近度: 抽样 {n_samples} 个源点 (误差 ≤ {CENTRALITY_EPSILON}，置信度 {1 - CENTRALITY_DELTA:.0%})")
+
+    # 关联机场详细信息
+    df_info = df_airports[['Airport ID', 'Name', 'IATA', 'Country', 'City', 'Latitude', 'Longitude']]
+    df_final = pd.merge(df_metrics, df_info, on='Airport ID', how='left')
+
+    # 移除没有经纬度的孤立节点（方便后续画地图）
+    df_final = df_final.dropna(subset=['Latitude', 'Longitude'])
+
+    print(f"  - 参与分析的机场总数: {len(df_final)}")
+    top_transfer = df_final.nlargest(5, 'Betweenness')['IATA'].astype(str).tolist()
+    print(f"  - 介数最高的中转枢纽: {', '.join(top_transfer)}")
+
+    # ==========================================
+    # Step 3: 统计分布可视化
+    # ==========================================
+    profiler.phase('Step 3')
+    print("\n[Step 3] 生成连通度分布统计图...")
+    # 两张图互不依赖：交给进程池在后台渲染，主流程继续做分级与导出
+    # 参数由进程池的管理线程稍后才序列化，而 Step 4 会继续修改 df_final：这里只传需要的列的副本
+    # 多进程时 Step 3 / Step 5 的计时只包含提交，后台渲染的剩余时间记在最后的 'Render' 阶段
+    # (单核时 submit 直接在当前进程里渲染，时间仍记在这两步)
+    renderer = FigureRenderer()
+    renderer.submit(plot_stats, df_final[['Out_Degree', 'Weighted_Degree']].copy(), out_degree)
+
     # ==========================================
     # Step 4: 分级与排名
     # ==========================================
+    profiler.phase('Step 4')
     print("\n[Step 4] 机场分级与排名导出...")
 
     # 计算分位数阈值
@@ -138,7 +207,8 @@ def main():
 
     # 导出 CSV
     df_export = df_final.sort_values(by='Weighted_Degree', ascending=False)
-    cols_to_export = ['Name', 'IATA', 'Country', 'City', 'Weighted_Degree', 'Out_Degree', 'Tier']
+    cols_to_export = ['Name', 'IATA', 'Country', 'City', 'Weighted_Degree', 'Out_Degree',
+                      'PageRank', 'Betweenness', 'Closeness', 'Tier']
     df_export[cols_to_export].to_csv(OUTPUT_CSV, index=False)
 
     print(f"  - 分级标准: Tier 1 (>{q95:.0f}), Tier 2 (>{q80:.0f})")
@@ -147,45 +217,16 @@ def main():
     # ==========================================
     # Step 5: 地理可视化
     # ==========================================
+    profiler.phase('Step 5')
     print("\n[Step 5] 绘制全球连通性地图...")
+    renderer.submit(plot_map, df_final[['IATA', 'Latitude', 'Longitude', 'Weighted_Degree', 'Tier']].copy())
 
-    # 使用深色背景样式绘制地图
-    with plt.style.context('dark_background'):
-        plt.figure(figsize=(18, 10))
-
-        # 5.1 绘制 Tier 3 (最底层)
-        tier3 = df_final[df_final['Tier'] == 'Tier 3: Local/Spoke']
-        plt.scatter(tier3['Longitude'], tier3['Latitude'],
-                    s=1, c='#444444', alpha=0.3, label='Local')
-
-        # 5.2 绘制 Tier 2 (中层)
-        tier2 = df_final[df_final['Tier'] == 'Tier 2: Regional Hub']
-        plt.scatter(tier2['Longitude'], tier2['Latitude'],
-                    s=tier2['Weighted_Degree'] * 0.05, c='#1f77b4', alpha=0.6, label='Regional')
-
-        # 5.3 绘制 Tier 1 (顶层)
-        tier1 = df_final[df_final['Tier'] == 'Tier 1: Global Hub']
-        plt.scatter(tier1['Longitude'], tier1['Latitude'],
-                    s=tier1['Weighted_Degree'] * 0.1, c='#ff7f0e', alpha=0.9,
-                    edgecolors='white', linewidth=0.5, label='Global Hub')
-
-        # 5.4 标注 Top 5 机场
-        top5 = df_final.nlargest(5, 'Weighted_Degree')
-        for idx, row in top5.iterrows():
-            plt.text(row['Longitude'] + 2, row['Latitude'], row['IATA'],
-                     color='white', fontsize=10, fontweight='bold')
-
-        plt.title('Global Airport Connectivity Map (Weighted Degree)', fontsize=16, color='white')
-        plt.legend(loc='lower left', markerscale=2)
-        plt.xlim(-180, 180)
-        plt.ylim(-60, 90)
-        plt.grid(False)  # 关闭网格
-
-        plt.savefig(OUTPUT_MAP_IMG, dpi=300, bbox_inches='tight')
-        print(f"  - 地图已保存: {OUTPUT_MAP_IMG}")
-        plt.close()  # 关闭画布
+    # 等待后台渲染完成 (两张图的实际渲染耗时)
+    profiler.phase('Render')
+    renderer.wait()
 
     print("\n=== 所有分析步骤执行完毕！ ===")
+    profiler.finish(n_nodes=graph.n_nodes, n_edges=graph.n_edges, centrality_samples=n_samples)
 
 
 if __name__ == "__main__":
@@ -4,117 +4,127 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 
-# ==========================================
-# 1. 数据加载与对齐 (Fixing the Ghost Node Issue)
-# ==========================================
-ROUTES_FILE = 'routes_cleaned.csv'
-AIRPORTS_FILE = 'airports_cleaned.csv'
-
-print("Step 1: 读取数据并进行严格对齐...")
-
-# 1. 读取机场数据 (作为主参考表)
-df_airports = pd.read_csv(AIRPORTS_FILE)
-# 获取所有“有名有姓”的有效机场 ID 列表
-valid_airport_ids = set(df_airports['Airport ID'].unique())
-
-# 创建映射字典
-airport_names = df_airports.set_index('Airport ID')['Name'].to_dict()
-airport_countries = df_airports.set_index('Airport ID')['Country'].to_dict()
-
-# 2. 读取航线数据
-df_routes = pd.read_csv(ROUTES_FILE)
-df_routes['Source airport ID'] = pd.to_numeric(df_routes['Source airport ID'], errors='coerce')
-df_routes['Destination airport ID'] = pd.to_numeric(df_routes['Destination airport ID'], errors='coerce')
-df_routes = df_routes.dropna(subset=['Source airport ID', 'Destination airport ID'])
-df_routes = df_routes.astype({'Source airport ID': int, 'Destination airport ID': int})
-
-# 【关键修复】: 过滤掉那些“幽灵机场”
-# 只保留 起点 和 终点 都在 valid_airport_ids 里的航线
-condition = (df_routes['Source airport ID'].isin(valid_airport_ids)) & \
-            (df_routes['Destination airport ID'].isin(valid_airport_ids))
-df_routes_clean = df_routes[condition].copy()
-
-print(f"  - 原始航线数: {len(df_routes)}")
-print(f"  - 过滤后航线数: {len(df_routes_clean)} (剔除了未知机场的连接)")
-
-# ==========================================
-# 2. 构建网络与提取核心
-# ==========================================
-print("\nStep 2: 构建网络并提取核心...")
-
-G = nx.DiGraph()
-edges = df_routes_clean[['Source airport ID', 'Destination airport ID']].values
-G.add_edges_from(edges)
-
-# 提取最大强连通子图 (Core Network)
-largest_cc = max(nx.strongly_connected_components(G), key=len)
-G_core = G.subgraph(largest_cc).copy()
-
-print(f"  - 核心网络节点数: {len(G_core.nodes())}")
-
-# ==========================================
-# 3. 计算“小世界”指标
-# ==========================================
-print("\nStep 3: 计算全网最短路径 (计算量较大，请稍候)...")
-
-# 计算所有节点对的最短路径
-# 使用 nx.shortest_path_length 而不是 all_pairs，便于直接获取长度
-path_lengths = []
-max_len = 0
-longest_path_pair = (None, None)
-
-# 获取所有路径长度迭代器
-length_iter = nx.all_pairs_shortest_path_length(G_core)
-
-for source, targets in length_iter:
-    for target, length in targets.items():
-        if source != target:
-            path_lengths.append(length)
-            if length > max_len:
-                max_len = length
-                longest_path_pair = (source, target)
-
-avg_path = np.mean(path_lengths)
-diameter = max_len
-
-print(f"\n=== 分析结果 (已修复未知节点) ===")
-print(f"1. 平均路径长度: {avg_path:.2f}")
-print(f"2. 网络直径: {diameter}")
-
-# ==========================================
-# 4. 寻找“世界上最遥远的距离” (Case Study)
-# ==========================================
-src_id, dst_id = longest_path_pair
-
-# 这里的 get 不会再失败，因为我们已经做过过滤了
-src_name = airport_names[src_id]
-dst_name = airport_names[dst_id]
-src_country = airport_countries[src_id]
-dst_country = airport_countries[dst_id]
-
-print(f"\n[Case Study] 真正的最远航程:")
-print(f"  起点: {src_name} ({src_country})")
-print(f"  终点: {dst_name} ({dst_country})")
-print(f"  跳数: {diameter} (转机 {diameter-1} 次)")
-
-# 获取具体路径
-shortest_path = nx.shortest_path(G_core, source=src_id, target=dst_id)
-print("  推荐飞行路线:")
-for i, node in enumerate(shortest_path):
-    name = airport_names.get(node, str(node))
-    print(f"    {i}. {name}")
-
-# ==========================================
-# 5. 可视化
-# ==========================================
-print("\nStep 4: 生成图表...")
-plt.figure(figsize=(10, 6))
-sns.histplot(path_lengths, bins=np.arange(1, max_len+2)-0.5, stat='probability', color='#6A5ACD')
-plt.title('Degrees of Separation (Cleaned Data)', fontsize=14)
-plt.xlabel('Number of Flights', fontsize=12)
-plt.axvline(avg_path, color='red', linestyle='--', label=f'Avg: {avg_path:.2f}')
-plt.legend()
-plt.grid(axis='y', alpha=0.3)
-plt.savefig('small_world_analysis_fixed.png', dpi=300)
-print("图表已保存: small_world_analysis_fixed.png")
-plt.show()
\ No newline at end of file
+from data_store import read_table
+from graph_store import load_route_graph
+from hop_distance import all_pairs_hop_distribution, exact_diameter, bfs_tree, tree_path
+from profiling import StepProfiler
+
+# 只关心直径和最远航程时设为 True：用 iFUB 上下界只跑少量 BFS，跳过平均路径长度与分布图
+EXACT_DIAMETER_ONLY = False
+
+
+def main():
+    profiler = StepProfiler(__file__)
+    # ==========================================
+    # 1. 数据加载与对齐 (Fixing the Ghost Node Issue)
+    # ==========================================
+    profiler.phase('Step 1')
+    print("Step 1: 读取数据并进行严格对齐...")
+
+    # 1. 读取机场数据 (作为主参考表)
+    df_airports = read_table('airports', columns=['Airport ID', 'Name', 'Country'])
+    # 创建映射字典
+    airport_names = df_airports.set_index('Airport ID')['Name'].to_dict()
+    airport_countries = df_airports.set_index('Airport ID')['Country'].to_dict()
+
+    # 2. 从缓存打开 CSR 航线图
+    graph = load_route_graph()
+
+    # 【关键修复】: 过滤掉那些“幽灵机场”
+    # 只保留 起点 和 终点 都在机场表里的航线
+    graph_clean = graph.subgraph(graph.known)
+
+    print(f"  - 原始航线数: {int(graph.weights.sum())}")
+    print(f"  - 过滤后航线数: {int(graph_clean.weights.sum())} (剔除了未知机场的连接)")
+
+    # ==========================================
+    # 2. 构建网络与提取核心
+    # ==========================================
+    profiler.phase('Step 2')
+    print("\nStep 2: 构建网络并提取核心...")
+
+    # 强连通分量需要 NetworkX，这里才构建视图
+    G = graph_clean.to_networkx(directed=True, weighted=False)
+
+    # 提取最大强连通子图 (Core Network)
+    largest_cc = max(nx.strongly_connected_components(G), key=len)
+    graph_core = graph_clean.subgraph(np.isin(graph_clean.node_ids, list(largest_cc)))
+
+    print(f"  - 核心网络节点数: {graph_core.n_nodes}")
+
+    # ==========================================
+    # 3. 计算“小世界”指标
+    # ==========================================
+    profiler.phase('Step 3')
+    hop_hist = None
+    if EXACT_DIAMETER_ONLY:
+        print("\nStep 3: 计算精确直径 (iFUB 上下界，只需少量 BFS)...")
+        diameter, (src_idx, dst_idx), n_bfs = exact_diameter(graph_core)
+        print(f"  - 共执行 BFS {n_bfs} 次 (全源计算需要 {graph_core.n_nodes} 次)")
+    else:
+        print("\nStep 3: 计算全网最短路径 (多进程位图 BFS)...")
+        # 源点按批次分给进程池，各进程只返回固定长度的跳数直方图，合并后得到分布、直径和最远点对
+        hop_hist, diameter, (src_idx, dst_idx) = all_pairs_hop_distribution(graph_core)
+
+    longest_path_pair = (int(graph_core.node_ids[src_idx]), int(graph_core.node_ids[dst_idx]))
+
+    print(f"\n=== 分析结果 (已修复未知节点) ===")
+    if hop_hist is not None:
+        avg_path = hop_hist.mean()
+        print(f"1. 平均路径长度: {avg_path:.2f}")
+    print(f"2. 网络直径: {diameter}")
+
+    # ==========================================
+    # 4. 寻找“世界上最遥远的距离” (Case Study)
+    # ==========================================
+    profiler.phase('Case Study')
+    src_id, dst_id = longest_path_pair
+
+    # 这里的 get 不会再失败，因为我们已经做过过滤了
+    src_name = airport_names[src_id]
+    dst_name = airport_names[dst_id]
+    src_country = airport_countries[src_id]
+    dst_country = airport_countries[dst_id]
+
+    print(f"\n[Case Study] 真正的最远航程:")
+    print(f"  起点: {src_name} ({src_country})")
+    print(f"  终点: {dst_name} ({dst_country})")
+    print(f"  跳数: {diameter} (转机 {diameter-1} 次)")
+
+    # 获取具体路径 (BFS 最短路径树回溯，与 itinerary_service.py 使用同一套实现)
+    _, parent = bfs_tree(graph_core, src_idx)
+    shortest_path = graph_core.node_ids[tree_path(parent, dst_idx)].tolist()
+    print("  推荐飞行路线:")
+    for i, node in enumerate(shortest_path):
+        name = airport_names.get(node, str(node))
+        print(f"    {i}. {name}")
+
+    # ==========================================
+    # 5. 可视化
+    # ==========================================
+    if hop_hist is None:
+        print("\n(只计算直径模式，跳过分布图)")
+        profiler.finish(n_core=graph_core.n_nodes, diameter=int(diameter))
+        return
+
+    profiler.phase('Step 4')
+    print("\nStep 4: 生成图表...")
+    plt.figure(figsize=(10, 6))
+    # 直接用直方图计数作为权重绘图，不需要逐对距离的原始列表
+    df_hist = pd.DataFrame({'Hops': hop_hist.hops(), 'Pairs': hop_hist.trimmed()})
+    # discrete=True 即以整数为中心、宽度为 1 的柱子 (等价于 bins=np.arange(1, diameter+2)-0.5)
+    sns.histplot(data=df_hist, x='Hops', weights='Pairs', discrete=True, stat='probability', color='#6A5ACD')
+    plt.title('Degrees of Separation (Cleaned Data)', fontsize=14)
+    plt.xlabel('Number of Flights', fontsize=12)
+    plt.axvline(avg_path, color='red', linestyle='--', label=f'Avg: {avg_path:.2f}')
+    plt.legend()
+    plt.grid(axis='y', alpha=0.3)
+    plt.savefig('small_world_analysis_fixed.png', dpi=300)
+    print("图表已保存: small_world_analysis_fixed.png")
+    profiler.finish(n_core=graph_core.n_nodes, diameter=int(diameter))
+    plt.show()
+
+
+# 进程池在 spawn 模式下会重新导入本模块，分析流程必须放在 main 保护之下
+if __name__ == "__main__":
+    main()
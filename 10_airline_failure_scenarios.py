@@ -0,0 +1,69 @@
+import pandas as pd
+
+from airline_scenarios import ScenarioEngine, Scenario, active_airlines, airline_scenarios, country_scenarios
+from graph_store import load_route_graph
+from profiling import StepProfiler
+
+# ==========================================
+# 全局配置
+# ==========================================
+# 额外评估“最大的 N 家航司同时停飞”(按运营的机场对数量排名)
+TOP_CARRIERS = 5
+
+# 终端打印影响最大的前几个情景
+SHOW_TOP = 20
+
+OUTPUT_FILE = 'airline_failure_scenarios.csv'
+
+
+def main():
+    profiler = StepProfiler(__file__)
+
+    # ==========================================
+    # 1. 数据准备
+    # ==========================================
+    profiler.phase('Step 1')
+    print("正在构建网络模型...")
+    graph = load_route_graph()
+    engine = ScenarioEngine(graph)
+    print(f"网络构建完成。机场数: {graph.n_nodes}, 无向连接数: {engine.n_pairs}, "
+          f"最大连通子图: {engine.base_giant}")
+
+    # ==========================================
+    # 2. 生成情景
+    # ==========================================
+    profiler.phase('Step 2')
+    airlines = active_airlines(engine)
+    scenarios = airline_scenarios(airlines) + country_scenarios(airlines)
+
+    # 运营机场对最多的几家航司同时停飞
+    counts = pd.Series(engine.airline_pairs, index=engine.airlines)
+    top = airlines.assign(Pairs=airlines['Airline ID'].map(counts)).nlargest(TOP_CARRIERS, 'Pairs')
+    scenarios.append(Scenario(f"top{TOP_CARRIERS}:" + '+'.join(top['Name']),
+                              tuple(int(a) for a in top['Airline ID'])))
+    print(f"共 {len(scenarios)} 个情景 (活跃航司 {len(airlines)} 家，按国家分组 + 前 {TOP_CARRIERS} 大航司联合停飞)")
+
+    # ==========================================
+    # 3. 批量评估 (离线连通性，进程池并行)
+    # ==========================================
+    profiler.phase('Step 3')
+    print("\n正在评估停飞情景...")
+    result = engine.evaluate(scenarios)
+    result = result.sort_values(['Giant_Loss', 'Isolated_Airports'], ascending=False).reset_index(drop=True)
+
+    # ==========================================
+    # 4. 输出结果
+    # ==========================================
+    profiler.phase('Step 4')
+    result.to_csv(OUTPUT_FILE, index=False)
+    print(f"\n🏆 影响最大的 {SHOW_TOP} 个情景:")
+    print(result.head(SHOW_TOP).to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+
+    harmless = int((result['Giant_Loss'] == 0).sum())
+    print(f"\n  - {harmless} / {len(result)} 个情景不会缩小最大连通子图")
+    print(f"✅ 情景结果已保存: {OUTPUT_FILE}")
+    profiler.finish(n_scenarios=len(scenarios), n_pairs=engine.n_pairs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from data_store import read_table
+
+# ==========================================
+# 航司维度的整数键关联与批量指标
+# 所有关联都在整数 ID 上完成：把一侧的 ID 排序后用 searchsorted 定位 (join_index)，
+# 不再经过 float / str 转换，也不走 pd.merge。
+# 每条航线记录先映射成 (航司编号, 机场编号)，所有航司的指标用 bincount 与
+# 航司 x 机场 的稀疏矩阵一次算完，没有逐航司的 Python 循环。
+# ==========================================
+
+# 共享航线在 Codeshare 列中的标记
+CODESHARE_FLAG = 'Y'
+
+# join_index 中代替 <NA> 的哨兵值 (不会与真实 ID 相同)
+MISSING_KEY = np.iinfo(np.int64).min
+
+
+# ==========================================
+# 1. 整数键关联索引
+# ==========================================
+def join_index(keys, table_keys):
+    """
+    :param keys: 要查找的整数 ID (可以含 <NA>)
+    :param table_keys: 被关联表的整数 ID 列 (唯一，可以含 <NA>)
+    :return: keys 中每个 ID 在 table_keys 里的行位置，找不到 (或缺失) 时为 -1
+    """
+    key_values = pd.array(keys, dtype='Int64').to_numpy(dtype=np.int64, na_value=MISSING_KEY)
+    table_values = pd.array(table_keys, dtype='Int64').to_numpy(dtype=np.int64, na_value=MISSING_KEY)
+    if len(table_values) == 0:
+        return np.full(len(key_values), -1, dtype=np.int64)
+    order = np.argsort(table_values, kind='stable')
+    sorted_values = table_values[order]
+    pos = np.minimum(np.searchsorted(sorted_values, key_values), len(order) - 1)
+    found = (sorted_values[pos] == key_values) & (key_values != MISSING_KEY)
+    return np.where(found, order[pos], -1)
+
+
+def take_rows(column, rows):
+    """按 join_index 的结果取出被关联表的一列 (保留原类型)，-1 对应缺失值"""
+    rows = np.asarray(rows)
+    values = pd.Series(column).reset_index(drop=True).take(np.maximum(rows, 0)).reset_index(drop=True)
+    return values.where(rows >= 0)
+
+
+# ==========================================
+# 2. 航司 x 机场 矩阵
+# ==========================================
+class AirlineRoutes:
+    """
+    航线表在整数编号上的紧凑表示
+
+    :param airline_ids: 航司编号 -> Airline ID (升序)
+    :param airport_ids: 机场编号 -> Airport ID (升序)
+    :param route_airline: 每条航线记录的航司编号
+    :param route_src: 出发机场编号 (ID 缺失时为 -1)
+    :param route_dst: 到达机场编号 (ID 缺失时为 -1)
+    :param codeshare: 是否为共享航线 (bool)
+    """
+
+    def __init__(self, airline_ids, airport_ids, route_airline, route_src, route_dst, codeshare):
+        self.airline_ids = airline_ids
+        self.airport_ids = airport_ids
+        self.route_airline = route_airline
+        self.route_src = route_src
+        self.route_dst = route_dst
+        self.codeshare = codeshare
+
+    @property
+    def n_airlines(self):
+        return len(self.airline_ids)
+
+    @property
+    def n_airports(self):
+        return len(self.airport_ids)
+
+    def departures(self):
+        """航司 x 出发机场 的航线记录数 (CSR)"""
+        known = self.route_src >= 0
+        ones = np.ones(int(known.sum()), dtype=np.int64)
+        return sparse.csr_matrix((ones, (self.route_airline[known], self.route_src[known])),
+                                 shape=(self.n_airlines, self.n_airports))
+
+    def served(self):
+        """航司 x 机场 的 0/1 矩阵：航司是否有航线在该机场起降 (CSR)"""
+        airline = np.concatenate([self.route_airline, self.route_airline])
+        airport = np.concatenate([self.route_src, self.route_dst])
+        known = airport >= 0
+        matrix = sparse.csr_matrix((np.ones(int(known.sum()), dtype=np.int64), (airline[known], airport[known])),
+                                   shape=(self.n_airlines, self.n_airports))
+        # 同一 (航司, 机场) 的重复记录合并后只保留一个 1
+        matrix.sum_duplicates()
+        matrix.data[:] = 1
+        return matrix
+
+
+def load_airline_routes():
+    """读取航线表 (只读需要的列)，丢掉没有 Airline ID 的记录"""
+    df = read_table('routes', columns=['Airline ID', 'Source airport ID', 'Destination airport ID', 'Codeshare'])
+    df = df.dropna(subset=['Airline ID'])
+
+    airline_ids, route_airline = np.unique(df['Airline ID'].to_numpy(dtype=np.int64), return_inverse=True)
+    src = df['Source airport ID'].to_numpy(dtype=np.int64, na_value=-1)
+    dst = df['Destination airport ID'].to_numpy(dtype=np.int64, na_value=-1)
+    airport_ids = np.unique(np.concatenate([src, dst]))
+    airport_ids = airport_ids[airport_ids >= 0]
+
+    def locate(ids):
+        pos = np.searchsorted(airport_ids, ids)
+        return np.where(ids >= 0, pos, -1)
+
+    codeshare = (df['Codeshare'] == CODESHARE_FLAG).fillna(False).to_numpy(dtype=bool)
+    return AirlineRoutes(airline_ids.astype(np.int32), airport_ids.astype(np.int32), route_airline.astype(np.int32),
+                         locate(src).astype(np.int32), locate(dst).astype(np.int32), codeshare)
+
+
+# ==========================================
+# 3. 所有航司的指标 (一次向量化计算)
+# ==========================================
+def airline_metrics(routes=None):
+    """
+    :param routes: AirlineRoutes，默认 load_airline_routes()
+    :return: DataFrame，每家有航线的航司一行：
+        Route_Count       航线记录数
+        Airports          起降过的不同机场数
+        Hub_HHI           出发航线在各机场之间的赫芬达尔指数 (1 = 全部从同一个机场出发)
+        Top_Hub_ID        出发航线最多的机场 ID
+        Top_Hub_Share     该机场占出发航线的比例
+        Codeshare_Share   共享航线的比例
+    出发 / 到达机场 ID 缺失的记录计入 Route_Count，但不计入机场相关的指标
+    """
+    routes = routes if routes is not None else load_airline_routes()
+    n = routes.n_airlines
+    route_count = np.bincount(routes.route_airline, minlength=n)
+
+    dep = routes.departures()
+    dep_total = np.asarray(dep.sum(axis=1)).ravel()
+    dep_sq = np.asarray(dep.multiply(dep).sum(axis=1)).ravel()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        hhi = dep_sq / dep_total.astype(np.float64) ** 2
+        top_share = dep.max(axis=1).toarray().ravel() / dep_total
+
+    has_dep = dep_total > 0
+    top_hub = np.asarray(dep.argmax(axis=1)).ravel()
+    top_hub_id = pd.array(np.where(has_dep, routes.airport_ids[top_hub], 0), dtype='Int32')
+    top_hub_id[~has_dep] = pd.NA
+
+    codeshare = np.bincount(routes.route_airline, weights=routes.codeshare, minlength=n)
+    return pd.DataFrame({
+        'Airline ID': pd.array(routes.airline_ids, dtype='Int32'),
+        'Route_Count': route_count,
+        'Airports': np.asarray(routes.served().sum(axis=1)).ravel().astype(np.int64),
+        'Hub_HHI': hhi,
+        'Top_Hub_ID': top_hub_id,
+        'Top_Hub_Share': top_share,
+        'Codeshare_Share': codeshare / np.maximum(route_count, 1),
+    })
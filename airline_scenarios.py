@@ -0,0 +1,260 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from airline_metrics import join_index
+from data_store import read_table
+from graph_store import label_components
+
+# ==========================================
+# 航司停飞 / 航线删除情景
+# 情景 = 一组停飞的 Airline ID：只有当某个机场对上的所有航线记录都属于这些航司时，这条连接才消失。
+# 每次评估一批情景时 (离线处理)：
+#   1. 批内所有情景都保留的连接先一次性向量化收缩成连通分量 (大多数连接属于这一类)
+#   2. 剩下的连接按“在哪些情景里存在”放进以情景编号为下标的线段树
+#   3. 深度优先遍历线段树，用可回滚并查集 (按大小合并，不做路径压缩) 加边 / 撤销，
+#      到达叶子时即得到该情景的最大连通子图
+# 每条被删除过的连接只会插入 O(log S) 个线段树节点，整批情景的总代价接近线性；
+# 情景分批交给进程池并行评估。
+# ==========================================
+
+# 每个进程任务包含的情景数 (批越小，可预先收缩的连接越多，但收缩本身要重复做)
+SCENARIOS_PER_TASK = 64
+
+# 没有 Airline ID 的航线记录归到这个虚拟航司 (任何情景都不会删除它；航司表里本身有 ID 为 -1 的 "Unknown")
+UNKNOWN_AIRLINE = -2 ** 31
+
+# name: 情景名称；airlines: 停飞的 Airline ID 元组
+Scenario = namedtuple('Scenario', ['name', 'airlines'])
+
+# 子进程里的连接端点 (由 _init_worker 设置，避免每个任务重复传输)
+_ARRAYS = None
+
+
+# ==========================================
+# 1. 机场对 <-> 航司 关联表
+# ==========================================
+class ScenarioEngine:
+    """
+    :param graph: 有向 RouteGraph (load_route_graph 的结果)，情景分析时按无向连接处理
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        n = graph.n_nodes
+        df = read_table('routes', columns=['Airline ID', 'Source airport ID', 'Destination airport ID'])
+        df = df.dropna(subset=['Source airport ID', 'Destination airport ID'])
+        u = graph.index_of(df['Source airport ID'].to_numpy(dtype=np.int64))
+        v = graph.index_of(df['Destination airport ID'].to_numpy(dtype=np.int64))
+        airline = df['Airline ID'].fillna(UNKNOWN_AIRLINE).to_numpy(dtype=np.int64)
+
+        # 无向机场对 (自环不影响连通性，直接丢掉)
+        keep = (u >= 0) & (v >= 0) & (u != v)
+        lo, hi = np.minimum(u[keep], v[keep]), np.maximum(u[keep], v[keep])
+        pair_key, row_pair = np.unique(lo.astype(np.int64) * n + hi, return_inverse=True)
+        self.pair_u = (pair_key // n).astype(np.int64)
+        self.pair_v = (pair_key % n).astype(np.int64)
+        self.n_pairs = len(pair_key)
+
+        # 每个机场对上 (航司, 机场对) 去重后的记录：同一航司在同一对机场上的往返只算一次
+        row_airline = airline[keep]
+        uniq = np.unique(np.stack([row_airline, row_pair]), axis=1)
+        self.link_airline, self.link_pair = uniq[0], uniq[1]
+        self.pair_carriers = np.bincount(self.link_pair, minlength=self.n_pairs)
+
+        # 按航司分组，便于快速取出某家航司运营的全部机场对
+        self.airlines, self._starts = np.unique(self.link_airline, return_index=True)
+        self._ends = np.append(self._starts[1:], len(self.link_airline))
+        # 每家航司运营的机场对数量 (与 self.airlines 对齐)
+        self.airline_pairs = self._ends - self._starts
+
+        self.degree = (np.bincount(self.pair_u, minlength=n) + np.bincount(self.pair_v, minlength=n))
+        labels = label_components(n, self.pair_u, self.pair_v)
+        self.base_giant = int(np.bincount(labels).max()) if n else 0
+
+    def pairs_of(self, airline_ids):
+        """这些航司运营的机场对 (可能重复：同一对机场上有多家被选中的航司)"""
+        rows = join_index(np.unique(np.asarray(airline_ids, dtype=np.int64)), self.airlines)
+        chunks = [self.link_pair[self._starts[p]:self._ends[p]] for p in rows[rows >= 0]]
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+
+    def removed_pairs(self, airline_ids):
+        """情景下消失的机场对：所有运营航司都在停飞名单里"""
+        pairs = self.pairs_of(airline_ids)
+        if not len(pairs):
+            return pairs
+        candidates, hits = np.unique(pairs, return_counts=True)
+        return candidates[hits == self.pair_carriers[candidates]]
+
+    # ------------------------------------------
+    # 批量评估
+    # ------------------------------------------
+    def evaluate(self, scenarios, n_workers=None):
+        """
+        :param scenarios: Scenario 列表
+        :param n_workers: 进程数，默认 CPU 核数；为 1 时在当前进程内计算
+        :return: DataFrame，每个情景一行 (删除的连接数、最大连通子图、损失比例、失去全部航线的机场数)
+        """
+        removed = [self.removed_pairs(s.airlines) for s in scenarios]
+        batches = [removed[i:i + SCENARIOS_PER_TASK] for i in range(0, len(removed), SCENARIOS_PER_TASK)]
+        arrays = (self.graph.n_nodes, self.pair_u, self.pair_v)
+
+        n_workers = n_workers or os.cpu_count() or 1
+        if n_workers == 1 or len(batches) <= 1:
+            _init_worker(arrays)
+            giants = [g for batch in batches for g in _giant_sizes(batch)]
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(arrays,)) as pool:
+                giants = [g for result in pool.map(_giant_sizes, batches) for g in result]
+
+        n = self.graph.n_nodes
+        isolated = []
+        for pairs in removed:
+            # 失去的连接数等于原有度数 -> 该机场已无任何航线
+            lost = np.bincount(self.pair_u[pairs], minlength=n) + np.bincount(self.pair_v[pairs], minlength=n)
+            isolated.append(int(((lost == self.degree) & (self.degree > 0)).sum()))
+
+        giants = np.asarray(giants, dtype=np.int64)
+        return pd.DataFrame({
+            'Scenario': [s.name for s in scenarios],
+            'Airlines': [len(s.airlines) for s in scenarios],
+            'Removed_Links': [len(p) for p in removed],
+            'Giant_Component': giants,
+            'Giant_Loss': self.base_giant - giants,
+            'Giant_Loss_Pct': (self.base_giant - giants) / max(self.base_giant, 1) * 100,
+            'Isolated_Airports': isolated,
+        })
+
+
+# ==========================================
+# 2. 离线连通性：收缩 + 线段树 + 可回滚并查集
+# ==========================================
+def _init_worker(arrays):
+    global _ARRAYS
+    _ARRAYS = arrays
+
+
+def _giant_sizes(removed):
+    """
+    :param removed: 每个情景删除的机场对下标数组
+    :return: 每个情景的最大连通子图大小 (列表)
+    """
+    n, pair_u, pair_v = _ARRAYS
+    n_scen = len(removed)
+    if n_scen == 0:
+        return []
+
+    # 1. 批内所有情景都保留的连接：一次性收缩
+    absent_pair = np.concatenate(removed) if n_scen else np.zeros(0, dtype=np.int64)
+    absent_scen = np.repeat(np.arange(n_scen), [len(r) for r in removed])
+    always = np.ones(len(pair_u), dtype=bool)
+    always[absent_pair] = False
+    labels = label_components(n, pair_u[always], pair_v[always])
+    comp, node_comp = np.unique(labels, return_inverse=True)
+    comp_size = np.bincount(node_comp).tolist()
+
+    # 两端已经在同一分量里的连接删不删都一样
+    cu, cv = node_comp[pair_u[absent_pair]], node_comp[pair_v[absent_pair]]
+    useful = cu != cv
+    absent_pair, absent_scen, cu, cv = absent_pair[useful], absent_scen[useful], cu[useful], cv[useful]
+
+    # 2. 线段树：每条连接在“缺席情景”之间的空隙里存在
+    size = 1
+    while size < n_scen:
+        size *= 2
+    tree = [[] for _ in range(2 * size)]
+
+    def add(lo, hi, edge):
+        lo += size
+        hi += size
+        while lo < hi:
+            if lo & 1:
+                tree[lo].append(edge)
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                tree[hi].append(edge)
+            lo >>= 1
+            hi >>= 1
+
+    order = np.lexsort((absent_scen, absent_pair))
+    absent_pair, absent_scen = absent_pair[order], absent_scen[order]
+    cu, cv = cu[order].tolist(), cv[order].tolist()
+    starts = np.flatnonzero(np.r_[True, absent_pair[1:] != absent_pair[:-1]]).tolist() if len(absent_pair) else []
+    absent_scen = absent_scen.tolist()
+    for k, start in enumerate(starts):
+        end = starts[k + 1] if k + 1 < len(starts) else len(absent_scen)
+        edge = (cu[start], cv[start])
+        prev = 0
+        for s in absent_scen[start:end]:
+            if s > prev:
+                add(prev, s, edge)
+            prev = s + 1
+        if prev < n_scen:
+            add(prev, n_scen, edge)
+
+    # 3. 深度优先遍历 + 可回滚并查集
+    parent = list(range(len(comp_size)))
+    giant = [max(comp_size) if comp_size else 0]
+    history = []
+    result = [0] * n_scen
+
+    def find(x):
+        while parent[x] != x:
+            x = parent[x]
+        return x
+
+    def visit(node, lo, hi):
+        mark = len(history)
+        for a, b in tree[node]:
+            ra, rb = find(a), find(b)
+            if ra == rb:
+                continue
+            if comp_size[ra] < comp_size[rb]:
+                ra, rb = rb, ra
+            history.append((rb, ra, giant[0]))
+            parent[rb] = ra
+            comp_size[ra] += comp_size[rb]
+            if comp_size[ra] > giant[0]:
+                giant[0] = comp_size[ra]
+        if hi - lo == 1:
+            result[lo] = giant[0]
+        else:
+            mid = (lo + hi) // 2
+            visit(2 * node, lo, mid)
+            if mid < n_scen:
+                visit(2 * node + 1, mid, hi)
+        # 撤销本节点上的合并
+        while len(history) > mark:
+            rb, ra, old_giant = history.pop()
+            parent[rb] = rb
+            comp_size[ra] -= comp_size[rb]
+            giant[0] = old_giant
+
+    visit(1, 0, size)
+    return result
+
+
+# ==========================================
+# 3. 常用情景
+# ==========================================
+def active_airlines(engine):
+    """活跃 (Active == 'Y') 且至少运营一条航线的航司：(Airline ID, Name, Country)"""
+    df = read_table('airlines', columns=['Airline ID', 'Name', 'Country', 'Active']).dropna(subset=['Airline ID'])
+    df = df[(df['Active'] == 'Y').to_numpy() & (join_index(df['Airline ID'], engine.airlines) >= 0)]
+    return df[['Airline ID', 'Name', 'Country']].astype({'Airline ID': 'int64'}).reset_index(drop=True)
+
+
+def airline_scenarios(airlines):
+    """每家航司单独停飞；airlines 为 active_airlines 的结果"""
+    return [Scenario(f"airline:{name}", (int(aid),))
+            for aid, name in zip(airlines['Airline ID'], airlines['Name'])]
+
+
+def country_scenarios(airlines):
+    """某国所有 (活跃) 航司同时停飞"""
+    return [Scenario(f"country:{country}", tuple(int(a) for a in group['Airline ID']))
+            for country, group in airlines.dropna(subset=['Country']).groupby('Country')]
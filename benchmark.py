@@ -0,0 +1,241 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+
+from data_store import read_table, table_path
+
+# ==========================================
+# 分阶段基准测试
+# 每个阶段先执行一次不计时的准备 (setup)，再重复运行若干次记录墙钟时间，
+# 最后单独跑一次开启 tracemalloc 的运行记录峰值内存 (避免追踪开销污染计时)。
+# 结果写入 JSON，并与保存的基线比较：中位数变慢超过阈值即视为性能回退。
+# 基线与机器相关，不提交到仓库 (已在 .gitignore 中)，在同一台机器上：
+#   1. 修改前运行 python benchmark.py --save-baseline，记录当前代码的基线
+#   2. 修改后运行 python benchmark.py，与基线比较，有回退时退出码为 1
+# ==========================================
+RESULTS_FILE = 'benchmark_results.json'
+BASELINE_FILE = 'benchmark_baseline.json'
+
+# 默认重复次数 (另有一次预热不计入)；次数太少时中位数本身的波动就接近阈值
+REPEATS = 9
+
+# 中位数比基线慢 20% 以上视为回退
+THRESHOLD = 0.20
+
+# 同时要求绝对变慢超过这个值 (秒)：几十毫秒的阶段里 20% 只是几毫秒，容易被调度抖动触发
+MIN_DELTA_S = 0.005
+
+# attack 阶段的随机失效试验次数：07 默认做 500 次 (percolation.N_TRIALS)，每次试验的耗时相同，
+# 这里取 1/5，单次运行约 1 秒，总耗时仍与 07 的随机攻击部分成正比
+ATTACK_TRIALS = 100
+
+# setup(workers) -> 上下文；run(上下文) 为被计时的部分
+Stage = namedtuple('Stage', ['name', 'setup', 'run', 'description'])
+
+
+# ==========================================
+# 1. 各阶段定义 (与 06-09 中的实际调用保持一致)
+# ==========================================
+def _setup_none(workers):
+    return workers
+
+
+def _run_load(_):
+    # 列式缓存读取 + 图缓存命中 (内存映射)
+    from graph_store import load_route_graph
+    read_table('routes', columns=['Source airport ID', 'Destination airport ID'])
+    read_table('airports', columns=['Airport ID', 'Name', 'IATA', 'Country', 'Latitude', 'Longitude'])
+    load_route_graph()
+
+
+def _run_graph_build(_):
+    # 不走缓存，从数据表重新构建 CSR，再做 06-09 都会用到的对称化 / 子图
+    from graph_store import build_route_graph
+    graph = build_route_graph()
+    graph.to_undirected()
+    graph.subgraph(graph.known)
+
+
+def _setup_core(workers):
+    from graph_store import load_route_graph
+    graph = load_route_graph()
+    graph = graph.subgraph(graph.known)
+    return graph, workers
+
+
+def _run_all_pairs(ctx):
+    from hop_distance import all_pairs_hop_distribution
+    graph, workers = ctx
+    all_pairs_hop_distribution(graph, n_workers=workers)
+
+
+def _setup_undirected_core(workers):
+    from graph_store import load_route_graph
+    graph = load_route_graph().to_undirected()
+    labels = graph.component_labels()
+    return graph.subgraph(labels == np.bincount(labels).argmax()), workers
+
+
+def _run_louvain(ctx):
+    from community import consensus_communities
+    graph, workers = ctx
+    consensus_communities(graph, n_workers=workers)
+
+
+def _setup_undirected(workers):
+    from graph_store import load_route_graph
+    return load_route_graph().to_undirected(), workers
+
+
+def _run_attack(ctx):
+    # 07 的主要耗时在随机失效的蒙特卡洛集合上，这里调用同一个函数，只是试验次数较少
+    from percolation import percolation_curve, degree_order, adaptive_degree_order, random_failure_ensemble
+    graph, workers = ctx
+    random_failure_ensemble(graph, n_trials=ATTACK_TRIALS, seed=0, n_workers=workers)
+    percolation_curve(graph, degree_order(graph))
+    percolation_curve(graph, adaptive_degree_order(graph))
+
+
+def _setup_directed(workers):
+    from graph_store import load_route_graph
+    return load_route_graph(), workers
+
+
+def _run_centrality(ctx):
+    from centrality import pagerank, sampled_centrality
+    graph, workers = ctx
+    pagerank(graph)
+    sampled_centrality(graph, n_workers=workers)
+
+
+STAGES = [
+    Stage('load', _setup_none, _run_load, "读取列式缓存 + 打开图缓存"),
+    Stage('graph_build', _setup_none, _run_graph_build, "从数据表构建 CSR 图 (不走缓存)"),
+    Stage('all_pairs_bfs', _setup_core, _run_all_pairs, "08: 全源位图 BFS"),
+    Stage('louvain', _setup_undirected_core, _run_louvain, "09: 多种子加权 Louvain 共识"),
+    Stage('attack', _setup_undirected, _run_attack, f"07: {ATTACK_TRIALS} 次随机失效 + 蓄意 / 自适应攻击渗流曲线"),
+    Stage('centrality', _setup_directed, _run_centrality, "06: PageRank + 抽样介数 / 接近度"),
+]
+
+
+# ==========================================
+# 2. 计时与内存
+# ==========================================
+def measure(stage, repeats=REPEATS, workers=None):
+    """
+    :return: 该阶段的结果字典 (各次耗时、统计量、峰值内存)
+    """
+    ctx = stage.setup(workers)
+    stage.run(ctx)  # 预热：导入模块、填充缓存、操作系统页缓存
+
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        stage.run(ctx)
+        runs.append(time.perf_counter() - start)
+
+    # 峰值内存只统计当前进程 (进程池子进程里的分配不在其中)
+    tracemalloc.start()
+    stage.run(ctx)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'description': stage.description,
+        'runs_s': [round(t, 6) for t in runs],
+        'min_s': round(min(runs), 6),
+        'median_s': round(statistics.median(runs), 6),
+        'mean_s': round(statistics.fmean(runs), 6),
+        'peak_mb': round(peak / 2 ** 20, 3),
+    }
+
+
+def environment():
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'routes_file': table_path('routes'),
+    }
+
+
+# ==========================================
+# 3. 基线比较
+# ==========================================
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    :return: 回退的阶段列表 [(阶段名, 基线中位数, 当前中位数, 变化比例)]
+    """
+    regressions = []
+    for name, current in results['stages'].items():
+        base = baseline.get('stages', {}).get(name)
+        if base is None:
+            print(f"  - {name:<14} (基线中没有该阶段)")
+            continue
+        change = current['median_s'] / base['median_s'] - 1 if base['median_s'] > 0 else 0.0
+        regressed = change > threshold and current['median_s'] - base['median_s'] > MIN_DELTA_S
+        flag = '❌' if regressed else '✅'
+        print(f"  {flag} {name:<14} {base['median_s']:.4f}s -> {current['median_s']:.4f}s ({change:+.1%})")
+        if regressed:
+            regressions.append((name, base['median_s'], current['median_s'], change))
+    return regressions
+
+
+def run_benchmarks(stages=None, repeats=REPEATS, workers=None):
+    selected = [s for s in STAGES if stages is None or s.name in stages]
+    results = {'environment': environment(), 'repeats': repeats, 'workers': workers, 'stages': {}}
+    for stage in selected:
+        print(f"⏱️ {stage.name}: {stage.description} ...", flush=True)
+        results['stages'][stage.name] = r = measure(stage, repeats=repeats, workers=workers)
+        print(f"   中位数 {r['median_s']:.4f}s (最快 {r['min_s']:.4f}s)，峰值内存 {r['peak_mb']:.1f} MB")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="分阶段基准测试 (离线，使用仓库自带的 OpenFlights 数据)")
+    parser.add_argument('--stages', nargs='+', choices=[s.name for s in STAGES], help="只运行这些阶段")
+    parser.add_argument('--repeats', type=int, default=REPEATS, help="每个阶段的计时次数")
+    parser.add_argument('--workers', type=int, default=None, help="进程池大小 (默认 CPU 核数)")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="回退阈值 (0.2 = 慢 20%%)")
+    parser.add_argument('--output', default=RESULTS_FILE, help="结果 JSON 文件")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="基线 JSON 文件")
+    parser.add_argument('--save-baseline', action='store_true', help="把本次结果保存为新的基线")
+    args = parser.parse_args()
+
+    if not os.path.exists(table_path('routes')):
+        print("❌ 找不到清洗后的数据，请先运行 01_cleaning.py (或 run_pipeline.py)")
+        sys.exit(2)
+
+    results = run_benchmarks(args.stages, args.repeats, args.workers)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 结果已保存: {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"📌 已更新基线: {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"ℹ️ 没有基线文件 {args.baseline}，用 --save-baseline 创建")
+        sys.exit(0)
+
+    print(f"\n📊 与基线比较 (阈值 {args.threshold:.0%}):")
+    with open(args.baseline, encoding='utf-8') as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} 个阶段出现性能回退")
+        sys.exit(1)
+    print("\n🎉 没有发现性能回退")
@@ -0,0 +1,187 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# ==========================================
+# 近似中心性 (PageRank / 介数 / 接近度)
+# - PageRank：在 CSR 数组上做幂迭代，每轮只有一次 bincount
+# - 介数 / 接近度：随机抽取一部分源点 (pivot) 运行 Brandes 算法再按比例放大，
+#   每次 BFS 按层向量化，源点分批交给进程池
+# 距离按跳数计算 (与 networkx 默认的 weight=None 一致)
+# ==========================================
+
+# 误差界默认值：以 1 - DELTA 的概率，所有节点的归一化估计误差都不超过 EPSILON
+EPSILON = 0.1
+DELTA = 0.1
+
+# 每个进程任务包含的源点数
+SOURCES_PER_TASK = 32
+
+# 子进程里的图数组 (由 _init_worker 设置，避免每个任务重复传输)
+_ARRAYS = None
+
+
+# ==========================================
+# 1. PageRank (幂迭代)
+# ==========================================
+def pagerank(graph, alpha=0.85, weighted=True, tol=1.0e-10, max_iter=200):
+    """
+    :param graph: 有向 RouteGraph
+    :param alpha: 阻尼系数
+    :param weighted: 按航线重数 (航司数量) 分配跳转概率
+    :param tol: 收敛阈值 (L1 范数，与 networkx 相同按 N * tol 判断)
+    :return: 每个节点的 PageRank (float64，总和为 1)
+    """
+    n = graph.n_nodes
+    if n == 0:
+        return np.zeros(0)
+    src = graph.edge_sources()
+    w = np.asarray(graph.weights, dtype=np.float64) if weighted else np.ones(graph.n_edges)
+    out_w = np.bincount(src, weights=w, minlength=n)
+    dangling = out_w == 0
+    # 每条边的转移概率，只算一次
+    p = w / np.where(dangling, 1.0, out_w)[src]
+
+    x = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        x_new = alpha * np.bincount(graph.indices, weights=x[src] * p, minlength=n)
+        # 悬挂节点 (没有出边) 的概率和随机跳转一起均匀分配
+        x_new += (alpha * x[dangling].sum() + 1.0 - alpha) / n
+        if np.abs(x_new - x).sum() < n * tol:
+            return x_new
+        x = x_new
+    return x
+
+
+# ==========================================
+# 2. 抽样 Brandes (介数 + 接近度)
+# ==========================================
+def sample_size(n, epsilon=EPSILON, delta=DELTA):
+    """
+    Hoeffding 不等式 + 联合界：k >= ln(2N / delta) / (2 epsilon^2)
+    超过 N 时等于精确计算
+    """
+    if n <= 1:
+        return n
+    return min(n, math.ceil(math.log(2 * n / delta) / (2 * epsilon ** 2)))
+
+
+def _out_edges(indptr, indices, frontier):
+    """frontier 中所有节点的出边，返回 (起点, 终点) 两个数组"""
+    starts = indptr[frontier]
+    counts = indptr[frontier + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    return np.repeat(frontier, counts), indices[offsets]
+
+
+def _brandes(arrays, source):
+    """
+    单源 Brandes：逐层 BFS 计数最短路条数，再逆序累加依赖度
+    :return: (依赖度 delta, 跳数距离 (不可达为 -1))
+    """
+    indptr, indices = arrays
+    n = len(indptr) - 1
+    dist = np.full(n, -1, dtype=np.int64)
+    sigma = np.zeros(n)
+    dist[source] = 0
+    sigma[source] = 1.0
+
+    frontier = np.array([source], dtype=np.int64)
+    dag_levels = []
+    depth = 0
+    while len(frontier):
+        u, v = _out_edges(indptr, indices, frontier)
+        fresh = dist[v] == -1
+        dist[v[fresh]] = depth + 1
+        # 最短路 DAG 上的边：终点恰好在下一层
+        on_dag = dist[v] == depth + 1
+        u, v = u[on_dag], v[on_dag]
+        sigma += np.bincount(v, weights=sigma[u], minlength=n)
+        dag_levels.append((u, v))
+        frontier = np.unique(v)
+        depth += 1
+
+    delta = np.zeros(n)
+    for u, v in reversed(dag_levels):
+        delta += np.bincount(u, weights=sigma[u] / sigma[v] * (1.0 + delta[v]), minlength=n)
+    delta[source] = 0.0
+    return delta, dist
+
+
+def _init_worker(arrays):
+    global _ARRAYS
+    _ARRAYS = arrays
+
+
+def _brandes_batch(sources):
+    """
+    :return: (依赖度之和, 各节点被抽样源点到达的距离之和, 到达它的抽样源点数)
+    """
+    n = len(_ARRAYS[0]) - 1
+    dependency = np.zeros(n)
+    dist_sum = np.zeros(n)
+    reached = np.zeros(n)
+    for s in sources:
+        delta, dist = _brandes(_ARRAYS, int(s))
+        dependency += delta
+        ok = dist > 0
+        dist_sum[ok] += dist[ok]
+        reached[ok] += 1
+    return dependency, dist_sum, reached
+
+
+def sampled_centrality(graph, n_samples=None, epsilon=EPSILON, delta=DELTA, seed=0, n_workers=None):
+    """
+    抽样估计介数中心性与接近中心性 (Brandes & Pich 的 pivot 抽样)
+    抽样数等于节点数时结果与 networkx 的精确算法一致
+
+    :param graph: 有向 RouteGraph (无向图请先 to_undirected)
+    :param n_samples: 抽样源点数，默认按 epsilon / delta 由 sample_size 决定
+    :param n_workers: 进程数，默认 CPU 核数；为 1 时在当前进程内计算
+    :return: (归一化介数, 接近度 (Wasserman-Faust 修正，按“到达该节点”的距离), 实际抽样数)
+    """
+    n = graph.n_nodes
+    if n_samples is None:
+        n_samples = sample_size(n, epsilon, delta)
+    n_samples = min(n_samples, n)
+    if n_samples == 0:
+        return np.zeros(n), np.zeros(n), 0
+
+    rng = np.random.default_rng(seed)
+    sources = np.sort(rng.choice(n, size=n_samples, replace=False))
+    arrays = (np.asarray(graph.indptr, dtype=np.int64), np.asarray(graph.indices, dtype=np.int64))
+    batches = [sources[i:i + SOURCES_PER_TASK] for i in range(0, len(sources), SOURCES_PER_TASK)]
+
+    n_workers = n_workers or os.cpu_count() or 1
+    if n_workers == 1 or len(batches) <= 1:
+        _init_worker(arrays)
+        results = map(_brandes_batch, batches)
+        dependency, dist_sum, reached = _sum_results(results, n)
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(arrays,)) as pool:
+            dependency, dist_sum, reached = _sum_results(pool.map(_brandes_batch, batches), n)
+
+    # 介数：按抽样比例放大到全部源点，再按有向图的 (N-1)(N-2) 归一化
+    betweenness = dependency * (n / n_samples)
+    if n > 2:
+        betweenness /= (n - 1) * (n - 2)
+
+    # 接近度 = (1 / 平均距离) × (能到达该节点的源点比例)
+    # 节点自身被抽中时不算作它自己的源点
+    in_sample = np.zeros(n, dtype=bool)
+    in_sample[sources] = True
+    other_sources = n_samples - in_sample
+    closeness = np.zeros(n)
+    ok = (dist_sum > 0) & (other_sources > 0)
+    closeness[ok] = (reached[ok] / dist_sum[ok]) * (reached[ok] / other_sources[ok])
+    return betweenness, closeness, n_samples
+
+
+def _sum_results(results, n):
+    total = [np.zeros(n), np.zeros(n), np.zeros(n)]
+    for part in results:
+        for acc, arr in zip(total, part):
+            acc += arr
+    return total
@@ -0,0 +1,230 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# ==========================================
+# 加权 Louvain 社团检测 + 多种子共识
+# 局部移动阶段直接在 CSR 数组 (Python 列表) 上扫描，
+# 社团聚合阶段用 NumPy 把同一社团的边合并成“超级节点”之间的加权边，
+# 多个随机种子分给进程池并行运行，最后基于“同社团频率”构建共识划分。
+# ==========================================
+
+# 默认运行的种子数
+N_SEEDS = 16
+
+# 共识图中保留的最低同社团频率 (低于它的边视为偶然分到一起)
+CONSENSUS_THRESHOLD = 0.5
+
+# 子进程里的图数组 (由 _init_worker 设置，避免每个任务重复传输)
+_ARRAYS = None
+
+
+# ==========================================
+# 1. 单次 Louvain
+# ==========================================
+def _local_moving(indptr, indices, weights, resolution, rng):
+    """
+    局部移动：逐个把节点移到模块度增益最大的邻居社团，直到没有节点可以移动
+    自环 (聚合后表示社团内部的边) 计入节点强度，但不参与选择目标社团
+    :return: 每个节点所属社团的下标 (int64 数组，未重新编号)
+    """
+    n = len(indptr) - 1
+    strength = np.bincount(np.repeat(np.arange(n), np.diff(indptr)), weights=weights, minlength=n)
+    m2 = float(strength.sum())
+    if m2 == 0:
+        return np.arange(n)
+
+    indptr_l = indptr.tolist()
+    indices_l = indices.tolist()
+    weights_l = weights.tolist()
+    k = strength.tolist()
+    tot = list(k)
+    comm = list(range(n))
+
+    # 快速局部移动 (Leiden 的做法)：第一轮按随机顺序访问所有节点，
+    # 之后只重新检查“邻居刚刚换了社团”的节点，而不是每轮都扫描全图
+    queue = deque(rng.permutation(n).tolist())
+    queued = [True] * n
+    while queue:
+        i = queue.popleft()
+        queued[i] = False
+        ci = comm[i]
+        ki = k[i]
+        # 邻居社团 -> 连向该社团的权重
+        links = {}
+        for p in range(indptr_l[i], indptr_l[i + 1]):
+            j = indices_l[p]
+            if j != i:
+                c = comm[j]
+                links[c] = links.get(c, 0.0) + weights_l[p]
+
+        tot[ci] -= ki
+        scale = resolution * ki / m2
+        best, best_gain = ci, links.get(ci, 0.0) - tot[ci] * scale
+        for c, w in links.items():
+            gain = w - tot[c] * scale
+            if gain > best_gain + 1e-12:
+                best, best_gain = c, gain
+        tot[best] += ki
+        if best != ci:
+            comm[i] = best
+            for p in range(indptr_l[i], indptr_l[i + 1]):
+                j = indices_l[p]
+                if not queued[j] and comm[j] != best:
+                    queued[j] = True
+                    queue.append(j)
+
+    return np.asarray(comm, dtype=np.int64)
+
+
+def _aggregate(indptr, indices, weights, membership, n_comm):
+    """把同一社团的节点合并成一个超级节点，社团之间的边权重相加 (内部边变成自环)"""
+    src = np.repeat(membership, np.diff(indptr))
+    dst = membership[indices]
+    key, inverse = np.unique(src * n_comm + dst, return_inverse=True)
+    merged = np.bincount(inverse, weights=weights, minlength=len(key))
+    new_src = key // n_comm
+    new_indptr = np.zeros(n_comm + 1, dtype=np.int64)
+    np.cumsum(np.bincount(new_src, minlength=n_comm), out=new_indptr[1:])
+    return new_indptr, (key % n_comm).astype(np.int64), merged
+
+
+def louvain(arrays, seed=0, resolution=1.0):
+    """
+    加权 Louvain 社团检测
+    :param arrays: (indptr, indices, weights)，对称的无向邻接表 (见 community_arrays)
+    :param seed: 随机种子，决定节点的访问顺序
+    :param resolution: 分辨率参数，越大社团越小
+    :return: 每个节点的社团编号 (int32，按社团大小从大到小编号为 0, 1, 2, ...)
+    """
+    indptr, indices, weights = arrays
+    rng = np.random.default_rng(seed)
+    membership = np.arange(len(indptr) - 1)
+
+    while True:
+        comm = _local_moving(indptr, indices, weights, resolution, rng)
+        _, comm = np.unique(comm, return_inverse=True)
+        n_comm = int(comm.max()) + 1 if len(comm) else 0
+        membership = comm[membership]
+        if n_comm == len(indptr) - 1:
+            break  # 这一层没有任何合并，收敛
+        indptr, indices, weights = _aggregate(indptr, indices, weights, comm, n_comm)
+
+    return relabel_by_size(membership)
+
+
+def relabel_by_size(membership):
+    """社团重新编号：最大的社团为 0 (同样大小时按首次出现的节点排序)"""
+    _, first, inverse, sizes = np.unique(membership, return_index=True, return_inverse=True, return_counts=True)
+    rank = np.empty(len(sizes), dtype=np.int32)
+    rank[np.lexsort((first, -sizes))] = np.arange(len(sizes), dtype=np.int32)
+    return rank[inverse]
+
+
+def modularity(arrays, membership, resolution=1.0):
+    """加权模块度 Q"""
+    indptr, indices, weights = arrays
+    weights = np.asarray(weights, dtype=np.float64)
+    src = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    m2 = weights.sum()
+    if m2 == 0:
+        return 0.0
+    internal = weights[membership[src] == membership[indices]].sum()
+    tot = np.bincount(membership[src], weights=weights)
+    return float(internal / m2 - resolution * (tot ** 2).sum() / m2 ** 2)
+
+
+def community_arrays(graph, weighted=True):
+    """
+    :param graph: 无向 RouteGraph (见 RouteGraph.to_undirected)
+    :param weighted: True 时用航线重数 (航司数量) 作为边权重，否则所有边权重为 1
+    :return: (indptr, indices, weights)
+    """
+    weights = graph.weights if weighted else np.ones(graph.n_edges)
+    return (np.asarray(graph.indptr, dtype=np.int64), np.asarray(graph.indices, dtype=np.int64),
+            np.asarray(weights, dtype=np.float64))
+
+
+# ==========================================
+# 2. 多种子并行
+# ==========================================
+def _init_worker(arrays):
+    global _ARRAYS
+    _ARRAYS = arrays
+
+
+def _louvain_task(args):
+    seed, resolution = args
+    return louvain(_ARRAYS, seed=seed, resolution=resolution)
+
+
+def multi_seed_louvain(arrays, seeds, resolution=1.0, n_workers=None):
+    """
+    :param seeds: 随机种子列表
+    :param n_workers: 进程数，默认 CPU 核数；为 1 时在当前进程内计算
+    :return: (种子数, 节点数) 的 int32 矩阵，每行是一次运行的划分
+    """
+    tasks = [(seed, resolution) for seed in seeds]
+    n_workers = n_workers or os.cpu_count() or 1
+
+    if n_workers == 1 or len(tasks) <= 1:
+        _init_worker(arrays)
+        return np.stack([_louvain_task(t) for t in tasks])
+
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(arrays,)) as pool:
+        return np.stack(list(pool.map(_louvain_task, tasks)))
+
+
+# ==========================================
+# 3. 共识划分与稳定性
+# ==========================================
+def co_assignment(arrays, partitions):
+    """每条边的两个端点在多少比例的运行中被分进同一社团"""
+    indptr, indices, _ = arrays
+    src = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    return (partitions[:, src] == partitions[:, indices]).mean(axis=0)
+
+
+def stability(consensus, partitions):
+    """
+    节点稳定性：在每次运行中，该节点与其共识社团里多大比例的成员同处一个社团，再对所有运行取平均
+    1.0 表示每个种子都把它和共识社团完整地分在一起；数值低说明它处在社团边界上
+    """
+    n = len(consensus)
+    n_cons = int(consensus.max()) + 1 if n else 0
+    cons_size = np.bincount(consensus, minlength=n_cons)
+    score = np.zeros(n)
+    for run in partitions:
+        # (共识社团, 本次社团) 列联表：同一格子里的节点互相“同组”
+        key = consensus.astype(np.int64) * (int(run.max()) + 1) + run
+        _, inverse, counts = np.unique(key, return_inverse=True, return_counts=True)
+        score += counts[inverse] / cons_size[consensus]
+    return score / max(len(partitions), 1)
+
+
+def consensus_communities(graph, n_seeds=N_SEEDS, resolution=1.0, weighted=True,
+                          threshold=CONSENSUS_THRESHOLD, n_workers=None):
+    """
+    多种子共识社团检测
+    1. 用 n_seeds 个种子并行运行加权 Louvain
+    2. 以“同社团频率”重新给边赋权，删掉频率低于 threshold 的边，得到共识图
+    3. 在共识图上再跑一次 Louvain (种子 0) 作为最终划分，并计算每个节点的稳定性
+
+    :param graph: 无向 RouteGraph
+    :return: (共识划分, 稳定性, 每次运行的划分矩阵)
+    """
+    arrays = community_arrays(graph, weighted=weighted)
+    partitions = multi_seed_louvain(arrays, range(n_seeds), resolution=resolution, n_workers=n_workers)
+
+    indptr, indices, weights = arrays
+    agreement = co_assignment(arrays, partitions)
+    keep = agreement >= threshold
+    src = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    consensus_indptr = np.zeros_like(indptr)
+    np.cumsum(np.bincount(src[keep], minlength=len(indptr) - 1), out=consensus_indptr[1:])
+    consensus_arrays = (consensus_indptr, indices[keep], weights[keep] * agreement[keep])
+
+    consensus = louvain(consensus_arrays, seed=0, resolution=resolution)
+    return consensus, stability(consensus, partitions), partitions
@@ -1,50 +1,49 @@
-import pandas as pd
+import json
+import os
+
+from data_store import read_table
+
+# ==========================================
+# 数据质量报告 (只读)
+# 校验规则已经合并进 01_cleaning.py，在解析时直接应用，被拒绝的行写在 <表名>_rejected.csv。
+# 这个脚本不再改写清洗结果，只检查规则是否成立并汇总拒绝情况。
+# ==========================================
+MANIFEST_FILE = 'cleaning_manifest.json'
 
 # ==========================================
 # 1. 检查 Airports (机场数据)
 # ==========================================
 print("\n🔍 正在检查 Airports 数据...")
-df_airports = pd.read_csv('airports_cleaned.csv')
-
-# 查看缺失情况
-print("原始缺失值统计：")
-print(df_airports[['Name', 'City', 'Country', 'IATA', 'ICAO']].isnull().sum())
+df_airports = read_table('airports', columns=['Name', 'City', 'Country', 'IATA', 'ICAO'])
 
-# 【处理策略】
-# 如果 'IATA' 代码缺失，我们后续没法做关联分析（它是连接航线的钥匙）
-# 所以我们要删除那些 IATA 为空，或者只有 '\N' (数据源里的空值标记) 的行
-# 注意：OpenFlights 数据里有时候用 "\N" 表示空
-df_airports = df_airports[df_airports['IATA'] != '\\N']
-df_airports = df_airports.dropna(subset=['IATA', 'Country'])
+print("缺失值统计：")
+print(df_airports.isnull().sum())
 
-print(f"✅ 处理后保留有效机场：{len(df_airports)} 个 (删除了无代码的机场)")
-# 保存回 CSV，供下一步使用
-df_airports.to_csv('airports_cleaned.csv', index=False)
+# IATA 与 Country 缺失的机场应该已经在清洗阶段被拒绝
+bad_airports = df_airports[['IATA', 'Country']].isnull().any(axis=1).sum()
+print(f"✅ 有效机场：{len(df_airports)} 个" if bad_airports == 0
+      else f"❌ 仍有 {bad_airports} 个机场缺少 IATA / Country，请重新运行 01_cleaning.py")
 
 
 # ==========================================
 # 2. 检查 Routes (航线数据)
 # ==========================================
 print("\n🔍 正在检查 Routes 数据...")
-df_routes = pd.read_csv('routes_cleaned.csv')
+df_routes = read_table('routes')
 
-print("原始缺失值统计：")
+print("缺失值统计：")
 print(df_routes.isnull().sum())
 
-# 【处理策略】
-# 航线数据里，最重要的是 Source airport (出发地) and Destination airport (目的地)
-# 如果这两个都没有，这显就是无效数据
-df_routes = df_routes.dropna(subset=['Source airport', 'Destination airport'])
-
-print(f"✅ 处理后保留有效航线：{len(df_routes)} 条")
-df_routes.to_csv('routes_cleaned.csv', index=False)
+bad_routes = df_routes[['Source airport', 'Destination airport']].isnull().any(axis=1).sum()
+print(f"✅ 有效航线：{len(df_routes)} 条" if bad_routes == 0
+      else f"❌ 仍有 {bad_routes} 条航线缺少出发地 / 目的地，请重新运行 01_cleaning.py")
 
 
 # ==========================================
 # 3. 检查 Airlines (航司数据)
 # ==========================================
 print("\n🔍 正在检查 Airlines 数据...")
-df_airlines = pd.read_csv('airlines_cleaned.csv')
+df_airlines = read_table('airlines', columns=['Airline ID', 'Active'])
 
 # 【处理策略】
 # 我们只关心 'Active' (活跃) 的航空公司
@@ -55,4 +54,15 @@ print(f"ℹ️ 其中活跃的航空公司有：{active_count} 家")
 # 这里我们暂时不删数据，只是心里有数就行，
 # 因为后面分析时我们可以用代码筛选 df_airlines[df_airlines['Active']=='Y']
 
-print("\n🎉 数据治理完成！关键缺失值已处理，文件已更新。")
\ No newline at end of file
+
+# ==========================================
+# 4. 清洗清单：每张表保留 / 拒绝的行数
+# ==========================================
+if os.path.exists(MANIFEST_FILE):
+    print("\n📋 清洗清单:")
+    with open(MANIFEST_FILE, encoding='utf-8') as f:
+        manifest = json.load(f)
+    for table, entry in manifest.items():
+        print(f"  - {table}: 保留 {entry['rows']} 行, 拒绝 {entry['rejected']} 行 (输入 {entry['input']})")
+
+print("\n🎉 数据质量检查完成！")
@@ -0,0 +1,137 @@
+import os
+
+import pandas as pd
+
+# Parquet 依赖 pyarrow；没有安装时退回到 CSV (读取时按同一份 schema 转换类型)
+try:
+    import pyarrow  # noqa: F401
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+# ==========================================
+# 1. 表结构 (schema)
+#    - ID 类列: 可空整数 Int32 ('\N' -> <NA>，不再变成 float / object)
+#    - 重复度高的短字符串 (国家、航司代码、IATA 等): category
+#    - 经纬度等: float32
+# ==========================================
+SCHEMAS = {
+    'airports': {
+        'Airport ID': 'Int32', 'Name': 'string', 'City': 'category', 'Country': 'category',
+        'IATA': 'category', 'ICAO': 'category', 'Latitude': 'float32', 'Longitude': 'float32',
+        'Altitude': 'Int32', 'Timezone': 'float32', 'DST': 'category',
+        'Tz database time zone': 'category', 'Type': 'category', 'Source': 'category',
+    },
+    'airlines': {
+        'Airline ID': 'Int32', 'Name': 'string', 'Alias': 'string', 'IATA': 'category',
+        'ICAO': 'category', 'Callsign': 'string', 'Country': 'category', 'Active': 'category',
+    },
+    'routes': {
+        'Airline': 'category', 'Airline ID': 'Int32', 'Source airport': 'category',
+        'Source airport ID': 'Int32', 'Destination airport': 'category',
+        'Destination airport ID': 'Int32', 'Codeshare': 'category', 'Stops': 'Int8',
+        'Equipment': 'category',
+    },
+    'planes': {
+        'Name': 'string', 'IATA': 'category', 'ICAO': 'category',
+    },
+    'countries': {
+        'Name': 'string', 'iso_code': 'category', 'dafif_code': 'category',
+    },
+}
+# airports-extended.dat 与 airports.dat 列相同，另含火车站、轮渡码头等非机场节点 (按需解析，见 extended_airports.py)
+SCHEMAS['airports_extended'] = SCHEMAS['airports']
+
+# 表名 -> 输出文件名前缀 (生成 xxx_cleaned.csv 与 xxx_cleaned.parquet)
+TABLE_FILES = {name: f"{name}_cleaned" for name in SCHEMAS}
+
+
+def csv_path(table):
+    return f"{TABLE_FILES[table]}.csv"
+
+
+def parquet_path(table):
+    return f"{TABLE_FILES[table]}.parquet"
+
+
+def table_path(table):
+    """当前实际承载该表的文件 (优先 Parquet)"""
+    if HAS_PARQUET and os.path.exists(parquet_path(table)):
+        return parquet_path(table)
+    return csv_path(table)
+
+
+# ==========================================
+# 2. 类型转换 (全项目唯一一处 to_numeric 强制转换)
+# ==========================================
+def apply_schema(df, table):
+    """
+    按 schema 转换列类型，无法解析的数值统一变成 <NA>
+    :param df: 原始 DataFrame (可以只包含部分列)
+    :param table: 表名，见 SCHEMAS
+    """
+    schema = SCHEMAS[table]
+    df = df.copy()
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        if dtype.startswith(('Int', 'float')):
+            values = pd.to_numeric(df[col], errors='coerce')
+            df[col] = values.astype(dtype)
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+# ==========================================
+# 3. 读写
+# ==========================================
+def write_table(df, table, row_group_size=None):
+    """
+    写出清洗后的表：CSV (便于人工查看) + Parquet (带类型的列式缓存，供分析脚本读取)
+    :param row_group_size: Parquet 每个行组的行数；数据按过滤列排好序时，小行组能让 read_table 的 filters 跳过整组
+    :return: 写出的文件列表
+    """
+    df = apply_schema(df, table)
+    df.to_csv(csv_path(table), index=False, encoding='utf-8')
+    outputs = [csv_path(table)]
+    if HAS_PARQUET:
+        df.to_parquet(parquet_path(table), index=False, row_group_size=row_group_size)
+        outputs.append(parquet_path(table))
+    return outputs
+
+
+def read_table(table, columns=None, filters=None):
+    """
+    读取清洗后的表 (带类型)
+    :param table: 表名，见 SCHEMAS
+    :param columns: 只读取这些列 (Parquet 列裁剪，未用到的列不会被解码)
+    :param filters: 行过滤条件 [(列名, 运算符, 值), ...]，条件之间为“且”；
+                    运算符为 ==, !=, <, <=, >, >=, in, not in。
+                    Parquet 按行组统计信息跳过不满足的行组，只有满足条件的行会转换成 DataFrame
+    """
+    path = table_path(table)
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=columns, filters=filters or None)
+    # 退回 CSV：只解析需要的列 (包括过滤用的列)，再按 schema 转换、过滤
+    if not filters:
+        return apply_schema(pd.read_csv(path, usecols=columns), table)
+    usecols = None if columns is None else list(dict.fromkeys(list(columns) + [f[0] for f in filters]))
+    df = apply_schema(pd.read_csv(path, usecols=usecols), table)
+    df = df[_filter_mask(df, filters)].reset_index(drop=True)
+    return df if columns is None else df[list(columns)]
+
+
+def _filter_mask(df, filters):
+    """与 pyarrow 的 filters 语义一致 (缺失值不满足任何条件)"""
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in filters:
+        values = df[col]
+        if op in ('in', 'not in'):
+            hit = values.isin(list(value))
+            hit = hit if op == 'in' else ~hit
+        else:
+            hit = {'==': values.__eq__, '!=': values.__ne__, '<': values.__lt__, '<=': values.__le__,
+                   '>': values.__gt__, '>=': values.__ge__}[op](value)
+        mask &= hit.fillna(False).astype(bool) & values.notna()
+    return mask
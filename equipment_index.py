@@ -0,0 +1,170 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from data_store import read_table, table_path
+from graph_store import CACHE_DIR, file_digest, load_arrays, save_arrays
+
+# ==========================================
+# 航线 <-> 机型 索引
+# routes 表的 Equipment 列是空格分隔的机型代码 (如 "320 738")。该列是 category，
+# 不同取值只有几千种，所以只拆分这几千个类别字符串，再用一次稀疏矩阵乘法展开到每条航线：
+#   R (航线 x 类别，每行一个 1) · C (类别 x 机型) = 航线 x 机型
+# 机型代码与 planes 表的 IATA 代码关联 (查不到时再试 ICAO)。
+# 结果按航线表与机型表的内容哈希缓存在 graph_cache/equipment_<哈希>/ 下。
+# ==========================================
+
+# 缓存的数组
+EQUIPMENT_ARRAYS = ['codes', 'names', 'icao', 'route_airline', 'indptr', 'indices']
+
+# 没有 Airline ID 的航线记录
+UNKNOWN_AIRLINE = -1
+
+
+class EquipmentIndex:
+    """
+    航线 x 机型 的 0/1 稀疏矩阵，行与 read_table('routes') 的行一一对应
+
+    :param codes: 机型编号 -> 航线表里出现的机型代码 (升序)
+    :param names: 机型全称 (planes 表里查不到时为空字符串)
+    :param icao: 机型的 ICAO 代码 (查不到时为空字符串)
+    :param route_airline: 每条航线的 Airline ID (缺失为 -1)
+    :param matrix: 航线 x 机型 的 CSR 矩阵
+    """
+
+    def __init__(self, codes, names, icao, route_airline, matrix):
+        self.codes = codes
+        self.names = names
+        self.icao = icao
+        self.route_airline = route_airline
+        self.matrix = matrix
+        self._by_aircraft = None
+
+    @property
+    def n_routes(self):
+        return self.matrix.shape[0]
+
+    @property
+    def n_aircraft(self):
+        return len(self.codes)
+
+    def code_index(self, code):
+        """机型代码 (IATA 或 ICAO) -> 机型编号，找不到时为 -1"""
+        pos = int(np.searchsorted(self.codes, code))
+        if pos < self.n_aircraft and self.codes[pos] == code:
+            return pos
+        matches = np.flatnonzero(self.icao == code)
+        return int(matches[0]) if len(matches) else -1
+
+    def routes_with(self, code):
+        """使用该机型的航线 (航线表中的行号)"""
+        j = self.code_index(code)
+        if j < 0:
+            return np.zeros(0, dtype=np.int64)
+        # 按列查询用 CSC，首次查询时转换一次
+        if self._by_aircraft is None:
+            self._by_aircraft = self.matrix.tocsc()
+        csc = self._by_aircraft
+        return np.asarray(csc.indices[csc.indptr[j]:csc.indptr[j + 1]], dtype=np.int64)
+
+    def group_counts(self, groups, n_groups=None):
+        """
+        每组航线里各机型出现的航线数 (例如航司 x 机型)
+        :param groups: 每条航线的组编号 0..G-1，负数表示不计入任何组
+        :return: (组数, 机型数) 的 CSR 矩阵
+        """
+        groups = np.asarray(groups, dtype=np.int64)
+        rows = np.flatnonzero(groups >= 0)
+        n_groups = n_groups if n_groups is not None else int(groups.max()) + 1 if len(rows) else 0
+        membership = sparse.csr_matrix((np.ones(len(rows), dtype=np.int64), (groups[rows], rows)),
+                                       shape=(n_groups, self.n_routes))
+        return (membership @ self.matrix).tocsr()
+
+    def airline_mix(self, airline_id):
+        """
+        某家航司的机型构成
+        :return: DataFrame (Code, Name, ICAO, Routes)，按 Routes 降序
+        """
+        counts = np.asarray(self.matrix[self.route_airline == airline_id].sum(axis=0)).ravel()
+        used = np.flatnonzero(counts)
+        order = used[np.argsort(-counts[used], kind='stable')]
+        return pd.DataFrame({'Code': self.codes[order], 'Name': self.names[order], 'ICAO': self.icao[order],
+                             'Routes': counts[order]})
+
+
+# ==========================================
+# 1. 构建 (只在缓存失效时执行)
+# ==========================================
+def build_equipment_index():
+    df = read_table('routes', columns=['Airline ID', 'Equipment'])
+    equipment = df['Equipment'].astype('category')
+    categories = equipment.cat.categories.astype(str)
+
+    # 只拆分不同的类别字符串 (几千个)，而不是每一行
+    tokens = categories.str.split()
+    lengths = tokens.str.len().to_numpy(dtype=np.int64)
+    flat = np.concatenate(tokens.to_list()) if len(tokens) else np.zeros(0, dtype=str)
+    codes, token_code = np.unique(flat, return_inverse=True)
+    # 同一类别里重复的代码只算一次
+    by_category = sparse.csr_matrix((np.ones(len(flat), dtype=np.int8),
+                                     (np.repeat(np.arange(len(categories)), lengths), token_code)),
+                                    shape=(len(categories), len(codes)))
+    by_category.sum_duplicates()
+    by_category.data[:] = 1
+
+    # 航线 -> 类别 (Equipment 缺失的航线为空行)
+    cat_codes = equipment.cat.codes.to_numpy(dtype=np.int64)
+    rows = np.flatnonzero(cat_codes >= 0)
+    by_route = sparse.csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, cat_codes[rows])),
+                                 shape=(len(df), len(categories)))
+    matrix = (by_route @ by_category).tocsr()
+    matrix.sort_indices()
+
+    names, icao = _match_planes(codes)
+    route_airline = df['Airline ID'].to_numpy(dtype=np.int32, na_value=UNKNOWN_AIRLINE)
+    return EquipmentIndex(codes, names, icao, route_airline, matrix)
+
+
+def _match_planes(codes):
+    """
+    机型代码 -> (全称, ICAO)
+    先按 IATA 关联，查不到再按 ICAO；多个机型共用一个 IATA 代码时 (如 CNJ 覆盖多款 Citation) 取表中第一条
+    """
+    planes = read_table('planes', columns=['Name', 'IATA', 'ICAO'])
+    names = np.full(len(codes), '', dtype=object)
+    icao = np.full(len(codes), '', dtype=object)
+    for key in ['IATA', 'ICAO']:
+        table = planes.dropna(subset=[key]).drop_duplicates(subset=[key])
+        table_codes = table[key].astype(str).to_numpy()
+        order = np.argsort(table_codes)
+        pos = np.clip(np.searchsorted(table_codes[order], codes), 0, max(len(order) - 1, 0))
+        found = (table_codes[order][pos] == codes) & (names == '') if len(order) else np.zeros(len(codes), bool)
+        rows = order[pos[found]]
+        names[found] = table['Name'].astype(str).to_numpy()[rows]
+        icao[found] = table['ICAO'].astype(object).fillna('').astype(str).to_numpy()[rows]
+    return names.astype(str), icao.astype(str)
+
+
+# ==========================================
+# 2. 磁盘缓存
+# ==========================================
+def load_equipment_index(cache_dir=CACHE_DIR):
+    """
+    打开 (或首次生成) 航线 x 机型 索引
+    :return: EquipmentIndex (数组为只读内存映射)
+    """
+    key = file_digest([table_path('routes'), table_path('planes')])
+    target = os.path.join(cache_dir, f"equipment_{key}")
+    if not os.path.isdir(target):
+        index = build_equipment_index()
+        save_arrays(target, {'codes': index.codes, 'names': index.names, 'icao': index.icao,
+                             'route_airline': index.route_airline,
+                             'indptr': index.matrix.indptr, 'indices': index.matrix.indices})
+
+    arrays = load_arrays(target, EQUIPMENT_ARRAYS)
+    indices = arrays['indices']
+    matrix = sparse.csr_matrix((np.ones(len(indices), dtype=np.int8), indices, arrays['indptr']),
+                               shape=(len(arrays['indptr']) - 1, len(arrays['codes'])))
+    return EquipmentIndex(arrays['codes'], arrays['names'], arrays['icao'], arrays['route_airline'], matrix)
@@ -0,0 +1,65 @@
+import os
+
+import pandas as pd
+
+from data_store import SCHEMAS, read_table, table_path, write_table
+
+# ==========================================
+# airports-extended.dat 的按需加载
+# 该文件在机场之外还包含火车站 (station)、轮渡码头 (port) 等约 1.2 万个节点，默认的分析流程用不到，
+# 所以 01_cleaning.py 不处理它：第一次有人读取时才解析一次，写入带类型的列式缓存
+# (airports_extended_cleaned.csv / .parquet)，原始文件更新后自动重新解析。
+# 缓存按 (Type, Source, Latitude) 排序并分成小行组，Type / Source / 纬度范围的过滤条件下推到
+# Parquet 读取，不满足条件的行组直接跳过，只有需要的行会转换成 DataFrame。
+# ==========================================
+RAW_FILE = 'airports-extended.dat'
+TABLE = 'airports_extended'
+
+# 排序键：过滤最常用的列放在前面，行组的统计信息才有区分度
+CLUSTER_KEYS = ['Type', 'Source', 'Latitude']
+ROW_GROUP_SIZE = 1024
+
+# 非机场节点的类型
+NON_AIRPORT_TYPES = ('station', 'port', 'unknown')
+
+
+def _parse_raw():
+    # 与 01_cleaning.py 相同的读法；列数不对的行 (名称里多了逗号) 直接跳过
+    df = pd.read_csv(RAW_FILE, header=None, names=list(SCHEMAS[TABLE]), na_values=['\\N', '-'],
+                     encoding='utf-8', on_bad_lines='skip')
+    # 部分旧记录没有 Type / Source
+    df['Type'] = df['Type'].fillna('unknown')
+    return df.sort_values(CLUSTER_KEYS, kind='stable').reset_index(drop=True)
+
+
+def ensure_extended_table():
+    """
+    需要时 (缓存不存在或比原始文件旧) 解析 airports-extended.dat 并写入缓存
+    :return: 缓存文件路径
+    """
+    path = table_path(TABLE)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(RAW_FILE):
+        return path
+    write_table(_parse_raw(), TABLE, row_group_size=ROW_GROUP_SIZE)
+    return table_path(TABLE)
+
+
+def read_extended_airports(types=None, sources=None, bbox=None, columns=None):
+    """
+    读取 airports-extended 中满足条件的行
+    :param types: 只要这些 Type (如 ('station', 'port'))，None 表示不限
+    :param sources: 只要这些 Source (如 ('OurAirports',))，None 表示不限
+    :param bbox: (最小经度, 最大经度, 最小纬度, 最大纬度)，不支持跨越 ±180° 经线的范围
+    :param columns: 只读取这些列
+    """
+    ensure_extended_table()
+    filters = []
+    if types is not None:
+        filters.append(('Type', 'in', list(types)))
+    if sources is not None:
+        filters.append(('Source', 'in', list(sources)))
+    if bbox is not None:
+        lon0, lon1, lat0, lat1 = bbox
+        filters += [('Latitude', '>=', lat0), ('Latitude', '<=', lat1),
+                    ('Longitude', '>=', lon0), ('Longitude', '<=', lon1)]
+    return read_table(TABLE, columns=columns, filters=filters)
@@ -0,0 +1,267 @@
+import argparse
+import os
+import shutil
+import string
+
+import numpy as np
+import pandas as pd
+
+from data_store import SCHEMAS
+
+# ==========================================
+# 合成 OpenFlights 数据 (扩容测试用)
+# 以真实的 airports.dat / routes.dat 为模板，生成格式完全兼容的 10 倍 / 100 倍数据：
+#   - 地理聚集：新机场 = 随机一个真实机场 + 高斯抖动 (继承其国家、时区)
+#   - 重尾度分布：每个机场有一个帕累托分布的“吸引力”，按吸引力抽取航线端点
+#   - 大部分航线在国内 (同一国家内按吸引力抽取)，其余为枢纽之间的国际航线
+#   - 同一航线有多家航司运营，约 95% 的航线有回程
+#   - 与真实数据相近比例的 '\N' 缺失值
+# 同一个种子总是生成完全相同的文件
+# ==========================================
+SCALES = {'10x': 10, '100x': 100}
+
+# 真实 routes.dat 的规模与航司数 (按比例放大)
+BASE_ROUTES = 67663
+BASE_AIRLINES = 547
+
+# 新机场相对模板机场的位置抖动 (度)
+JITTER_DEG = 1.0
+
+# 有航线的机场比例 (真实数据中大约一半的机场没有任何航线)
+ACTIVE_FRACTION = 0.45
+
+# 吸引力 ~ Pareto(HUB_ALPHA)，越小尾巴越重；再在 HUB_CAP_QUANTILE 分位数处截断
+# (这组参数在 1 倍规模下的度分布与真实数据接近：最大枢纽约 450 条航线，中位数 6~8)
+HUB_ALPHA = 0.9
+HUB_CAP_QUANTILE = 0.99
+
+# 国内航线比例；国际航线的目的地按 吸引力^HUB_BOOST 抽取 (更偏向大枢纽)
+LOCAL_FRACTION = 0.75
+HUB_BOOST = 1.3
+
+# 有回程航线的比例；每条航线的航司数 ~ Geometric(MULTI_AIRLINE_P) (均值约 1.8)
+RETURN_FRACTION = 0.95
+MULTI_AIRLINE_P = 0.55
+
+# 缺失值与代码共享比例 (与真实数据相近)
+MISSING = {
+    'airport_iata': 0.21,
+    'airport_tz': 0.13,
+    'route_airline_id': 0.007,
+    'route_airport_id': 0.0033,
+}
+CODESHARE_FRACTION = 0.22
+
+# 原样复制的小表
+COPIED_FILES = ['planes.dat', 'countries.dat']
+
+
+def read_dat(path, table):
+    return pd.read_csv(path, header=None, names=list(SCHEMAS[table]), na_values=['\\N'],
+                       keep_default_na=False, encoding='utf-8', on_bad_lines='skip')
+
+
+def write_dat(df, path, quote_strings):
+    """
+    按 OpenFlights 的格式写出：无表头，缺失值写成 \\N (不加引号)
+    整列拼接字符串，不逐行循环 (100 倍规模时有几百万行)
+    """
+    columns = []
+    for col in df.columns:
+        values = df[col]
+        missing = values.isna()
+        text = values.astype(str)
+        if quote_strings and not pd.api.types.is_numeric_dtype(values):
+            text = '"' + text.str.replace('"', '""', regex=False) + '"'
+        columns.append(text.where(~missing, '\\N'))
+    lines = columns[0].str.cat(columns[1:], sep=',')
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('\n'.join(lines))
+        f.write('\n')
+
+
+def unique_codes(n, length, rng, alphabet=string.ascii_uppercase):
+    """n 个互不相同的代码：默认 length 位，组合数不够时加长"""
+    size = length
+    while len(alphabet) ** size < n:
+        size += 1
+    numbers = rng.choice(len(alphabet) ** size, size=n, replace=False)
+    digits = np.stack([(numbers // len(alphabet) ** k) % len(alphabet) for k in reversed(range(size))], axis=1)
+    return np.array(list(alphabet))[digits].view(f'<U{size}').ravel()
+
+
+def weighted_draw(cum, u):
+    """在累计权重 cum 上按 u (0 ~ cum[-1]) 抽取下标"""
+    return np.minimum(np.searchsorted(cum, u, side='right'), len(cum) - 1)
+
+
+# ==========================================
+# 1. 机场
+# ==========================================
+def make_airports(template, scale, rng):
+    n = int(round(len(template) * scale))
+    # 前 len(template) 个就是真实机场本身，其余是抖动后的“克隆”
+    parent = np.concatenate([np.arange(len(template)), rng.integers(0, len(template), n - len(template))])
+    base = template.iloc[parent].reset_index(drop=True)
+    clone = np.arange(n) >= len(template)
+
+    lat = base['Latitude'].to_numpy(dtype=np.float64)
+    lon = base['Longitude'].to_numpy(dtype=np.float64)
+    lat = np.where(clone, np.clip(lat + rng.normal(0, JITTER_DEG, n), -85, 85), lat)
+    lon = np.where(clone, (lon + rng.normal(0, JITTER_DEG, n) / np.cos(np.radians(lat)) + 180) % 360 - 180, lon)
+
+    iata = unique_codes(n, 3, rng)
+    icao = unique_codes(n, 4, rng)
+    df = pd.DataFrame({
+        'Airport ID': np.arange(1, n + 1),
+        'Name': np.where(clone, base['City'].fillna(base['Country']).astype(str) + ' Synthetic ' + pd.Series(np.arange(n)).astype(str),
+                         base['Name']),
+        'City': base['City'],
+        'Country': base['Country'],
+        'IATA': np.where(rng.random(n) < MISSING['airport_iata'], None, iata),
+        'ICAO': icao,
+        'Latitude': lat.round(6),
+        'Longitude': lon.round(6),
+        'Altitude': np.maximum(base['Altitude'].to_numpy(dtype=np.float64)
+                               + np.where(clone, rng.normal(0, 200, n), 0), -1000).round().astype(np.int64),
+        'Timezone': base['Timezone'],
+        'DST': base['DST'],
+        'Tz database time zone': base['Tz database time zone'].where(rng.random(n) >= MISSING['airport_tz']),
+        'Type': 'airport',
+        'Source': np.where(clone, 'Synthetic', base['Source']),
+    })
+    return df
+
+
+# ==========================================
+# 2. 航线
+# ==========================================
+def make_routes(airports, airlines, equipment, scale, rng):
+    n = len(airports)
+    # 吸引力：只有一部分机场有航线，吸引力服从重尾分布
+    weight = (rng.pareto(HUB_ALPHA, n) + 1.0) * (rng.random(n) < ACTIVE_FRACTION)
+    # 截断极端值：否则个别“超级枢纽”会连到一半的机场，真实网络里最大的枢纽也只有几百条航线
+    weight = np.minimum(weight, np.quantile(weight[weight > 0], HUB_CAP_QUANTILE))
+
+    # 同一国家的机场排在一起，便于在国家内部按权重抽样
+    country = pd.factorize(airports['Country'])[0]
+    order = np.argsort(country, kind='stable')
+    w_sorted = weight[order]
+    cum = np.cumsum(w_sorted)
+    c_sorted = country[order]
+    c_start = np.searchsorted(c_sorted, np.arange(country.max() + 1), side='left')
+    c_end = np.searchsorted(c_sorted, np.arange(country.max() + 1), side='right')
+    cum_before = np.concatenate([[0.0], cum])
+    hub_cum = np.cumsum(weight ** HUB_BOOST)
+
+    def draw_pairs(size):
+        src = order[weighted_draw(cum, rng.random(size) * cum[-1])]
+        local = rng.random(size) < LOCAL_FRACTION
+        dst = np.empty(size, dtype=np.int64)
+        # 国内：在出发机场所在国家的区间内按权重抽取
+        c = country[src[local]]
+        lo, hi = cum_before[c_start[c]], cum_before[c_end[c]]
+        dst[local] = order[weighted_draw(cum, lo + rng.random(local.sum()) * (hi - lo))]
+        # 国际：全局按 吸引力^HUB_BOOST 抽取
+        dst[~local] = weighted_draw(hub_cum, rng.random((~local).sum()) * hub_cum[-1])
+        # 去掉自环，再加上回程
+        keep = src != dst
+        src, dst = src[keep], dst[keep]
+        back = rng.random(len(src)) < RETURN_FRACTION
+        return np.concatenate([src * n + dst, dst[back] * n + src[back]])
+
+    # 目标：航线对数 × 平均航司数 ≈ 真实记录数 × scale
+    # 重尾分布下大量抽样会落在已有的枢纽航线上，所以一直补抽到不重复的航线对足够为止
+    target_pairs = int(BASE_ROUTES * scale * MULTI_AIRLINE_P)
+    keys = np.zeros(0, dtype=np.int64)
+    while len(keys) < target_pairs:
+        keys = np.union1d(keys, draw_pairs(int((target_pairs - len(keys)) * 1.2) + 16))
+    keys = np.sort(rng.choice(keys, size=target_pairs, replace=False))
+    src, dst = keys // n, keys % n
+
+    # 每个航线对的航司数，航司按规模 (同样重尾) 抽取
+    multiplicity = rng.geometric(MULTI_AIRLINE_P, len(src))
+    src, dst = np.repeat(src, multiplicity), np.repeat(dst, multiplicity)
+    airline_cum = np.cumsum(rng.pareto(HUB_ALPHA, len(airlines)) + 1.0)
+    airline = weighted_draw(airline_cum, rng.random(len(src)) * airline_cum[-1])
+
+    n_routes = len(src)
+    code = airports['IATA'].fillna(airports['ICAO']).to_numpy()
+    airport_id = airports['Airport ID'].to_numpy()
+    airline_ids = airlines['Airline ID'].to_numpy()
+
+    def with_gaps(values, rate):
+        values = values.astype(object)
+        values[rng.random(len(values)) < rate] = None
+        return values
+
+    return pd.DataFrame({
+        'Airline': airlines['IATA'].to_numpy()[airline],
+        'Airline ID': with_gaps(airline_ids[airline], MISSING['route_airline_id']),
+        'Source airport': code[src],
+        'Source airport ID': with_gaps(airport_id[src], MISSING['route_airport_id']),
+        'Destination airport': code[dst],
+        'Destination airport ID': with_gaps(airport_id[dst], MISSING['route_airport_id']),
+        'Codeshare': np.where(rng.random(n_routes) < CODESHARE_FRACTION, 'Y', ''),
+        'Stops': (rng.random(n_routes) < 2e-4).astype(np.int64),
+        'Equipment': equipment[rng.integers(0, len(equipment), n_routes)],
+    })
+
+
+# ==========================================
+# 3. 航司
+# ==========================================
+def make_airlines(countries, scale, rng):
+    n = int(round(BASE_AIRLINES * scale))
+    codes = unique_codes(n, 2, rng, alphabet=string.ascii_uppercase + string.digits)
+    return pd.DataFrame({
+        'Airline ID': np.arange(1, n + 1),
+        'Name': [f"Synthetic Air {i}" for i in range(1, n + 1)],
+        'Alias': None,
+        'IATA': codes,
+        'ICAO': unique_codes(n, 3, rng),
+        'Callsign': [f"SYNTH{i}" for i in range(1, n + 1)],
+        'Country': countries[rng.integers(0, len(countries), n)],
+        'Active': 'Y',
+    })
+
+
+def generate(scale, seed=0, source_dir='.', out_dir=None):
+    """
+    :param scale: 放大倍数 (按机场数与航线记录数)
+    :param seed: 随机种子
+    :param source_dir: 真实数据所在目录 (模板)
+    :param out_dir: 输出目录，默认 synthetic_<scale>x
+    :return: 输出目录
+    """
+    out_dir = out_dir or f"synthetic_{scale:g}x"
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    template = read_dat(os.path.join(source_dir, 'airports.dat'), 'airports')
+    template = template.dropna(subset=['Latitude', 'Longitude', 'Country']).reset_index(drop=True)
+    df_routes_real = read_dat(os.path.join(source_dir, 'routes.dat'), 'routes')
+    equipment = df_routes_real['Equipment'].dropna().astype(str).to_numpy()
+
+    airports = make_airports(template, scale, rng)
+    airlines = make_airlines(template['Country'].dropna().unique(), scale, rng)
+    routes = make_routes(airports, airlines, equipment, scale, rng)
+
+    write_dat(airports, os.path.join(out_dir, 'airports.dat'), quote_strings=True)
+    write_dat(airlines, os.path.join(out_dir, 'airlines.dat'), quote_strings=True)
+    write_dat(routes, os.path.join(out_dir, 'routes.dat'), quote_strings=False)
+    for name in COPIED_FILES:
+        shutil.copy(os.path.join(source_dir, name), os.path.join(out_dir, name))
+
+    print(f"✅ {out_dir}: {len(airports)} 个机场, {len(airlines)} 家航司, {len(routes)} 条航线记录")
+    return out_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成与 OpenFlights 格式兼容的合成数据 (扩容测试)")
+    parser.add_argument('--scale', nargs='+', default=list(SCALES), help="放大倍数：10x / 100x 或任意数字")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--source-dir', default='.', help="真实数据所在目录")
+    args = parser.parse_args()
+    for label in args.scale:
+        generate(SCALES.get(label, None) or float(label.rstrip('x')), seed=args.seed, source_dir=args.source_dir)
@@ -0,0 +1,258 @@
+import hashlib
+import os
+import shutil
+
+import numpy as np
+
+from data_store import read_table, table_path
+
+# ==========================================
+# 全局配置
+# ==========================================
+# 缓存目录：每个版本的数据对应一个以哈希命名的子目录
+CACHE_DIR = 'graph_cache'
+
+# CSR 数组文件名 (每个数组单独存一个 .npy，方便 np.load(mmap_mode='r') 直接映射)
+CACHE_ARRAYS = ['node_ids', 'indptr', 'indices', 'weights', 'known']
+
+
+# ==========================================
+# 1. 图结构：压缩稀疏行 (CSR) 邻接表
+# ==========================================
+class RouteGraph:
+    """
+    航线网络的紧凑表示 (有向、加权)
+    节点 i 的出边为 indices[indptr[i]:indptr[i+1]]，对应的权重 (航司数量) 在 weights 里
+
+    :param node_ids: 节点下标 -> 机场 ID (int32，升序)
+    :param indptr: 每个节点出边的起始偏移 (int32，长度 N+1)
+    :param indices: 出边的目标节点下标 (int32)
+    :param weights: 出边的重数，即同一航线有多少条航线记录 (int32)
+    :param known: 该节点是否在机场表中 (bool)，用于剔除“幽灵机场”
+    """
+
+    def __init__(self, node_ids, indptr, indices, weights, known):
+        self.node_ids = node_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.known = known
+
+    @property
+    def n_nodes(self):
+        return len(self.node_ids)
+
+    @property
+    def n_edges(self):
+        return len(self.indices)
+
+    def index_of(self, airport_ids):
+        """机场 ID -> 节点下标 (不存在的 ID 返回 -1)"""
+        airport_ids = np.asarray(airport_ids)
+        pos = np.searchsorted(self.node_ids, airport_ids)
+        pos = np.clip(pos, 0, max(self.n_nodes - 1, 0))
+        found = self.node_ids[pos] == airport_ids if self.n_nodes else np.zeros(airport_ids.shape, bool)
+        return np.where(found, pos, -1)
+
+    def edge_sources(self):
+        """每条边的起点下标 (与 indices 一一对应)"""
+        return np.repeat(np.arange(self.n_nodes, dtype=np.int32), np.diff(self.indptr))
+
+    def out_degree(self, weighted=False):
+        if weighted:
+            return np.bincount(self.edge_sources(), weights=self.weights, minlength=self.n_nodes).astype(np.int64)
+        return np.diff(self.indptr).astype(np.int64)
+
+    def in_degree(self, weighted=False):
+        w = self.weights if weighted else None
+        return np.bincount(self.indices, weights=w, minlength=self.n_nodes).astype(np.int64)
+
+    def to_undirected(self):
+        """
+        对称化：A -> B 与 B -> A 合并为一条无向边，权重相加
+        :return: 新的 RouteGraph (每条无向边在两个端点的邻接表里各出现一次)
+        """
+        src = self.edge_sources()
+        dst = self.indices
+        all_src = np.concatenate([src, dst])
+        all_dst = np.concatenate([dst, src])
+        all_w = np.concatenate([self.weights, self.weights])
+        # 自环只保留一份
+        not_loop_copy = np.concatenate([np.ones(len(src), bool), src != dst])
+        return build_csr(self.node_ids, all_src[not_loop_copy], all_dst[not_loop_copy],
+                         all_w[not_loop_copy], self.known)
+
+    def component_labels(self):
+        """
+        弱连通分量 (忽略边的方向)：最小标签传播 + 指针跳跃，全程向量化
+        :return: 每个节点的分量标签 (= 分量内最小的节点下标)
+        """
+        return label_components(self.n_nodes, self.edge_sources(), self.indices)
+
+    def subgraph(self, mask):
+        """
+        按节点掩码截取子图 (节点下标会重新编号)
+        :param mask: 长度为 N 的 bool 数组
+        """
+        mask = np.asarray(mask, dtype=bool)
+        new_index = np.full(self.n_nodes, -1, dtype=np.int32)
+        new_index[mask] = np.arange(mask.sum(), dtype=np.int32)
+        src = self.edge_sources()
+        keep = mask[src] & mask[self.indices]
+        return build_csr(self.node_ids[mask], new_index[src[keep]], new_index[self.indices[keep]],
+                         self.weights[keep], self.known[mask])
+
+    def to_networkx(self, directed=True, weighted=True):
+        """
+        仅在算法确实需要 NetworkX 时才构建视图 (节点标签为机场 ID)
+        """
+        import networkx as nx
+
+        G = nx.DiGraph() if directed else nx.Graph()
+        G.add_nodes_from(self.node_ids.tolist())
+        src = self.node_ids[self.edge_sources()].tolist()
+        dst = self.node_ids[self.indices].tolist()
+        if weighted:
+            G.add_weighted_edges_from(zip(src, dst, self.weights.tolist()))
+        else:
+            G.add_edges_from(zip(src, dst))
+        return G
+
+
+def label_components(n, src, dst):
+    """
+    边表上的连通分量 (忽略边的方向)：最小标签传播 + 指针跳跃，全程向量化
+    :param n: 节点数
+    :param src, dst: 边的两个端点下标
+    :return: 每个节点的分量标签 (= 分量内最小的节点下标)
+    """
+    src, dst = np.asarray(src), np.asarray(dst)
+    labels = np.arange(n)
+    while True:
+        new = labels.copy()
+        np.minimum.at(new, src, labels[dst])
+        np.minimum.at(new, dst, labels[src])
+        new = new[new]
+        if np.array_equal(new, labels):
+            return labels
+        labels = new
+
+
+def build_csr(node_ids, src, dst, weights, known):
+    """把 (起点下标, 终点下标, 权重) 边表整理成 CSR，重复边的权重会累加"""
+    n = len(node_ids)
+    if len(src):
+        # 按 (起点, 终点) 排序并合并重复边
+        key = src.astype(np.int64) * n + dst
+        order = np.argsort(key, kind='stable')
+        key = key[order]
+        uniq, start = np.unique(key, return_index=True)
+        merged_w = np.add.reduceat(weights[order].astype(np.int64), start) if len(start) else weights[:0]
+        src = (uniq // n).astype(np.int32)
+        dst = (uniq % n).astype(np.int32)
+        weights = merged_w.astype(np.int32)
+    indptr = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return RouteGraph(np.asarray(node_ids, dtype=np.int32), indptr,
+                      np.asarray(dst, dtype=np.int32), np.asarray(weights, dtype=np.int32),
+                      np.asarray(known, dtype=bool))
+
+
+# ==========================================
+# 2. 从清洗后的表构建 (只在缓存失效时执行)
+# ==========================================
+def build_route_graph(extra_types=()):
+    """
+    读取清洗后的航线表，构建加权有向 CSR 图
+    权重 = 同一 (出发机场, 到达机场) 对上的航线记录数 (即有多少家航司运营)
+
+    :param extra_types: 额外加入 airports-extended 中这些 Type 的节点 (如 ('station', 'port'))，
+                        用于多模式联运分析；航线表里没有连到它们的边时为孤立节点
+    """
+    # 列式缓存里 ID 已是可空整数，只读两列并删掉缺失值即可
+    df_routes = read_table('routes', columns=['Source airport ID', 'Destination airport ID']).dropna()
+    df_airports = read_table('airports', columns=['Airport ID']).dropna()
+
+    src_ids = df_routes['Source airport ID'].to_numpy(dtype=np.int64)
+    dst_ids = df_routes['Destination airport ID'].to_numpy(dtype=np.int64)
+
+    node_ids, inverse = np.unique(np.concatenate([src_ids, dst_ids]), return_inverse=True)
+    src = inverse[:len(src_ids)]
+    dst = inverse[len(src_ids):]
+    known_ids = df_airports['Airport ID'].to_numpy(dtype=np.int64)
+
+    if extra_types:
+        from extended_airports import read_extended_airports
+        extra_ids = read_extended_airports(types=extra_types, columns=['Airport ID'])['Airport ID']
+        extra_ids = extra_ids.dropna().to_numpy(dtype=np.int64)
+        all_ids = np.union1d(node_ids, extra_ids)
+        # 插入新节点后原有节点的下标会后移
+        src = np.searchsorted(all_ids, node_ids[src])
+        dst = np.searchsorted(all_ids, node_ids[dst])
+        node_ids = all_ids
+        known_ids = np.concatenate([known_ids, extra_ids])
+
+    known = np.isin(node_ids, known_ids)
+
+    return build_csr(node_ids, src, dst, np.ones(len(src), dtype=np.int32), known)
+
+
+# ==========================================
+# 3. 磁盘缓存 (按输入文件内容哈希)
+# ==========================================
+def file_digest(paths):
+    """缓存键：这些文件内容的哈希 (前 16 位十六进制)"""
+    h = hashlib.sha1()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def save_arrays(target, arrays):
+    """
+    把一组数组存成 target 目录下的 <名称>.npy
+    先写临时目录再重命名，防止并行运行的脚本读到写了一半的缓存
+    """
+    tmp = f"{target}.tmp{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    for name, arr in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), arr)
+    try:
+        os.replace(tmp, target)
+    except OSError:
+        # 其他进程已经抢先写好了同一份缓存
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load_arrays(target, names):
+    """以只读内存映射打开 save_arrays 写出的数组"""
+    return {name: np.load(os.path.join(target, f"{name}.npy"), mmap_mode='r') for name in names}
+
+
+def load_route_graph(cache_dir=CACHE_DIR, extra_types=()):
+    """
+    打开 (或首次生成) 航线图缓存
+    缓存命中时只需 np.load(mmap_mode='r')，不再解析数据表，也不再构建 NetworkX 图
+    缓存键为航线表与机场表文件内容的哈希，重新清洗数据后会自动失效
+
+    :param cache_dir: 缓存根目录
+    :param extra_types: 见 build_route_graph；为空时 (默认) 完全不读取 airports-extended
+    :return: RouteGraph (数组为只读内存映射)
+    """
+    if extra_types:
+        from extended_airports import ensure_extended_table
+        extra_types = tuple(sorted(set(extra_types)))
+        key = file_digest([table_path('routes'), table_path('airports'), ensure_extended_table()])
+        key = f"{key}_{'+'.join(extra_types)}"
+    else:
+        key = file_digest([table_path('routes'), table_path('airports')])
+    target = os.path.join(cache_dir, key)
+
+    if not os.path.isdir(target):
+        graph = build_route_graph(extra_types)
+        save_arrays(target, {name: getattr(graph, name) for name in CACHE_ARRAYS})
+
+    arrays = load_arrays(target, CACHE_ARRAYS)
+    return RouteGraph(**arrays)
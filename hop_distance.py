@@ -0,0 +1,323 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# ==========================================
+# 多核全源 BFS (跳数距离分布)
+# 每个 BFS 批次同时处理 64 个源点：每个节点用一个 uint64 位图记录
+# “哪些源点已经到达这里”，一层扩展只需对所有边做一次向量化的按位或。
+# 源点批次再分给进程池，各进程返回自己的跳数直方图，最后合并。
+# ==========================================
+
+BATCH_SIZE = 64
+
+# 直方图初始长度 (航线网络的直径远小于这个值，超出时会自动扩展)
+MAX_HOPS = 64
+
+# 子进程里的传播数组 (由 _init_worker 设置，避免每个任务重复传输)
+_ARRAYS = None
+
+
+# ==========================================
+# 1. 流式直方图累加器
+# ==========================================
+class HopHistogram:
+    """
+    跳数分布的流式累加器：只保存 counts[d] = 距离为 d 的 (源, 目标) 对数，
+    内存与网络规模无关，可以按批次 / 按进程累加后再合并
+
+    :param max_hops: 初始直方图长度
+    """
+
+    def __init__(self, max_hops=MAX_HOPS):
+        self.counts = np.zeros(max_hops + 1, dtype=np.int64)
+
+    def add_counts(self, hist):
+        hist = np.asarray(hist, dtype=np.int64)
+        if len(hist) > len(self.counts):
+            self.counts = np.concatenate([self.counts, np.zeros(len(hist) - len(self.counts), dtype=np.int64)])
+        self.counts[:len(hist)] += hist
+
+    def merge(self, other):
+        self.add_counts(other.counts)
+        return self
+
+    @property
+    def n_pairs(self):
+        return int(self.counts.sum())
+
+    @property
+    def diameter(self):
+        nonzero = np.flatnonzero(self.counts)
+        return int(nonzero[-1]) if len(nonzero) else 0
+
+    def hops(self):
+        """1..diameter 的跳数刻度"""
+        return np.arange(1, self.diameter + 1)
+
+    def trimmed(self):
+        """与 hops() 对应的计数"""
+        return self.counts[1:self.diameter + 1]
+
+    def mean(self):
+        if self.n_pairs == 0:
+            return float('nan')
+        return float((np.arange(len(self.counts)) * self.counts).sum() / self.n_pairs)
+
+
+# ==========================================
+# 2. 位图 BFS 内核
+# ==========================================
+def _popcount(arr):
+    """统计 uint64 数组每个元素中 1 的个数"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(arr)
+    table = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+    return table[arr.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def propagation_arrays(graph, reverse=False):
+    """
+    准备位图 BFS 所需的前驱数组：next[v] = OR(frontier[u]) over 前驱 u
+    :param reverse: False 为正向 BFS (沿出边走)，True 为反向 BFS (沿入边走)
+    :return: (pred_sources, pred_starts, has_pred, n_nodes)
+    """
+    src = graph.edge_sources()
+    if reverse:
+        # 反向 BFS 的前驱就是原图的后继，出边 CSR 本身已按起点分段
+        pred_sources = np.asarray(graph.indices)
+        count = np.diff(graph.indptr)
+    else:
+        order = np.argsort(graph.indices, kind='stable')
+        pred_sources = src[order]
+        count = np.bincount(graph.indices, minlength=graph.n_nodes)
+    starts = np.concatenate([[0], np.cumsum(count)[:-1]]).astype(np.int64)
+    has_pred = count > 0
+    return pred_sources, starts[has_pred], has_pred, graph.n_nodes
+
+
+def _bfs_levels(sources, arrays):
+    """
+    从一批 (<=64 个) 源点同时做 BFS，逐层产出新到达的位图
+    第 d 次产出的 nxt[v] 中第 b 位为 1 表示 dist(sources[b], v) == d
+    """
+    pred_sources, pred_starts, has_pred, n = arrays
+    bits = np.left_shift(np.uint64(1), np.arange(len(sources), dtype=np.uint64))
+
+    visited = np.zeros(n, dtype=np.uint64)
+    np.bitwise_or.at(visited, np.asarray(sources, dtype=np.int64), bits)
+    frontier = visited.copy()
+
+    while True:
+        nxt = np.zeros(n, dtype=np.uint64)
+        if len(pred_starts):
+            nxt[has_pred] = np.bitwise_or.reduceat(frontier[pred_sources], pred_starts)
+        nxt &= ~visited
+        if not nxt.any():
+            return
+        yield nxt
+        visited |= nxt
+        frontier = nxt
+
+
+def _init_worker(arrays):
+    global _ARRAYS
+    _ARRAYS = arrays
+
+
+def _bfs_batch(sources):
+    """
+    :return: (该批次的 HopHistogram, 最大距离, 最远的 (源, 目标) 下标对)
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    acc = HopHistogram()
+    hist = [0]
+    last_level = None
+    for nxt in _bfs_levels(sources, _ARRAYS):
+        hist.append(int(_popcount(nxt).sum()))
+        last_level = nxt
+    acc.add_counts(hist)
+
+    farthest_pair = (None, None)
+    if last_level is not None:
+        target = int(np.flatnonzero(last_level)[0])
+        word = int(last_level[target])
+        bit = (word & -word).bit_length() - 1
+        farthest_pair = (int(sources[bit]), target)
+    return acc, len(hist) - 1, farthest_pair
+
+
+def all_pairs_hop_distribution(graph, sources=None, n_workers=None, batch_size=BATCH_SIZE):
+    """
+    计算全源跳数距离分布 (不包含源点自身)
+    :param graph: 有向 RouteGraph (无向图请先 to_undirected)
+    :param sources: 参与计算的源点下标，默认全部节点
+    :param n_workers: 进程数，默认 CPU 核数；为 1 时在当前进程内计算
+    :param batch_size: 每个位图批次的源点数 (最多 64)
+    :return: (HopHistogram, 直径, 最远的 (源, 目标) 下标对)
+    """
+    if sources is None:
+        sources = np.arange(graph.n_nodes)
+    sources = np.asarray(sources, dtype=np.int64)
+    batch_size = min(batch_size, BATCH_SIZE)
+    batches = [sources[i:i + batch_size] for i in range(0, len(sources), batch_size)]
+
+    n_workers = n_workers or os.cpu_count() or 1
+    arrays = propagation_arrays(graph)
+
+    if n_workers == 1 or len(batches) <= 1:
+        _init_worker(arrays)
+        results = map(_bfs_batch, batches)
+        return _merge_results(results)
+
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(arrays,)) as pool:
+        chunksize = max(1, len(batches) // (n_workers * 4))
+        # 结果边到达边合并，不在内存里保留所有批次
+        return _merge_results(pool.map(_bfs_batch, batches, chunksize=chunksize))
+
+
+def _merge_results(results):
+    total = HopHistogram()
+    diameter = 0
+    farthest_pair = (None, None)
+    for acc, d, pair in results:
+        total.merge(acc)
+        if d > diameter:
+            diameter = d
+            farthest_pair = pair
+    return total, diameter, farthest_pair
+
+
+# ==========================================
+# 3. 精确直径 (DiFUB：有向图版本的 iFUB 上下界算法)
+# ==========================================
+def bfs_distances(arrays, source):
+    """单源 BFS，返回到每个节点的跳数 (不可达为 -1)"""
+    dist = np.full(arrays[3], -1, dtype=np.int64)
+    dist[source] = 0
+    for level, nxt in enumerate(_bfs_levels([source], arrays), start=1):
+        dist[nxt != 0] = level
+    return dist
+
+
+def eccentricities(arrays, sources):
+    """
+    批量计算一组源点的离心率 (可达范围内的最大跳数)
+    :return: 与 sources 对齐的 int 数组
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    ecc = np.zeros(len(sources), dtype=np.int64)
+    for i in range(0, len(sources), BATCH_SIZE):
+        batch = sources[i:i + BATCH_SIZE]
+        for level, nxt in enumerate(_bfs_levels(batch, arrays), start=1):
+            reached = int(np.bitwise_or.reduce(nxt))
+            for b in range(len(batch)):
+                if reached >> b & 1:
+                    ecc[i + b] = level
+    return ecc
+
+
+def exact_diameter(graph, start=None):
+    """
+    用 DiFUB 上下界求有向 (强连通) 图的精确直径，通常只需要少量 BFS
+
+    以中心节点 u 为参照：若 dist(x, y) > 2(i-1)，则 dist(x, u) >= i 或 dist(u, y) >= i。
+    所以从最外层开始，逐层计算“反向距离为 i 的节点的正向离心率”和
+    “正向距离为 i 的节点的反向离心率”，一旦下界 lb >= 2(i-1) 就可以停止。
+
+    :param graph: 强连通的有向 RouteGraph
+    :param start: 中心节点下标，默认取总度数最大的枢纽
+    :return: (直径, 最远的 (源, 目标) 下标对, BFS 次数)
+    """
+    fwd = propagation_arrays(graph)
+    bwd = propagation_arrays(graph, reverse=True)
+    if start is None:
+        degree = np.diff(graph.indptr) + np.bincount(graph.indices, minlength=graph.n_nodes)
+        start = int(np.argmax(degree))
+
+    dist_f = bfs_distances(fwd, start)
+    dist_b = bfs_distances(bwd, start)
+    n_bfs = 2
+
+    # 初始下界：中心节点自身的正向 / 反向离心率
+    if dist_f.max() >= dist_b.max():
+        lb, best = int(dist_f.max()), ('fwd', start)
+    else:
+        lb, best = int(dist_b.max()), ('bwd', start)
+
+    i = max(int(dist_f.max()), int(dist_b.max()))
+    while i > 0:
+        # 反向距离为 i 的节点 -> 正向离心率
+        xs = np.flatnonzero(dist_b == i)
+        if len(xs):
+            ecc = eccentricities(fwd, xs)
+            n_bfs += len(xs)
+            if ecc.max() > lb:
+                lb, best = int(ecc.max()), ('fwd', int(xs[np.argmax(ecc)]))
+        # 正向距离为 i 的节点 -> 反向离心率
+        ys = np.flatnonzero(dist_f == i)
+        if len(ys):
+            ecc = eccentricities(bwd, ys)
+            n_bfs += len(ys)
+            if ecc.max() > lb:
+                lb, best = int(ecc.max()), ('bwd', int(ys[np.argmax(ecc)]))
+        # 距离超过 2(i-1) 的点对都已覆盖，剩余点对不可能超过当前下界
+        if lb >= 2 * (i - 1):
+            break
+        i -= 1
+
+    # 还原取得直径的具体点对
+    direction, node = best
+    if direction == 'fwd':
+        far = int(np.argmax(bfs_distances(fwd, node)))
+        pair = (node, far)
+    else:
+        far = int(np.argmax(bfs_distances(bwd, node)))
+        pair = (far, node)
+    return lb, pair, n_bfs
+
+
+# ==========================================
+# 4. 最短路径树 (单源 BFS，带前驱)
+# ==========================================
+def bfs_tree(graph, source):
+    """
+    沿出边逐层 BFS，记录每个节点在最短路径树上的前驱 (同层有多个前驱时取编号最小的)
+    :param graph: 有向 RouteGraph
+    :param source: 源点下标
+    :return: (跳数距离, 前驱)，均为 int32；不可达为 -1，parent[source] = source
+    """
+    indptr = np.asarray(graph.indptr, dtype=np.int64)
+    indices = np.asarray(graph.indices, dtype=np.int64)
+    dist = np.full(graph.n_nodes, -1, dtype=np.int32)
+    parent = np.full(graph.n_nodes, -1, dtype=np.int32)
+    dist[source] = 0
+    parent[source] = source
+
+    frontier = np.array([source], dtype=np.int64)
+    level = 0
+    while len(frontier):
+        starts = indptr[frontier]
+        counts = indptr[frontier + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        u = np.repeat(frontier, counts)
+        v = indices[offsets]
+        fresh = dist[v] == -1
+        # frontier 升序，np.unique 的 return_index 取到的就是编号最小的前驱
+        frontier, first = np.unique(v[fresh], return_index=True)
+        level += 1
+        dist[frontier] = level
+        parent[frontier] = u[fresh][first]
+    return dist, parent
+
+
+def tree_path(parent, target):
+    """沿前驱回溯出 源点 -> target 的节点下标列表 (不可达返回 None)"""
+    if parent[target] < 0:
+        return None
+    path = [int(target)]
+    while parent[path[-1]] != path[-1]:
+        path.append(int(parent[path[-1]]))
+    path.reverse()
+    return path
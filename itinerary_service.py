@@ -0,0 +1,290 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+from data_store import read_table
+from graph_store import load_route_graph
+from hop_distance import bfs_tree, tree_path
+
+# ==========================================
+# 本地行程查询服务 (asyncio + 标准库 HTTP)
+# 启动时加载一次航线图，按 IATA 代码回答“最少转机”行程查询：
+#   GET  /route?from=PEK&to=JFK           单个查询
+#   GET  /batch?q=PEK-JFK,LHR-SYD         批量查询 (同一出发地只做一次 BFS)
+#   POST /batch  {"queries": [["PEK", "JFK"], ...]}
+#   GET  /stats                           缓存命中率与延迟 p50 / p99
+# 每个出发地的 BFS 最短路径树放在 LRU 缓存里，重复的出发地不再重新搜索；
+# 缓存未命中时 BFS 在线程池里执行，不阻塞其他连接
+# ==========================================
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# 缓存的 BFS 树个数 (每棵树两个 int32 数组，几千个机场时约 25 KB)
+CACHE_SIZE = 1024
+
+# 统计延迟时保留最近多少个请求
+LATENCY_WINDOW = 10000
+
+# 单个批量请求最多包含的查询数
+MAX_BATCH = 10000
+
+
+# ==========================================
+# 1. 查询引擎
+# ==========================================
+class ItineraryEngine:
+    """
+    :param cache_size: LRU 缓存的 BFS 树个数
+    """
+
+    def __init__(self, cache_size=CACHE_SIZE):
+        # 与 08 相同：剔除不在机场表里的“幽灵机场”
+        graph = load_route_graph()
+        self.graph = graph.subgraph(graph.known)
+
+        df_airports = read_table('airports', columns=['Airport ID', 'Name', 'City', 'Country', 'IATA'])
+        df_airports = df_airports.dropna(subset=['IATA'])
+        pos = self.graph.index_of(df_airports['Airport ID'].to_numpy(dtype=np.int64))
+        df_airports = df_airports[pos >= 0].assign(node=pos[pos >= 0])
+
+        self.node_of = dict(zip(df_airports['IATA'].astype(str), df_airports['node'].tolist()))
+        self.info = {node: {'iata': iata, 'name': name, 'city': str(city), 'country': str(country)}
+                     for node, iata, name, city, country in zip(
+                         df_airports['node'].tolist(), df_airports['IATA'].astype(str),
+                         df_airports['Name'].astype(str), df_airports['City'], df_airports['Country'])}
+
+        self.cache_size = cache_size
+        self._trees = OrderedDict()
+        # 正在线程池里计算的出发地 -> future：同一出发地同时到达的多个请求等同一个结果，只做一次 BFS
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    def cache_info(self):
+        return {'size': len(self._trees), 'capacity': self.cache_size, 'hits': self.hits, 'misses': self.misses}
+
+    def _cached(self, source):
+        tree = self._trees.get(source)
+        if tree is not None:
+            self._trees.move_to_end(source)
+            self.hits += 1
+        return tree
+
+    def _store(self, source, tree):
+        self.misses += 1
+        self._trees[source] = tree
+        if len(self._trees) > self.cache_size:
+            self._trees.popitem(last=False)
+        return tree
+
+    def tree(self, source):
+        """出发地的 BFS 树 (LRU 缓存)，在当前线程里计算"""
+        tree = self._cached(source)
+        if tree is None:
+            tree = self._store(source, bfs_tree(self.graph, source))
+        return tree
+
+    async def tree_async(self, source):
+        """
+        与 tree 相同，但缓存未命中时把 BFS 交给线程池，事件循环可以继续服务其他连接
+        缓存只在事件循环线程里读写，线程池里只读航线图
+        """
+        tree = self._cached(source)
+        if tree is not None:
+            return tree
+        future = self._pending.get(source)
+        if future is not None:
+            self.hits += 1
+            # shield：某个等待者被取消时不影响其他等待者
+            return await asyncio.shield(future)
+        loop = asyncio.get_running_loop()
+        future = self._pending[source] = loop.run_in_executor(None, bfs_tree, self.graph, source)
+        try:
+            return self._store(source, await asyncio.shield(future))
+        finally:
+            # 结果已写入缓存 (或计算失败)，之后的请求直接查缓存 / 重新计算
+            del self._pending[source]
+
+    def _check(self, origin, destination):
+        """:return: 结果字典；找不到机场时已包含 error 字段"""
+        result = {'from': origin, 'to': destination}
+        for code in (origin, destination):
+            if code not in self.node_of:
+                result['error'] = f"unknown airport: {code}"
+                break
+        return result
+
+    def _fill(self, result, parent):
+        path = tree_path(parent, self.node_of[result['to']])
+        if path is None:
+            result['error'] = 'unreachable'
+            return result
+        result['hops'] = len(path) - 1
+        result['path'] = [self.info[node] for node in path]
+        return result
+
+    def route(self, origin, destination):
+        """
+        :return: 结果字典；找不到机场或不可达时包含 error 字段
+        """
+        result = self._check(origin, destination)
+        if 'error' in result:
+            return result
+        _, parent = self.tree(self.node_of[origin])
+        return self._fill(result, parent)
+
+    async def route_async(self, origin, destination):
+        result = self._check(origin, destination)
+        if 'error' in result:
+            return result
+        _, parent = await self.tree_async(self.node_of[origin])
+        return self._fill(result, parent)
+
+    def batch(self, pairs):
+        """按出发地分组，同一出发地的查询共用一棵 BFS 树；结果与输入顺序一致"""
+        order = sorted(range(len(pairs)), key=lambda i: pairs[i][0])
+        results = [None] * len(pairs)
+        for i in order:
+            results[i] = self.route(*pairs[i])
+        return results
+
+    async def batch_async(self, pairs):
+        """先并发准备好所有出发地的 BFS 树 (每个出发地一次)，再逐个回答；结果与输入顺序一致"""
+        results = [self._check(origin, destination) for origin, destination in pairs]
+        sources = sorted({self.node_of[r['from']] for r in results if 'error' not in r})
+        trees = await asyncio.gather(*(self.tree_async(source) for source in sources))
+        # 直接使用取到的树：批量里的出发地比缓存容量多时，前面的树可能已经被淘汰
+        parents = {source: parent for source, (_, parent) in zip(sources, trees)}
+        return [r if 'error' in r else self._fill(r, parents[self.node_of[r['from']]]) for r in results]
+
+
+# ==========================================
+# 2. 延迟统计
+# ==========================================
+class LatencyStats:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.total = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.total += 1
+
+    def summary(self):
+        if not self.samples:
+            return {'requests': self.total, 'p50_ms': None, 'p99_ms': None}
+        p50, p99 = np.percentile(np.asarray(self.samples) * 1000, [50, 99])
+        return {'requests': self.total, 'p50_ms': round(float(p50), 3), 'p99_ms': round(float(p99), 3)}
+
+
+# ==========================================
+# 3. HTTP 层
+# ==========================================
+class ItineraryServer:
+    def __init__(self, engine):
+        self.engine = engine
+        self.latency = LatencyStats()
+
+    async def handle(self, method, target, body):
+        """
+        :return: (状态码, 可 JSON 序列化的响应体)
+        """
+        url = urlsplit(target)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        if url.path == '/route' and method == 'GET':
+            if 'from' not in params or 'to' not in params:
+                return 400, {'error': "missing 'from' or 'to'"}
+            result = await self.engine.route_async(params['from'].upper(), params['to'].upper())
+            return (404 if 'error' in result else 200), result
+
+        if url.path == '/batch':
+            if method == 'POST':
+                try:
+                    pairs = [(str(a).upper(), str(b).upper()) for a, b in json.loads(body or b'{}')['queries']]
+                except (ValueError, KeyError, TypeError):
+                    return 400, {'error': 'body must be {"queries": [[from, to], ...]}'}
+            else:
+                items = [q for q in params.get('q', '').split(',') if q]
+                if any(q.count('-') != 1 for q in items):
+                    return 400, {'error': "q must look like 'PEK-JFK,LHR-SYD'"}
+                pairs = [tuple(q.upper().split('-')) for q in items]
+            if len(pairs) > MAX_BATCH:
+                return 413, {'error': f"at most {MAX_BATCH} queries per batch"}
+            return 200, {'results': await self.engine.batch_async(pairs)}
+
+        if url.path == '/stats':
+            return 200, {
+                'latency': self.latency.summary(),
+                'cache': self.engine.cache_info(),
+                'graph': {'airports': self.engine.graph.n_nodes, 'routes': self.engine.graph.n_edges},
+            }
+
+        return 404, {'error': f"no such endpoint: {method} {url.path}"}
+
+    async def serve_connection(self, reader, writer):
+        """一个连接上可以连续发送多个请求 (HTTP/1.1 keep-alive)"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                body = await reader.readexactly(length) if length else b''
+
+                start = time.perf_counter()
+                status, payload = await self.handle(method.upper(), target, body)
+                self.latency.add(time.perf_counter() - start)
+
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, cache_size=CACHE_SIZE):
+    print("🚀 正在加载航线图...")
+    server = ItineraryServer(ItineraryEngine(cache_size=cache_size))
+    tcp = await asyncio.start_server(server.serve_connection, host, port)
+    print(f"✅ 行程查询服务已启动: http://{host}:{port}/route?from=PEK&to=JFK "
+          f"({server.engine.graph.n_nodes} 个机场)")
+    try:
+        async with tcp:
+            await tcp.serve_forever()
+    finally:
+        print(f"\n📊 延迟统计: {server.latency.summary()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地最少转机行程查询服务")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help="LRU 缓存的 BFS 树个数")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.cache_size))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,163 @@
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# ==========================================
+# 逆序并查集渗流引擎
+# 思路：删除节点的过程倒过来看，就是按相反顺序“加回”节点。
+# 加点时只需要把它和已经存在的邻居合并 (Union-Find)，
+# 因此一次扫描就能得到每删除一个节点后的最大连通子图大小，
+# 总复杂度约为 O((N + E) · α(N))，而不是每一步都重新找连通分量。
+# ==========================================
+
+# 随机失效蒙特卡洛：默认试验次数与每个进程任务包含的试验数
+N_TRIALS = 500
+TRIALS_PER_TASK = 25
+
+# 子进程里的邻接表 (由 _init_worker 设置，避免每个任务重复传输)
+_ARRAYS = None
+
+
+def percolation_curve(graph, attack_order):
+    """
+    计算逐个删除节点时最大连通子图的大小
+    :param graph: 无向 RouteGraph (邻接表对称，见 RouteGraph.to_undirected)
+    :param attack_order: 节点下标的删除顺序；未出现的节点视为始终保留
+    :return: 长度为 len(attack_order)+1 的 int 数组，第 k 项是删除前 k 个节点后的最大连通子图大小
+    """
+    return _percolation(graph.indptr.tolist(), graph.indices.tolist(), attack_order)
+
+
+def _percolation(indptr, indices, attack_order):
+    """percolation_curve 的主体，邻接表为 Python 列表 (多次试验时只转换一次)"""
+    n = len(indptr) - 1
+    attack_order = np.asarray(attack_order, dtype=np.int64)
+
+    # 不在删除序列里的节点先加入，之后按删除顺序的逆序加回
+    in_order = np.zeros(n, dtype=bool)
+    in_order[attack_order] = True
+    add_sequence = np.concatenate([np.flatnonzero(~in_order), attack_order[::-1]]).tolist()
+
+    parent = list(range(n))
+    size = [1] * n
+    present = [False] * n
+
+    def find(x):
+        # 路径减半
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    n_kept = n - len(attack_order)
+    giant = 0
+    curve = []
+    for step, node in enumerate(add_sequence):
+        present[node] = True
+        giant = max(giant, 1)
+        root = node
+        for nb in indices[indptr[node]:indptr[node + 1]]:
+            if not present[nb]:
+                continue
+            r_nb = find(nb)
+            root = find(root)
+            if r_nb == root:
+                continue
+            # 按大小合并
+            if size[root] < size[r_nb]:
+                root, r_nb = r_nb, root
+            parent[r_nb] = root
+            size[root] += size[r_nb]
+            if size[root] > giant:
+                giant = size[root]
+        # 已加回 step+1 个节点 -> 对应删除了 n-(step+1) 个节点的状态
+        if step + 1 >= n_kept:
+            curve.append(giant)
+
+    # curve 目前按“删除了 len(order), ..., 1, 0 个节点”排列，反转成正序
+    curve.reverse()
+    if n_kept == 0:
+        # 全部删除的状态 (网络为空) 在循环里没有对应的记录
+        curve.append(0)
+    return np.asarray(curve, dtype=np.int64)
+
+
+# ==========================================
+# 随机失效的蒙特卡洛集成
+# ==========================================
+def _init_worker(arrays):
+    global _ARRAYS
+    _ARRAYS = arrays
+
+
+def _random_trials(seeds):
+    """按给定的种子逐个做随机删除试验，每个种子对应一次独立的随机顺序"""
+    indptr, indices = _ARRAYS
+    n = len(indptr) - 1
+    curves = np.empty((len(seeds), n + 1), dtype=np.int32)
+    for i, seed in enumerate(seeds):
+        order = np.random.default_rng(seed).permutation(n)
+        curves[i] = _percolation(indptr, indices, order)
+    return curves
+
+
+def random_failure_ensemble(graph, n_trials=N_TRIALS, seed=0, n_workers=None):
+    """
+    重复 n_trials 次随机失效 (按均匀随机顺序删除全部节点)
+    每次试验的种子由 SeedSequence(seed) 派生，结果与进程数、任务划分无关，可完全复现
+
+    :param graph: 无向 RouteGraph
+    :param n_workers: 进程数，默认 CPU 核数；为 1 时在当前进程内计算
+    :return: (n_trials, N+1) 的 int32 矩阵，第 i 行是第 i 次试验的 percolation_curve
+    """
+    seeds = [s.generate_state(2) for s in np.random.SeedSequence(seed).spawn(n_trials)]
+    batches = [seeds[i:i + TRIALS_PER_TASK] for i in range(0, n_trials, TRIALS_PER_TASK)]
+    arrays = (graph.indptr.tolist(), graph.indices.tolist())
+    if not batches:
+        return np.zeros((0, graph.n_nodes + 1), dtype=np.int32)
+
+    n_workers = n_workers or os.cpu_count() or 1
+    if n_workers == 1 or len(batches) <= 1:
+        _init_worker(arrays)
+        return np.concatenate([_random_trials(b) for b in batches])
+
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(arrays,)) as pool:
+        return np.concatenate(list(pool.map(_random_trials, batches)))
+
+
+def degree_order(graph):
+    """静态蓄意攻击：按初始度数从大到小删除"""
+    degree = np.diff(graph.indptr)
+    return np.argsort(-degree, kind='stable')
+
+
+def adaptive_degree_order(graph):
+    """
+    自适应蓄意攻击：每删除一个节点后重新计算剩余网络的度数，
+    永远删除当前度数最大的节点 (懒删除堆，O(E log N))
+    """
+    n = graph.n_nodes
+    indptr = graph.indptr.tolist()
+    indices = graph.indices.tolist()
+    degree = np.diff(graph.indptr).tolist()
+
+    heap = [(-d, node) for node, d in enumerate(degree)]
+    heapq.heapify(heap)
+    removed = [False] * n
+    order = []
+
+    while heap:
+        neg_d, node = heapq.heappop(heap)
+        # 过期条目：节点已删除，或度数已经变化
+        if removed[node] or -neg_d != degree[node]:
+            continue
+        removed[node] = True
+        order.append(node)
+        for nb in indices[indptr[node]:indptr[node + 1]]:
+            if not removed[nb] and nb != node:
+                degree[nb] -= 1
+                heapq.heappush(heap, (-degree[nb], nb))
+
+    return np.asarray(order, dtype=np.int64)
@@ -0,0 +1,134 @@
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+# ==========================================
+# 分析脚本的运行剖析
+# 脚本在每个 "Step N" 开头调用 profiler.phase('Step N')，结束时调用 profiler.finish()：
+#   FLIGHTS_PROFILE=1                     记录每一步的墙钟时间与 tracemalloc 峰值内存
+#   FLIGHTS_CPROFILE="Step 2"             额外用 cProfile 剖析名为 "Step 2" 的那一步
+#   FLIGHTS_CPROFILE="06_connectivity_analysis:Step 2"   只在指定脚本里剖析
+# 结果写入 run_reports/<脚本名>.json (cProfile 原始数据另存为 .prof，可用 snakeviz 等工具查看)。
+# 两个环境变量都没设置时 phase / finish 直接返回，不计时、不追踪内存、不写文件。
+# ==========================================
+PROFILE_ENV = 'FLIGHTS_PROFILE'
+CPROFILE_ENV = 'FLIGHTS_CPROFILE'
+
+REPORT_DIR = 'run_reports'
+
+# 报告里保留 cProfile 累计耗时最高的函数个数
+CPROFILE_TOP = 25
+
+
+class StepProfiler:
+    """
+    :param script: 脚本路径 (一般传 __file__)，报告以它的文件名命名
+    """
+
+    def __init__(self, script):
+        self.name = os.path.splitext(os.path.basename(script))[0]
+        target = os.environ.get(CPROFILE_ENV, '').strip()
+        if ':' in target:
+            script_name, _, target = target.partition(':')
+            target = target.strip() if script_name.strip() == self.name else ''
+        self.cprofile_target = target or None
+        self.enabled = os.environ.get(PROFILE_ENV, '') not in ('', '0') or self.cprofile_target is not None
+
+        self.phases = []
+        self._current = None
+        self._profile = None
+        if self.enabled:
+            self._start = time.perf_counter()
+            # 已经在追踪 (例如被 benchmark.py 调用) 时不要把别人的追踪关掉
+            self._own_tracemalloc = not tracemalloc.is_tracing()
+            if self._own_tracemalloc:
+                tracemalloc.start()
+
+    # ------------------------------------------
+    # 阶段切换
+    # ------------------------------------------
+    def phase(self, name):
+        """结束上一个阶段 (如果有)，开始名为 name 的新阶段"""
+        if not self.enabled:
+            return
+        self._close()
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        self._current = (name, time.perf_counter(), current)
+        if name == self.cprofile_target:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def _close(self):
+        if self._current is None:
+            return
+        name, start, mem_before = self._current
+        record = {'phase': name}
+        if self._profile is not None:
+            self._profile.disable()
+            record['cprofile'] = self._dump_profile(name)
+            self._profile = None
+        record['wall_s'] = round(time.perf_counter() - start, 6)
+        current, peak = tracemalloc.get_traced_memory()
+        record['peak_mb'] = round(peak / 2 ** 20, 3)
+        record['net_mb'] = round((current - mem_before) / 2 ** 20, 3)
+        self.phases.append(record)
+        self._current = None
+
+    def _dump_profile(self, phase_name):
+        """保存 .prof 文件，并返回累计耗时最高的若干函数"""
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        prof_file = os.path.join(REPORT_DIR, f"{self.name}_{phase_name.replace(' ', '_')}.prof")
+        self._profile.dump_stats(prof_file)
+
+        stats = pstats.Stats(self._profile, stream=io.StringIO())
+        rows = []
+        for (filename, line, func), (_, n_calls, total, cumulative, _) in stats.stats.items():
+            rows.append({'function': f"{os.path.basename(filename)}:{line}({func})", 'calls': n_calls,
+                         'tottime_s': round(total, 6), 'cumtime_s': round(cumulative, 6)})
+        rows.sort(key=lambda r: r['cumtime_s'], reverse=True)
+        return {'file': prof_file, 'top': rows[:CPROFILE_TOP]}
+
+    # ------------------------------------------
+    # 报告
+    # ------------------------------------------
+    def finish(self, **extra):
+        """
+        结束最后一个阶段并写出报告
+        :param extra: 附加到报告里的额外字段 (如节点数、抽样数等)
+        :return: 报告文件路径；未启用时为 None
+        """
+        if not self.enabled:
+            return None
+        self._close()
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+
+        report = {
+            'script': self.name,
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'argv': sys.argv,
+            'total_s': round(time.perf_counter() - self._start, 6),
+            # tracemalloc 只能看到本进程的分配，进程池子进程里的内存不计入
+            'phases': self.phases,
+            'extra': extra,
+        }
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        report_file = os.path.join(REPORT_DIR, f"{self.name}.json")
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        print(f"\n⏱️ 运行剖析 ({report['total_s']:.2f}s):")
+        for record in self.phases:
+            print(f"  - {record['phase']:<10} {record['wall_s']:>9.3f}s  峰值 {record['peak_mb']:>8.1f} MB")
+        print(f"  - 报告已保存: {report_file}")
+        return report_file
@@ -0,0 +1,158 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from data_store import read_table, table_path
+from graph_store import CACHE_DIR, file_digest, load_arrays, load_route_graph, save_arrays
+
+# ==========================================
+# 机场 -> 城市 -> 国家 的多级聚合
+# 每个层级用一个稀疏关联矩阵 P (机场数 x 区域数，每行至多一个 1) 表示机场属于哪个区域，
+# 区域之间的航线流量矩阵只需一次稀疏矩阵乘法：F = Pᵀ · A · P (A 为航线图的加权邻接矩阵)。
+# 关联与流量矩阵和航线图一样按数据表内容哈希缓存，查询时直接内存映射。
+# ==========================================
+LEVELS = ['City', 'Country']
+
+# 每个层级缓存的数组 (文件名为 <层级小写>_<数组名>.npy)
+REGION_ARRAYS = ['names', 'node_region', 'flow_indptr', 'flow_indices', 'flow_data']
+
+
+class RegionFlows:
+    """
+    某一层级 (城市 / 国家) 上的航线流量
+
+    :param level: 'City' 或 'Country'
+    :param names: 区域名称 (升序)；城市为 "城市, 国家"，避免不同国家的同名城市被合并
+    :param node_region: 航线图节点下标 -> 区域编号 (int32，不在机场表里的节点为 -1)
+    :param flows: 区域 x 区域的稀疏矩阵 (CSR)，值为两区域间的航线记录数 (有向)
+    """
+
+    def __init__(self, level, names, node_region, flows):
+        self.level = level
+        self.names = names
+        self.node_region = node_region
+        self.flows = flows
+
+    @property
+    def n_regions(self):
+        return len(self.names)
+
+    def incidence(self):
+        """机场 -> 区域 的关联矩阵 (节点数 x 区域数，CSR)"""
+        return _incidence(self.node_region, self.n_regions)
+
+    def aggregate(self, node_values):
+        """把节点上的数值 (度数、客流等) 按区域求和"""
+        return self.incidence().T @ np.asarray(node_values, dtype=np.float64)
+
+    def group_counts(self, node_index, groups, n_groups=None):
+        """
+        每组节点在各区域里有多少个机场 (例如社团 x 国家)
+        :param node_index: 航线图节点下标
+        :param groups: 每个节点所属的组编号 0..G-1
+        :return: (组数, 区域数) 的 CSR 矩阵
+        """
+        groups = np.asarray(groups, dtype=np.int64)
+        n_groups = n_groups if n_groups is not None else int(groups.max()) + 1 if len(groups) else 0
+        membership = sparse.csr_matrix((np.ones(len(groups), dtype=np.int64), (groups, np.arange(len(groups)))),
+                                       shape=(n_groups, len(groups)))
+        return (membership @ self.incidence()[np.asarray(node_index)]).tocsr()
+
+    def top_pairs(self, n=20, directed=False, domestic=False):
+        """
+        航线记录数最多的区域对
+        :param directed: False 时 A -> B 与 B -> A 合并
+        :param domestic: 是否包含区域内部的航线 (A -> A)
+        :return: DataFrame (From, To, Routes)，按 Routes 降序
+        """
+        flows = self.flows.tocoo()
+        src, dst, routes = flows.row, flows.col, flows.data.astype(np.int64)
+        if not directed:
+            src, dst = np.minimum(src, dst), np.maximum(src, dst)
+            merged = sparse.csr_matrix((routes, (src, dst)), shape=self.flows.shape).tocoo()
+            src, dst, routes = merged.row, merged.col, merged.data
+        if not domestic:
+            keep = src != dst
+            src, dst, routes = src[keep], dst[keep], routes[keep]
+
+        order = np.lexsort((dst, src, -routes))[:n]
+        return pd.DataFrame({'From': self.names[src[order]], 'To': self.names[dst[order]],
+                             'Routes': routes[order]})
+
+
+# ==========================================
+# 1. 构建 (只在缓存失效时执行)
+# ==========================================
+def _incidence(node_region, n_regions):
+    node_region = np.asarray(node_region)
+    rows = np.flatnonzero(node_region >= 0)
+    return sparse.csr_matrix((np.ones(len(rows), dtype=np.int64), (rows, node_region[rows])),
+                             shape=(len(node_region), n_regions))
+
+
+def _region_labels(df, level):
+    """机场表 -> 每个机场所属区域的名称 (缺失时为 None)"""
+    country = df['Country'].astype(object)
+    if level == 'Country':
+        return country.where(country.notna(), None)
+    city = df['City'].astype(object)
+    label = city + ', ' + country
+    return label.where(city.notna() & country.notna(), None)
+
+
+def build_region_flows(graph):
+    """
+    :param graph: 有向 RouteGraph (load_route_graph 的结果)
+    :return: {层级: RegionFlows}
+    """
+    df = read_table('airports', columns=['Airport ID', 'City', 'Country']).dropna(subset=['Airport ID'])
+    pos = graph.index_of(df['Airport ID'].to_numpy(dtype=np.int64))
+    adjacency = sparse.csr_matrix((np.asarray(graph.weights, dtype=np.int64), graph.indices, graph.indptr),
+                                  shape=(graph.n_nodes, graph.n_nodes))
+
+    result = {}
+    for level in LEVELS:
+        label = _region_labels(df, level)
+        keep = (pos >= 0) & label.notna().to_numpy()
+        names, code = np.unique(label[keep].to_numpy(dtype=str), return_inverse=True)
+        node_region = np.full(graph.n_nodes, -1, dtype=np.int32)
+        node_region[pos[keep]] = code
+
+        P = _incidence(node_region, len(names))
+        flows = (P.T @ adjacency @ P).tocsr()
+        flows.sort_indices()
+        result[level] = RegionFlows(level, names, node_region, flows)
+    return result
+
+
+# ==========================================
+# 2. 磁盘缓存 (与航线图相同的内容哈希)
+# ==========================================
+def load_region_flows(level='Country', cache_dir=CACHE_DIR):
+    """
+    打开 (或首次生成) 区域流量缓存，缓存在 graph_cache/regions_<哈希>/ 下
+    :param level: 'City' 或 'Country'
+    :return: RegionFlows (数组为只读内存映射)
+    """
+    if level not in LEVELS:
+        raise ValueError(f"未知的聚合层级: {level} (可选 {LEVELS})")
+    key = file_digest([table_path('routes'), table_path('airports')])
+    target = os.path.join(cache_dir, f"regions_{key}")
+    if not os.path.isdir(target):
+        arrays = {}
+        for name, flows in build_region_flows(load_route_graph(cache_dir)).items():
+            prefix = name.lower()
+            arrays.update({f"{prefix}_names": flows.names, f"{prefix}_node_region": flows.node_region,
+                           f"{prefix}_flow_indptr": flows.flows.indptr,
+                           f"{prefix}_flow_indices": flows.flows.indices,
+                           f"{prefix}_flow_data": flows.flows.data})
+        save_arrays(target, arrays)
+
+    prefix = level.lower()
+    arrays = load_arrays(target, [f"{prefix}_{name}" for name in REGION_ARRAYS])
+    names = arrays[f"{prefix}_names"]
+    flows = sparse.csr_matrix((arrays[f"{prefix}_flow_data"], arrays[f"{prefix}_flow_indices"],
+                               arrays[f"{prefix}_flow_indptr"]), shape=(len(names), len(names)))
+    return RegionFlows(level, names, arrays[f"{prefix}_node_region"], flows)
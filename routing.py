@@ -0,0 +1,236 @@
+import argparse
+import heapq
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from data_store import read_table
+from graph_store import build_csr, load_route_graph
+from spatial_index import load_airport_index, route_distances_km, haversine_km
+
+# ==========================================
+# 按距离计费的 A* 路由
+# 边权重 = 两端机场之间的大圆距离 (公里)，再加上每段航班的固定惩罚 (把“转机”折算成公里)。
+# 启发函数 = 当前机场到终点的大圆距离：任何航线都不可能比大圆更短，
+# 所以它既不会高估 (可采纳)，又满足三角不等式 (一致)，A* 找到的一定是最优行程。
+# ==========================================
+
+# 航司限定的子图缓存个数
+AIRLINE_CACHE_SIZE = 32
+
+# cost = km_weight * 公里数 + hop_penalty_km * 航段数
+Itinerary = namedtuple('Itinerary', ['path', 'km', 'hops', 'cost', 'expanded'])
+
+
+class RoutingEngine:
+    """
+    :param graph: 有向 RouteGraph (load_route_graph 的结果)
+    :param edge_km: 每条边的大圆距离 (与 graph.indices 对齐)，坐标未知的边为 NaN
+    :param lat, lon: 每个节点的经纬度 (度)，未知为 NaN
+    """
+
+    def __init__(self, graph, edge_km, lat, lon):
+        # 坐标未知的边无法计算距离，直接去掉
+        ok = np.isfinite(edge_km)
+        src = graph.edge_sources()[ok]
+        dst = np.asarray(graph.indices)[ok]
+        self.graph = build_csr(graph.node_ids, src, dst, np.ones(len(src), dtype=np.int32), graph.known)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        # graph 的边已按 (起点, 终点) 排序且无重复，过滤后重建 CSR 不改变边的顺序，可以直接沿用 edge_km
+        self._arrays = {None: self._adjacency(self.graph, np.asarray(edge_km)[ok])}
+        self._airline_edges = None
+
+        # IATA 代码 -> 节点下标，只在构建时读一次机场表
+        df = read_table('airports', columns=['Airport ID', 'IATA']).dropna()
+        df = df.drop_duplicates(subset='IATA', keep='last')
+        self._iata_index = pd.Index(df['IATA'].astype(str))
+        self._iata_nodes = self.graph.index_of(df['Airport ID'].to_numpy(dtype=np.int64))
+        self._node_iata = np.full(self.n_nodes, '?', dtype=object)
+        found = self._iata_nodes >= 0
+        self._node_iata[self._iata_nodes[found]] = self._iata_index[found]
+
+    @property
+    def n_nodes(self):
+        return self.graph.n_nodes
+
+    def _adjacency(self, graph, km=None):
+        """
+        A* 内循环用的 Python 列表 (逐个元素访问比 NumPy 标量快得多)
+        :param km: 每条边的距离 (与 graph.indices 对齐)，不给时按端点坐标计算
+        """
+        if km is None:
+            src = graph.edge_sources()
+            km = haversine_km(self.lat[src], self.lon[src], self.lat[graph.indices], self.lon[graph.indices])
+        return graph.indptr.tolist(), graph.indices.tolist(), np.asarray(km, dtype=np.float64).tolist()
+
+    def index_of_iata(self, codes):
+        """IATA 代码 -> 节点下标 (找不到为 -1)"""
+        pos = self._iata_index.get_indexer(np.atleast_1d(codes).astype(str))
+        return np.where(pos >= 0, self._iata_nodes[pos], -1)
+
+    def iata_of(self, nodes):
+        """节点下标 -> IATA 代码 (没有代码的机场为 '?')"""
+        return self._node_iata[np.asarray(nodes, dtype=np.int64)]
+
+    # ------------------------------------------
+    # 航司限定：只使用指定航司运营的航线
+    # ------------------------------------------
+    def _restricted(self, airlines):
+        if airlines is None:
+            return self._arrays[None]
+        key = frozenset(int(a) for a in np.atleast_1d(airlines))
+        if key not in self._arrays:
+            if self._airline_edges is None:
+                df = read_table('routes', columns=['Airline ID', 'Source airport ID', 'Destination airport ID'])
+                df = df.dropna()
+                self._airline_edges = (
+                    df['Airline ID'].to_numpy(dtype=np.int64),
+                    self.graph.index_of(df['Source airport ID'].to_numpy(dtype=np.int64)),
+                    self.graph.index_of(df['Destination airport ID'].to_numpy(dtype=np.int64)),
+                )
+            airline, src, dst = self._airline_edges
+            keep = np.isin(airline, list(key)) & (src >= 0) & (dst >= 0)
+            keep[keep] = np.isfinite(self.lat[src[keep]]) & np.isfinite(self.lat[dst[keep]])
+            sub = build_csr(self.graph.node_ids, src[keep], dst[keep],
+                            np.ones(int(keep.sum()), dtype=np.int32), self.graph.known)
+            self._arrays[key] = self._adjacency(sub)
+            # 插入后再检查：基础图之外最多保留 AIRLINE_CACHE_SIZE 个航司组合，超出时丢掉最早加入的
+            if len(self._arrays) - 1 > AIRLINE_CACHE_SIZE:
+                oldest = next(k for k in self._arrays if k is not None)
+                del self._arrays[oldest]
+        return self._arrays[key]
+
+    # ------------------------------------------
+    # 单次查询：A*
+    # ------------------------------------------
+    def route(self, source, target, km_weight=1.0, hop_penalty_km=0.0, airlines=None):
+        """
+        :param source, target: 节点下标
+        :param km_weight: 每公里的代价
+        :param hop_penalty_km: 每多飞一段的额外代价 (以公里计)，越大越偏向直飞 / 少转机
+        :param airlines: 只使用这些 Airline ID 运营的航线 (None 表示不限)
+        :return: Itinerary；不可达时 path 为 None，cost 为 inf
+        """
+        source, target = int(source), int(target)
+        indptr, indices, km = self._restricted(airlines)
+        # 启发函数：到终点的大圆距离 (一次向量化计算所有节点)
+        h = haversine_km(self.lat, self.lon, self.lat[target], self.lon[target]) * km_weight
+        h = np.nan_to_num(h, nan=0.0).tolist()
+
+        best = {source: 0.0}
+        parent = {source: source}
+        heap = [(h[source], 0.0, source)]
+        expanded = 0
+        while heap:
+            _, g, u = heapq.heappop(heap)
+            if g > best[u]:
+                continue  # 过期条目
+            if u == target:
+                return self._itinerary(parent, target, g, km, indptr, indices, expanded)
+            expanded += 1
+            for p in range(indptr[u], indptr[u + 1]):
+                v = indices[p]
+                ng = g + km_weight * km[p] + hop_penalty_km
+                if ng < best.get(v, float('inf')):
+                    best[v] = ng
+                    parent[v] = u
+                    heapq.heappush(heap, (ng + h[v], ng, v))
+        return Itinerary(None, float('inf'), -1, float('inf'), expanded)
+
+    def _itinerary(self, parent, target, cost, km, indptr, indices, expanded):
+        path = [target]
+        while parent[path[-1]] != path[-1]:
+            path.append(parent[path[-1]])
+        path.reverse()
+        total_km = 0.0
+        for u, v in zip(path, path[1:]):
+            p = indptr[u] + indices[indptr[u]:indptr[u + 1]].index(v)
+            total_km += km[p]
+        return Itinerary(path, total_km, len(path) - 1, cost, expanded)
+
+    # ------------------------------------------
+    # 批量查询：多源多汇
+    # ------------------------------------------
+    def many_to_many(self, sources, targets, km_weight=1.0, hop_penalty_km=0.0, airlines=None):
+        """
+        每个出发地跑一次 Dijkstra，所有目的地都确定后提前停止
+        (只有一个目的地时直接用 A*)
+
+        :return: (代价矩阵, 公里矩阵, 航段数矩阵)，形状均为 (len(sources), len(targets))；不可达为 inf / -1
+        """
+        sources = np.atleast_1d(sources).tolist()
+        targets = np.atleast_1d(targets).tolist()
+        cost = np.full((len(sources), len(targets)), np.inf)
+        dist_km = np.full((len(sources), len(targets)), np.inf)
+        hops = np.full((len(sources), len(targets)), -1, dtype=np.int64)
+
+        if len(targets) == 1:
+            for i, s in enumerate(sources):
+                it = self.route(s, targets[0], km_weight, hop_penalty_km, airlines)
+                cost[i, 0], dist_km[i, 0], hops[i, 0] = it.cost, it.km, it.hops
+            return cost, dist_km, hops
+
+        indptr, indices, km = self._restricted(airlines)
+        column = {}
+        for j, t in enumerate(targets):
+            column.setdefault(t, []).append(j)
+
+        for i, s in enumerate(sources):
+            # 堆里同时记录 (代价, 公里, 航段数)，终点出堆时即为最优
+            best = {s: 0.0}
+            heap = [(0.0, 0.0, 0, s)]
+            remaining = len(column)
+            settled = set()
+            while heap and remaining:
+                g, d, n_hops, u = heapq.heappop(heap)
+                if u in settled:
+                    continue
+                settled.add(u)
+                if u in column:
+                    for j in column[u]:
+                        cost[i, j], dist_km[i, j], hops[i, j] = g, d, n_hops
+                    remaining -= 1
+                for p in range(indptr[u], indptr[u + 1]):
+                    v = indices[p]
+                    ng = g + km_weight * km[p] + hop_penalty_km
+                    if ng < best.get(v, float('inf')):
+                        best[v] = ng
+                        heapq.heappush(heap, (ng, d + km[p], n_hops + 1, v))
+        return cost, dist_km, hops
+
+
+def load_routing_engine():
+    """用缓存的航线图、机场空间索引和航线距离构建路由引擎"""
+    graph = load_route_graph()
+    index = load_airport_index()
+    pos = index.locate(graph.node_ids)
+    known = pos >= 0
+    lat = np.where(known, index.lat[pos], np.nan)
+    lon = np.where(known, index.lon[pos], np.nan)
+    return RoutingEngine(graph, route_distances_km(graph, index), lat, lon)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按大圆距离查询最优行程 (A*)")
+    parser.add_argument('source', help="出发机场 IATA 代码，如 PEK")
+    parser.add_argument('targets', nargs='+', help="一个或多个到达机场 IATA 代码")
+    parser.add_argument('--hop-penalty', type=float, default=0.0, help="每多飞一段的额外代价 (公里)")
+    parser.add_argument('--airlines', type=int, nargs='+', default=None, help="只使用这些 Airline ID 运营的航线")
+    args = parser.parse_args()
+
+    engine = load_routing_engine()
+    source, *targets = engine.index_of_iata([args.source] + args.targets)
+    if source < 0:
+        parser.error(f"未知的机场代码: {args.source}")
+    for code, target in zip(args.targets, targets):
+        if target < 0:
+            print(f"❓ 未知的机场代码: {code}")
+            continue
+        it = engine.route(source, target, hop_penalty_km=args.hop_penalty, airlines=args.airlines)
+        if it.path is None:
+            print(f"❌ {args.source} -> {code}: 不可达 (扩展 {it.expanded} 个机场)")
+        else:
+            print(f"✈️ {' -> '.join(engine.iata_of(it.path))}: {it.km:.0f} km, {it.hops} 段 "
+                  f"(扩展 {it.expanded} 个机场)")
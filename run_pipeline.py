@@ -0,0 +1,195 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from data_store import csv_path, parquet_path, HAS_PARQUET
+
+# ==========================================
+# 流水线执行器
+# 每一步声明自己的输入和输出：
+#   - 输出都存在且比所有输入 (含脚本本身和它用到的公共模块) 新 -> 跳过
+#   - 某一步的输入由另一步产出 -> 自动形成依赖
+#   - 没有依赖关系的步骤在各自的进程里并行执行
+# ==========================================
+# stamp: 可选的“完成标记”文件。自带增量逻辑的步骤 (如 01_cleaning.py 会跳过未变化的表)
+#        不一定改写所有输出，此时用它每次都会更新的标记文件来判断是否最新
+Step = namedtuple('Step', ['script', 'inputs', 'outputs', 'stamp'], defaults=(None,))
+
+LOG_DIR = 'pipeline_logs'
+
+# 脚本与公共模块所在目录；数据文件 (输入 / 输出) 相对于当前工作目录，
+# 所以可以在另一个数据目录 (如 generate_synthetic.py 生成的 synthetic_10x/) 里运行整条流水线
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def resolve(path):
+    """代码文件 (.py) 在脚本目录下找，其余按数据文件处理"""
+    return os.path.join(SCRIPT_DIR, path) if path.endswith('.py') else path
+
+
+def table(name):
+    """清洗后的表实际由哪些文件承载 (CSV + Parquet)"""
+    return [csv_path(name)] + ([parquet_path(name)] if HAS_PARQUET else [])
+
+
+RAW_FILES = ['airports.dat', 'airlines.dat', 'routes.dat', 'planes.dat', 'countries.dat']
+CLEANED = table('airports') + table('airlines') + table('routes') + table('planes') + table('countries')
+GRAPH_CODE = ['data_store.py', 'graph_store.py']
+# 06-10 还都通过 StepProfiler 做可选的运行剖析
+ANALYSIS_CODE = GRAPH_CODE + ['profiling.py']
+
+STEPS = [
+    # schema 变化由 01_cleaning.py 里的 CLEANING_VERSION 控制，这里只看原始数据
+    Step('01_cleaning.py', RAW_FILES, CLEANED, stamp='cleaning_manifest.json'),
+    # 只读质量报告，没有输出文件，每次都会执行
+    Step('data_check.py', table('airports') + table('routes') + table('airlines') + ['data_store.py'], []),
+    Step('02_geo_analysis.py', table('airports') + ['data_store.py', 'raster_map.py'], ['geo_analysis_dashboard.png']),
+    Step('03_network_analysis.py', table('airports') + table('routes') + ['data_store.py'],
+         ['network_hubs_ranking.png']),
+    Step('04_airline_analysis.py', table('routes') + table('airlines') + table('airports') + table('planes')
+         + GRAPH_CODE + ['airline_metrics.py', 'equipment_index.py'], ['top_airlines.png', 'airline_metrics.csv']),
+    Step('05_export_for_d3.py', table('airports') + table('routes') + GRAPH_CODE + ['spatial_index.py'],
+         ['data.json'] + [f"data_{level}{ext}" for level in ('2k', '10k', 'all')
+                         for ext in ('.json', '.bin', '.meta.json')]),
+    Step('06_connectivity_analysis.py',
+         table('routes') + table('airports') + ANALYSIS_CODE + ['centrality.py', 'raster_map.py'],
+         ['airport_rankings.csv', '01_connectivity_stats.png', '02_global_connectivity_map.png']),
+    Step('07_robustness_analysis.py', table('routes') + table('airports') + ANALYSIS_CODE + ['percolation.py'],
+         ['robustness_analysis.png']),
+    Step('08_small_world_analysis.py', table('routes') + table('airports') + ANALYSIS_CODE + ['hop_distance.py'],
+         ['small_world_analysis_fixed.png']),
+    Step('09_community_detection.py',
+         table('routes') + table('airports') + ANALYSIS_CODE + ['community.py', 'raster_map.py', 'region_flows.py'],
+         ['community_detection_map.png', 'community_assignments.csv']),
+    Step('10_airline_failure_scenarios.py',
+         table('routes') + table('airports') + table('airlines') + ANALYSIS_CODE + ['airline_scenarios.py', 'airline_metrics.py'],
+         ['airline_failure_scenarios.csv']),
+    Step('update_final.py', [], ['index.html']),
+]
+
+
+# ==========================================
+# 1. 增量判断
+# ==========================================
+def is_up_to_date(step):
+    """所有输出都存在，且最旧的输出 (或完成标记) 比最新的输入还新"""
+    if not step.outputs:
+        return False
+    if not all(os.path.exists(p) for p in step.outputs):
+        return False
+    if step.stamp is not None and not os.path.exists(step.stamp):
+        return False
+    inputs = [resolve(p) for p in [step.script] + step.inputs if os.path.exists(resolve(p))]
+    newest_input = max(os.path.getmtime(p) for p in inputs)
+    if step.stamp is not None:
+        oldest_output = os.path.getmtime(step.stamp)
+    else:
+        oldest_output = min(os.path.getmtime(p) for p in step.outputs)
+    return oldest_output >= newest_input
+
+
+def build_dependencies(steps):
+    """输入文件由哪一步产出，就依赖哪一步"""
+    producers = {out: step.script for step in steps for out in step.outputs}
+    return {step.script: {producers[p] for p in step.inputs if p in producers and producers[p] != step.script}
+            for step in steps}
+
+
+# ==========================================
+# 2. 执行单个步骤 (独立进程)
+# ==========================================
+def run_step(step):
+    """
+    在子进程中运行脚本，输出写到 pipeline_logs/<脚本名>.log
+    :return: (返回码, 耗时秒数)
+    """
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_file = os.path.join(LOG_DIR, f"{os.path.splitext(step.script)[0]}.log")
+    # 非交互后端：脚本末尾的 plt.show() 不会阻塞流水线
+    env = dict(os.environ, MPLBACKEND='Agg', PYTHONIOENCODING='utf-8')
+    # 线程池满时提交的步骤要排队，真正开始运行时才打印
+    print(f"🚀 启动 {step.script}", flush=True)
+    start = time.perf_counter()
+    with open(log_file, 'w', encoding='utf-8') as log:
+        proc = subprocess.run([sys.executable, resolve(step.script)], stdout=log, stderr=subprocess.STDOUT, env=env)
+    return proc.returncode, time.perf_counter() - start
+
+
+# ==========================================
+# 3. 调度：依赖满足的步骤立即并行启动
+# ==========================================
+def run_pipeline(steps=STEPS, force=False, jobs=None, dry_run=False):
+    """
+    :param force: 忽略时间戳，全部重新执行
+    :param jobs: 最多同时运行的步骤数，默认 CPU 核数
+    :param dry_run: 只打印每一步会执行还是跳过
+    :return: 是否全部成功
+    """
+    by_name = {step.script: step for step in steps}
+    deps = build_dependencies(steps)
+    done, failed = set(), set()
+    # 干跑时判定为需要执行的步骤
+    would_run = set()
+    running = {}
+    pending = [step.script for step in steps]
+    jobs = jobs or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            # 启动所有依赖已完成的步骤
+            for name in list(pending):
+                if deps[name] & failed:
+                    print(f"⛔ 跳过 {name}: 上游步骤失败")
+                    pending.remove(name)
+                    failed.add(name)
+                    continue
+                if not deps[name] <= done:
+                    continue
+                pending.remove(name)
+                step = by_name[name]
+                # 干跑时上游并没有真的执行，输出的时间戳还是旧的：上游会执行，下游就一定要执行
+                upstream_runs = dry_run and deps[name] & would_run
+                if not force and not upstream_runs and is_up_to_date(step):
+                    print(f"⏭️ {name}: 输出已是最新")
+                    done.add(name)
+                elif dry_run:
+                    print(f"▶️ {name}: 需要执行")
+                    would_run.add(name)
+                    done.add(name)
+                else:
+                    running[pool.submit(run_step, step)] = name
+
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                code, elapsed = future.result()
+                if code == 0:
+                    print(f"✅ {name} 完成 ({elapsed:.1f}s)")
+                    done.add(name)
+                else:
+                    print(f"❌ {name} 失败 (返回码 {code})，日志见 {LOG_DIR}/")
+                    failed.add(name)
+
+    print(f"\n🎉 流水线结束，总耗时 {time.perf_counter() - start:.1f}s"
+          + (f"，失败 {len(failed)} 步" if failed else ""))
+    return not failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按依赖关系增量、并行地运行分析脚本")
+    parser.add_argument('--force', action='store_true', help="忽略时间戳，全部重新执行")
+    parser.add_argument('--jobs', type=int, default=None, help="最多同时运行的步骤数 (默认 CPU 核数)")
+    parser.add_argument('--dry-run', action='store_true', help="只显示哪些步骤会执行")
+    parser.add_argument('--data-dir', default=None, help="在这个目录里读写数据 (默认当前目录)")
+    args = parser.parse_args()
+    if args.data_dir:
+        os.chdir(args.data_dir)
+    sys.exit(0 if run_pipeline(force=args.force, jobs=args.jobs, dry_run=args.dry_run) else 1)
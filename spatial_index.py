@@ -0,0 +1,283 @@
+import hashlib
+import itertools
+import os
+
+import numpy as np
+
+from data_store import read_table, table_path
+from graph_store import CACHE_DIR, file_digest, load_arrays, save_arrays
+
+# ==========================================
+# 机场空间索引
+# 经纬度先转成单位球上的三维坐标，再放进边长为 cell 的立方体网格 (按格子编号排序，CSR 存储)。
+# 查询时只检查查询点附近的格子，候选点再用弦长精确过滤；
+# 所有查询点一起处理，没有逐行的 Python 循环。
+# ==========================================
+EARTH_RADIUS_KM = 6371.0
+
+# 网格边长对应的地面距离：半径不超过它的查询只需检查 3x3x3 个格子
+CELL_KM = 150.0
+
+# 需要检查的格子数超过这个值时 (查询半径远大于网格)，改为分块暴力计算
+MAX_CELLS_PER_QUERY = 343
+
+# 暴力计算时每块的查询点数 (控制 查询数 x 机场数 的临时矩阵大小)
+BRUTE_FORCE_CHUNK = 256
+
+# 索引数组文件名 (与航线图缓存相同，每个数组一个 .npy)
+INDEX_ARRAYS = ['airport_ids', 'lat', 'lon', 'xyz', 'cell_keys', 'cell_starts', 'lat_order']
+
+
+# ==========================================
+# 1. 距离函数 (向量化)
+# ==========================================
+def unit_vectors(lat, lon):
+    """经纬度 (度) -> 单位球坐标，形状 (N, 3)"""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """大圆距离 (公里)，参数可以是等长数组或可广播的数组"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def km_to_chord(km):
+    """地面距离 -> 单位球上的弦长"""
+    return 2 * np.sin(np.minimum(np.asarray(km, dtype=np.float64), np.pi * EARTH_RADIUS_KM) / (2 * EARTH_RADIUS_KM))
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+
+# ==========================================
+# 2. 索引
+# ==========================================
+class AirportIndex:
+    """
+    机场空间索引 (只读)
+    查询结果中的机场都用“索引内位置”表示，用 airport_ids[pos] 换回机场 ID
+
+    :param airport_ids: 机场 ID (int32)
+    :param lat: 纬度 (float64)
+    :param lon: 经度 (float64)
+    :param xyz: 单位球坐标，已按网格编号排序
+    :param cell_keys: 非空格子的编号 (升序)
+    :param cell_starts: 每个非空格子在排序后数组中的起始位置 (长度 = 格子数 + 1)
+    :param lat_order: 按纬度排序的位置，用于经纬度框查询
+    """
+
+    def __init__(self, airport_ids, lat, lon, xyz, cell_keys, cell_starts, lat_order):
+        self.airport_ids = airport_ids
+        self.lat = lat
+        self.lon = lon
+        self.xyz = xyz
+        self.cell_keys = cell_keys
+        self.cell_starts = cell_starts
+        self.lat_order = lat_order
+
+    @property
+    def n_airports(self):
+        return len(self.airport_ids)
+
+    @property
+    def cell(self):
+        return float(km_to_chord(CELL_KM))
+
+    @property
+    def n_cells_per_axis(self):
+        return int(np.ceil(2.0 / self.cell)) + 1
+
+    def locate(self, airport_ids):
+        """机场 ID -> 索引内位置 (不存在的 ID 返回 -1)"""
+        airport_ids = np.asarray(airport_ids)
+        order = np.argsort(self.airport_ids, kind='stable')
+        sorted_ids = self.airport_ids[order]
+        pos = np.clip(np.searchsorted(sorted_ids, airport_ids), 0, max(self.n_airports - 1, 0))
+        found = sorted_ids[pos] == airport_ids
+        return np.where(found, order[pos], -1)
+
+    def _cell_of(self, xyz):
+        return np.floor((xyz + 1.0) / self.cell).astype(np.int64)
+
+    def _key(self, cells):
+        m = self.n_cells_per_axis
+        return (cells[..., 0] * m + cells[..., 1]) * m + cells[..., 2]
+
+    def within_radius(self, lat, lon, radius_km):
+        """
+        半径查询：找出每个查询点 radius_km 以内的所有机场 (含距离为 0 的机场本身)
+        :param lat, lon: 查询点经纬度 (标量或数组)
+        :param radius_km: 查询半径 (标量，或与查询点等长的数组)
+        :return: (查询编号, 机场位置, 距离公里) 三个等长数组，按 (查询编号, 距离) 排序
+        """
+        q = unit_vectors(np.atleast_1d(lat), np.atleast_1d(lon)).reshape(-1, 3)
+        chord = np.broadcast_to(km_to_chord(radius_km), len(q))
+        span = int(np.ceil(chord.max() / self.cell)) if len(q) else 0
+
+        if (2 * span + 1) ** 3 > MAX_CELLS_PER_QUERY:
+            qi, ai = self._brute_force_candidates(q, chord)
+        else:
+            qi, ai = self._grid_candidates(q, span)
+
+        d2 = ((q[qi] - self.xyz[ai]) ** 2).sum(axis=1)
+        keep = d2 <= chord[qi] ** 2
+        qi, ai, km = qi[keep], ai[keep], chord_to_km(np.sqrt(d2[keep]))
+        order = np.lexsort((km, qi))
+        return qi[order], ai[order], km[order]
+
+    def _grid_candidates(self, q, span):
+        """查询点周围 (2*span+1)^3 个格子里的所有机场"""
+        offsets = np.array(list(itertools.product(range(-span, span + 1), repeat=3)), dtype=np.int64)
+        cells = self._cell_of(q)[:, None, :] + offsets[None, :, :]
+        valid = ((cells >= 0) & (cells < self.n_cells_per_axis)).all(axis=2).ravel()
+        keys = self._key(cells).ravel()[valid]
+        query_of_key = np.repeat(np.arange(len(q)), len(offsets))[valid]
+
+        pos = np.clip(np.searchsorted(self.cell_keys, keys), 0, len(self.cell_keys) - 1)
+        hit = self.cell_keys[pos] == keys
+        pos, query_of_key = pos[hit], query_of_key[hit]
+
+        starts = self.cell_starts[pos]
+        counts = self.cell_starts[pos + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return np.repeat(query_of_key, counts), offsets
+
+    def _brute_force_candidates(self, q, chord):
+        """大半径查询：分块计算所有 (查询点, 机场) 的弦长"""
+        qi, ai = [], []
+        for start in range(0, len(q), BRUTE_FORCE_CHUNK):
+            block = q[start:start + BRUTE_FORCE_CHUNK]
+            # 单位向量之间：|a - b|^2 = 2 - 2 a·b，一次矩阵乘法即可
+            d2 = 2.0 - 2.0 * (block @ np.asarray(self.xyz).T)
+            bq, ba = np.nonzero(d2 <= chord[start:start + BRUTE_FORCE_CHUNK, None] ** 2)
+            qi.append(bq + start)
+            ai.append(ba)
+        if not qi:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(qi), np.concatenate(ai)
+
+    def nearest(self, lat, lon, k=1):
+        """
+        最近的 k 个机场：从一个网格边长开始查询，结果不足 k 个的查询点把半径翻倍重查
+        :return: (机场位置, 距离公里)，形状均为 (查询数, k)；机场总数不足 k 时用 -1 / inf 填充
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        n_q = len(lat)
+        out_pos = np.full((n_q, k), -1, dtype=np.int64)
+        out_km = np.full((n_q, k), np.inf)
+        want = min(k, self.n_airports)
+
+        pending = np.arange(n_q)
+        radius = CELL_KM
+        while len(pending) and want > 0:
+            # 半径超过半个地球周长时一定能覆盖全部机场
+            radius = min(radius, np.pi * EARTH_RADIUS_KM)
+            qi, ai, km = self.within_radius(lat[pending], lon[pending], radius)
+            found = np.bincount(qi, minlength=len(pending))
+            done = found >= want
+            # 每个查询点内部已按距离排序，取前 k 个
+            rank = np.arange(len(qi)) - np.repeat(np.cumsum(found) - found, found)
+            take = done[qi] & (rank < k)
+            out_pos[pending[qi[take]], rank[take]] = ai[take]
+            out_km[pending[qi[take]], rank[take]] = km[take]
+            pending = pending[~done]
+            radius *= 2
+        return out_pos, out_km
+
+    def in_bbox(self, lat_min, lat_max, lon_min, lon_max):
+        """
+        经纬度框查询 (lon_min > lon_max 表示跨越 180° 经线)
+        :return: 框内机场的位置 (升序)
+        """
+        lat_sorted = self.lat[self.lat_order]
+        lo = np.searchsorted(lat_sorted, lat_min, side='left')
+        hi = np.searchsorted(lat_sorted, lat_max, side='right')
+        candidates = self.lat_order[lo:hi]
+        lon = self.lon[candidates]
+        if lon_min <= lon_max:
+            inside = (lon >= lon_min) & (lon <= lon_max)
+        else:
+            inside = (lon >= lon_min) | (lon <= lon_max)
+        return np.sort(candidates[inside])
+
+
+def build_airport_index():
+    """读取机场表 (只读三列)，构建网格索引"""
+    df = read_table('airports', columns=['Airport ID', 'Latitude', 'Longitude'])
+    df = df.dropna()
+    airport_ids = df['Airport ID'].to_numpy(dtype=np.int32)
+    lat = df['Latitude'].to_numpy(dtype=np.float64)
+    lon = df['Longitude'].to_numpy(dtype=np.float64)
+
+    xyz = unit_vectors(lat, lon)
+    index = AirportIndex(airport_ids, lat, lon, xyz, None, None, None)
+    keys = index._key(index._cell_of(xyz))
+
+    # 按格子编号排序，每个非空格子对应一段连续区间
+    order = np.argsort(keys, kind='stable')
+    cell_keys, cell_first = np.unique(keys[order], return_index=True)
+    cell_starts = np.append(cell_first, len(order)).astype(np.int64)
+    return AirportIndex(airport_ids[order], lat[order], lon[order], xyz[order],
+                        cell_keys, cell_starts, np.argsort(lat[order], kind='stable'))
+
+
+# ==========================================
+# 3. 磁盘缓存 (按机场表内容哈希)
+# ==========================================
+def load_airport_index(cache_dir=CACHE_DIR):
+    """
+    打开 (或首次生成) 机场空间索引，缓存在 graph_cache/airports_<哈希>/ 下
+    :return: AirportIndex (数组为只读内存映射)
+    """
+    key = file_digest([table_path('airports')])
+    target = os.path.join(cache_dir, f"airports_{key}_{CELL_KM:g}km")
+    if not os.path.isdir(target):
+        index = build_airport_index()
+        save_arrays(target, {name: getattr(index, name) for name in INDEX_ARRAYS})
+    return AirportIndex(**load_arrays(target, INDEX_ARRAYS))
+
+
+def route_distances_km(graph, index=None):
+    """
+    航线图每条边的大圆距离 (与 graph.indices 一一对应)，端点坐标未知时为 NaN
+    缓存键为机场表内容与图本身 (节点、边及其顺序) 的哈希：有向图、无向图、子图、
+    带 extra_types 的图各有各的缓存文件，不会互相覆盖或取到别的图的距离
+
+    :param graph: RouteGraph (load_route_graph、to_undirected、subgraph 等的结果)
+    :param index: AirportIndex，默认 load_airport_index()
+    """
+    key = f"{file_digest([table_path('airports')])}_{_graph_digest(graph)}"
+    cache_file = os.path.join(CACHE_DIR, f"route_km_{key}.npy")
+    if os.path.exists(cache_file):
+        return np.load(cache_file, mmap_mode='r')
+
+    index = index if index is not None else load_airport_index()
+    pos = index.locate(graph.node_ids)
+    known = pos >= 0
+    lat = np.where(known, index.lat[pos], np.nan)
+    lon = np.where(known, index.lon[pos], np.nan)
+    src = graph.edge_sources()
+    km = haversine_km(lat[src], lon[src], lat[graph.indices], lon[graph.indices]).astype(np.float32)
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{cache_file}.tmp{os.getpid()}.npy"
+    np.save(tmp, km)
+    os.replace(tmp, cache_file)
+    return km
+
+
+def _graph_digest(graph):
+    """图结构的哈希 (前 16 位十六进制)，边的集合或顺序不同结果就不同"""
+    h = hashlib.sha1()
+    for arr in (graph.node_ids, graph.indptr, graph.indices):
+        arr = np.ascontiguousarray(arr, dtype=np.int64)
+        h.update(np.int64(len(arr)).tobytes())
+        h.update(arr.tobytes())
+    return h.hexdigest()[:16]
@@ -22,6 +22,10 @@ html_content = """<!DOCTYPE html>
             border-radius: 4px;
         }
         .legend-labels { display: flex; justify-content: space-between; font-size: 10px; color: #888; }
+        #fps {
+            position: absolute; bottom: 20px; left: 30px; pointer-events: none; display: none;
+            font: 11px monospace; color: #8f8; background: rgba(0, 0, 0, 0.6); padding: 4px 8px; border-radius: 4px;
+        }
     </style>
 </head>
 <body>
@@ -39,6 +43,7 @@ html_content = """<!DOCTYPE html>
             <span>Long (> 10k km)</span>
         </div>
     </div>
+    <div id="fps"></div>
     <canvas id="globe"></canvas>
 
     <script src="https://d3js.org/d3.v7.min.js"></script>
@@ -72,86 +77,164 @@ html_content = """<!DOCTYPE html>
         const colorScale = d3.scaleSequential(d3.interpolateCool) 
             .domain([0, 12000]); // 假设最长航线大概 12000 公里
 
-        Promise.all([
-            d3.json("https://unpkg.com/world-atlas@1/world/110m.json"),
-            d3.json("data.json")
-        ]).then(([world, data]) => {
-            const land = topojson.feature(world, world.objects.countries);
-            const airportMap = new Map(data.airports.map(d => [d.code, d]));
-
-            // 🌟 2. 预处理：计算度和距离
-            const airportCounts = {};
-            
-            const routes = data.routes.map(r => {
-                const src = airportMap.get(r.source);
-                const tgt = airportMap.get(r.target);
-                if (!src || !tgt) return null;
-
-                // 统计度 (Degree)
-                airportCounts[r.source] = (airportCounts[r.source] || 0) + 1;
-                airportCounts[r.target] = (airportCounts[r.target] || 0) + 1;
-
-                // 计算地理距离 (Distance)
-                // d3.geoDistance 返回的是弧度，乘以地球半径 6371 得到公里
-                const distance = d3.geoDistance(src.loc, tgt.loc) * 6371;
+        // 🌟 2. 读取二进制载荷 (由 05_export_for_d3.py 生成)
+        // JSON 头描述每个类型化数组在 .bin 里的位置；距离和度数已在导出时算好，页面不再重复计算
+        // 航线按颜色分成 N_BANDS 档，每档合并成一个 MultiLineString：每帧只需 N_BANDS 次 stroke
+        const N_BANDS = 12;
+        const HUB_DEGREE = 50;
+
+        function loadLevel(name) {
+            return Promise.all([
+                d3.json(`data_${name}.meta.json`),
+                fetch(`data_${name}.bin`).then(r => r.arrayBuffer())
+            ]).then(([meta, buffer]) => {
+                const a = {};
+                meta.arrays.forEach(s => { a[s.name] = new window[s.type + "Array"](buffer, s.offset, s.length); });
+
+                // 机场：预先算好单位球坐标，背面剔除只需一次点积
+                const n = a.lon.length;
+                const xyz = new Float32Array(3 * n);
+                for (let i = 0; i < n; i++) {
+                    const lambda = a.lon[i] * Math.PI / 180, phi = a.lat[i] * Math.PI / 180;
+                    xyz[3 * i] = Math.cos(phi) * Math.cos(lambda);
+                    xyz[3 * i + 1] = Math.cos(phi) * Math.sin(lambda);
+                    xyz[3 * i + 2] = Math.sin(phi);
+                }
+                const rScale = d3.scaleSqrt().domain([0, d3.max(a.degree)]).range([1, 6]);
+                const radius = Float32Array.from(a.degree, d => rScale(d));
+
+                // 航线：按距离分档 (距离越远颜色越偏紫)
+                const bandWidth = colorScale.domain()[1] / N_BANDS;
+                const bands = d3.range(N_BANDS).map(b => ({
+                    color: colorScale((b + 0.5) * bandWidth),
+                    geometry: { type: "MultiLineString", coordinates: [] }
+                }));
+                for (let i = 0; i < a.source.length; i++) {
+                    const b = Math.min(N_BANDS - 1, Math.floor(a.km[i] / bandWidth));
+                    const s = a.source[i], t = a.target[i];
+                    bands[b].geometry.coordinates.push([[a.lon[s], a.lat[s]], [a.lon[t], a.lat[t]]]);
+                }
 
                 return {
-                    type: "LineString", 
-                    coordinates: [src.loc, tgt.loc],
-                    distance: distance // 把距离存进去，一会儿画图用
+                    lon: a.lon, lat: a.lat, xyz, radius,
+                    hub: Uint8Array.from(a.degree, d => d > HUB_DEGREE),
+                    bands: bands.filter(b => b.geometry.coordinates.length),
+                    nRoutes: a.source.length
                 };
-            }).filter(d => d);
+            });
+        }
+
+        // 🌟 3. 不随旋转变化的图层 (地球背景、光晕) 只在尺寸变化时画一次，缓存在离屏 canvas 里
+        let sphereLayer = null, haloLayer = null;
+
+        function cacheLayer(draw) {
+            const dpr = window.devicePixelRatio || 1;
+            const layer = document.createElement("canvas");
+            layer.width = width * dpr;
+            layer.height = height * dpr;
+            const ctx = layer.getContext("2d");
+            ctx.scale(dpr, dpr);
+            draw(ctx, d3.geoPath(projection, ctx));
+            return layer;
+        }
+
+        function cacheLayers() {
+            sphereLayer = cacheLayer((ctx, p) => {
+                ctx.beginPath(); p({type: "Sphere"}); ctx.fillStyle = "#111"; ctx.fill();
+            });
+            haloLayer = cacheLayer((ctx, p) => {
+                ctx.beginPath(); p({type: "Sphere"});
+                ctx.strokeStyle = "rgba(255,255,255,0.1)"; ctx.lineWidth = 1.5; ctx.stroke();
+            });
+        }
+        cacheLayers();
+
+        // 🌟 4. 可选的帧率面板：地址栏加 ?fps 或按 F 键切换
+        const fpsPanel = document.getElementById("fps");
+        let showFps = new URLSearchParams(window.location.search).has("fps");
+        let frameMs = 0, frameGap = 16.7, lastFrame = null;
+        fpsPanel.style.display = showFps ? "block" : "none";
+        window.addEventListener("keydown", e => {
+            if (e.key !== "f" && e.key !== "F") return;
+            showFps = !showFps;
+            fpsPanel.style.display = showFps ? "block" : "none";
+        });
 
-            // 绑定度数据回机场
-            data.airports.forEach(d => d.degree = airportCounts[d.code] || 0);
-            data.airports.sort((a, b) => a.degree - b.degree); // 小机场先画
+        // 同一颜色的机场放进同一条路径，一次 fill
+        function fillAirports(s, hub, cx, cy, cz) {
+            context.beginPath();
+            for (let i = 0; i < s.radius.length; i++) {
+                if (s.hub[i] !== hub) continue;
+                if (s.xyz[3 * i] * cx + s.xyz[3 * i + 1] * cy + s.xyz[3 * i + 2] * cz <= 0) continue; // 在背面
+                const p = projection([s.lon[i], s.lat[i]]);
+                const r = s.radius[i];
+                context.moveTo(p[0] + r, p[1]);
+                context.arc(p[0], p[1], r, 0, 2 * Math.PI);
+            }
+            context.fill();
+        }
+
+        // 由粗到细依次加载 (按重要性排序的 LOD 文件)，每加载完一级就替换当前画面
+        const LEVELS = ["2k", "10k", "all"];
+        let scene = null;
 
-            const rScale = d3.scaleSqrt().domain([0, d3.max(Object.values(airportCounts))]).range([1, 6]);
+        d3.json("https://unpkg.com/world-atlas@1/world/110m.json").then(world => {
+            // 陆地用合并后的轮廓填充，国界线预先合并成一条网格，每帧各画一次
+            const land = topojson.feature(world, world.objects.land);
+            const borders = topojson.mesh(world, world.objects.countries, (a, b) => a !== b);
+
+            LEVELS.reduce(
+                (loading, name) => loading.then(() => loadLevel(name)).then(s => { scene = s; }),
+                Promise.resolve()
+            );
 
             d3.timer((elapsed) => {
-                projection.rotate([elapsed * 0.005, -10]);
+                const frameStart = performance.now();
+                const rotate = [elapsed * 0.005, -10];
+                projection.rotate(rotate);
                 context.clearRect(0, 0, width, height);
 
-                // 画地球背景
-                context.beginPath(); path({type: "Sphere"}); context.fillStyle = "#111"; context.fill();
-                
+                // 画地球背景 (缓存)
+                context.drawImage(sphereLayer, 0, 0, width, height);
+
                 // 画陆地
-                context.beginPath(); path(land); context.fillStyle = "#222"; context.fill(); 
+                context.beginPath(); path(land); context.fillStyle = "#222"; context.fill();
+                context.beginPath(); path(borders);
                 context.strokeStyle = "#000"; context.lineWidth = 0.5; context.stroke();
 
-                // 🌟 3. 画航线：根据距离上色 (核心分析功能)
-                routes.forEach(route => {
-                    context.beginPath();
-                    path(route);
-                    // 这里的颜色是动态计算的！
-                    context.strokeStyle = colorScale(route.distance);
-                    // 距离越远，线条稍微粗一点点，透明度低一点
-                    context.globalAlpha = 0.3; 
+                if (scene) {
+                    // 🌟 5. 画航线：根据距离上色 (核心分析功能)，每个颜色档一次 stroke
+                    context.globalAlpha = 0.3;
                     context.lineWidth = 0.6;
-                    context.stroke();
-                });
-                context.globalAlpha = 1.0; // 恢复不透明
-
-                // 画机场
-                data.airports.forEach(d => {
-                    const p = projection(d.loc);
-                    // 简单的背面剔除
-                    if (d3.geoDistance(d.loc, projection.invert([width/2, height/2])) > 1.57) return;
-
-                    context.beginPath();
-                    context.arc(p[0], p[1], rScale(d.degree), 0, 2 * Math.PI);
-                    
-                    if (d.degree > 50) {
-                        context.fillStyle = "rgba(255, 50, 50, 0.9)";
-                    } else {
-                        context.fillStyle = "#fff";
-                    }
-                    context.fill();
-                });
-                
-                // 加上光晕，增加美感
-                context.beginPath(); path({type: "Sphere"});
-                context.strokeStyle = "rgba(255,255,255,0.1)"; context.lineWidth = 1.5; context.stroke();
+                    scene.bands.forEach(band => {
+                        context.beginPath();
+                        path(band.geometry);
+                        context.strokeStyle = band.color;
+                        context.stroke();
+                    });
+                    context.globalAlpha = 1.0; // 恢复不透明
+
+                    // 画机场：视线中心每帧只算一次 (即旋转角的反方向)，小机场先画
+                    const lambda = -rotate[0] * Math.PI / 180, phi = -rotate[1] * Math.PI / 180;
+                    const cx = Math.cos(phi) * Math.cos(lambda), cy = Math.cos(phi) * Math.sin(lambda), cz = Math.sin(phi);
+                    context.fillStyle = "#fff";
+                    fillAirports(scene, 0, cx, cy, cz);
+                    context.fillStyle = "rgba(255, 50, 50, 0.9)";
+                    fillAirports(scene, 1, cx, cy, cz);
+                }
+
+                // 加上光晕，增加美感 (缓存)
+                context.drawImage(haloLayer, 0, 0, width, height);
+
+                // 帧耗时 (绘制本身) 与帧间隔 (实际帧率) 做指数平滑
+                const now = performance.now();
+                frameMs = 0.9 * frameMs + 0.1 * (now - frameStart);
+                if (lastFrame !== null) frameGap = 0.9 * frameGap + 0.1 * (now - lastFrame);
+                lastFrame = now;
+                if (showFps) {
+                    fpsPanel.textContent = `${(1000 / frameGap).toFixed(0)} fps · ${frameMs.toFixed(1)} ms/frame`
+                        + (scene ? ` · ${scene.nRoutes} routes` : "");
+                }
             });
         });
 
@@ -159,6 +242,7 @@ html_content = """<!DOCTYPE html>
              const dim = resize();
              width = dim.width; height = dim.height;
              projection.translate([width / 2, height / 2]).scale(height / 1.9);
+             cacheLayers();
         });
     </script>
 </body>